@@ -0,0 +1,260 @@
+import hashlib
+import logging
+import re
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+from cache import TieredCache, build_cache
+from config import Config
+from metrics import stage_timer
+from spotify_client import SpotifyAPIError
+
+
+def analysis_key(playlist_id: str, snapshot_id: str, max_tracks: Optional[int] = None) -> str:
+    """Clé d'une analyse : version de la playlist et, si les pistes lues sont limitées, la limite"""
+    key = f"{playlist_id}:{snapshot_id}"
+    return key if max_tracks is None else f"{key}:{max_tracks}"
+
+
+def analysis_seed(playlist_id: str, snapshot_id: str, max_tracks: Optional[int] = None) -> int:
+    """Seed stable du tirage de cocktails pour une version donnée d'une playlist"""
+    digest = hashlib.sha256(analysis_key(playlist_id, snapshot_id, max_tracks).encode("utf-8")).hexdigest()
+    return int(digest[:16], 16)
+
+
+def _digest(value: str) -> str:
+    return hashlib.sha256(value.encode("utf-8")).hexdigest()[:16]
+
+
+def combined_playlist_info(infos: List[Dict[str, str]]) -> Dict[str, str]:
+    """Infos affichées pour une analyse de plusieurs playlists"""
+    names = [info["name"] for info in infos if info.get("name")]
+    owners = list(dict.fromkeys(info["owner"] for info in infos if info.get("owner")))
+    return {
+        "name": f"{len(infos)} playlists",
+        "description": ", ".join(names),
+        "owner": ", ".join(owners),
+        "image": next((info["image"] for info in infos if info.get("image")), "")
+    }
+
+
+def parse_playlist_urls(text: str) -> List[str]:
+    """URLs saisies une par ligne, ou séparées par des virgules ou des espaces"""
+    return list(dict.fromkeys(url for url in re.split(r"[\s,]+", text or "") if url))
+
+
+def is_profile_url(url: str) -> bool:
+    """URL de profil utilisateur (https://open.spotify.com/user/...)"""
+    return "/user/" in urlsplit(url).path
+
+
+class AnalysisService:
+    """Enchaîne récupération de la playlist, analyse d'ambiance et recommandation de cocktails
+
+    Le résultat est mis en cache sous (playlist_id, snapshot_id) : une playlist déjà analysée
+    et non modifiée ne coûte qu'une requête de métadonnées. Plusieurs playlists, ou toutes celles
+    d'un profil, peuvent être combinées en une seule analyse.
+    """
+
+    def __init__(self, spotify_client, cocktail_client, mood_analyzer,
+                 result_cache: Optional[TieredCache] = None, max_tracks: Optional[int] = None):
+        self.spotify_client = spotify_client
+        self.max_tracks = max_tracks
+        self.cocktail_client = cocktail_client
+        self.mood_analyzer = mood_analyzer
+        self.result_cache = result_cache or build_cache("analyses", maxsize=Config.ANALYSIS_CACHE_SIZE,
+                                                        ttl=Config.ANALYSIS_CACHE_TTL, path=Config.CACHE_DB_PATH)
+
+    def analyze(self, playlist_url: str, progress: Optional[Callable[[str], None]] = None) -> Dict[str, Any]:
+        """Analyse une playlist et renvoie infos, top artistes, caractéristiques, moods et cocktails
+
+        `progress(stage)` est appelé au début de chaque étape (playlist, artists, moods, cocktails).
+        """
+        progress = progress or (lambda stage: None)
+
+        # Métadonnées et première page de pistes en une seule requête
+        progress("playlist")
+        with stage_timer("playlist_fetch"):
+            snapshot = self.spotify_client.get_playlist_snapshot(playlist_url)
+        logging.debug(f"Playlist info: {snapshot.info}")
+
+        return self._analyze(
+            snapshot.playlist_id, snapshot.snapshot_id, snapshot.info,
+            lambda: self.spotify_client.get_snapshot_top_artists(snapshot, max_tracks=self.max_tracks),
+            progress, self.max_tracks
+        )
+
+    def analyze_playlists(self, playlist_urls: List[str], progress: Optional[Callable[[str], None]] = None,
+                          info: Optional[Dict[str, str]] = None, playlist_id: Optional[str] = None) -> Dict[str, Any]:
+        """Profil d'ambiance combiné de plusieurs playlists, en une seule analyse
+
+        Les pistes et artistes communs à plusieurs playlists ne sont comptés et demandés qu'une
+        fois. Au plus COMBINED_MAX_TRACKS_PER_PLAYLIST pistes sont lues par playlist. Une URL de
+        profil parmi les URLs est remplacée par les playlists publiques de l'utilisateur. Le
+        résultat est mis en cache sous l'ensemble des (playlist_id, snapshot_id).
+        """
+        progress = progress or (lambda stage: None)
+        progress("playlist")
+        if any(is_profile_url(url) for url in playlist_urls):
+            with stage_timer("playlist_fetch"):
+                playlist_urls = self._expand_profiles(playlist_urls)
+
+        if len(playlist_urls) > Config.MAX_PLAYLISTS_PER_ANALYSIS:
+            logging.warning(f"Analysis limited to the first {Config.MAX_PLAYLISTS_PER_ANALYSIS} "
+                            f"of {len(playlist_urls)} playlists")
+            playlist_urls = playlist_urls[:Config.MAX_PLAYLISTS_PER_ANALYSIS]
+
+        with stage_timer("playlist_fetch"):
+            snapshots = self.spotify_client.get_playlist_snapshots(playlist_urls)
+        if not snapshots:
+            raise SpotifyAPIError("No playlist to analyze", 404)
+
+        playlist_ids = sorted(snapshot.playlist_id for snapshot in snapshots)
+        playlist_id = playlist_id or f"playlists:{_digest(','.join(playlist_ids))}"
+        # Sans snapshot_id pour chaque playlist, la version de l'ensemble est inconnue : pas de cache
+        snapshot_id = ""
+        if all(snapshot.snapshot_id for snapshot in snapshots):
+            snapshot_id = _digest(",".join(sorted(f"{snapshot.playlist_id}:{snapshot.snapshot_id}"
+                                                  for snapshot in snapshots)))
+
+        max_tracks = Config.COMBINED_MAX_TRACKS_PER_PLAYLIST
+        if self.max_tracks is not None:
+            max_tracks = min(max_tracks, self.max_tracks)
+        result = self._analyze(
+            playlist_id, snapshot_id, info or combined_playlist_info([snapshot.info for snapshot in snapshots]),
+            lambda: self.spotify_client.get_playlists_top_artists(snapshots, max_tracks=max_tracks),
+            progress, max_tracks
+        )
+        result["playlists"] = [dict(snapshot.info, id=snapshot.playlist_id) for snapshot in snapshots]
+        return result
+
+    def analyze_profile(self, user_url: str, progress: Optional[Callable[[str], None]] = None) -> Dict[str, Any]:
+        """Profil d'ambiance combiné des playlists publiques d'un utilisateur Spotify"""
+        progress = progress or (lambda stage: None)
+
+        progress("playlist")
+        with stage_timer("playlist_fetch"):
+            profile = self.spotify_client.get_user_profile(user_url)
+            playlist_ids = self.spotify_client.get_user_playlist_ids(user_url,
+                                                                     limit=Config.MAX_PLAYLISTS_PER_ANALYSIS)
+        if not playlist_ids:
+            raise SpotifyAPIError("No public playlist found for this user", 404)
+
+        info = {
+            "name": profile["name"],
+            "description": f"{len(playlist_ids)} public playlists",
+            "owner": profile["name"],
+            "image": profile["image"]
+        }
+        return self.analyze_playlists(playlist_ids, progress, info=info, playlist_id=f"user:{profile['id']}")
+
+    def _expand_profiles(self, playlist_urls: List[str]) -> List[str]:
+        urls = []
+        for url in playlist_urls:
+            if is_profile_url(url):
+                urls.extend(self.spotify_client.get_user_playlist_ids(url, limit=Config.MAX_PLAYLISTS_PER_ANALYSIS))
+            else:
+                urls.append(url)
+        return urls
+
+    def _analyze(self, playlist_id: str, snapshot_id: str, info: Dict[str, str],
+                 get_top_artists: Callable[[], List[Tuple[str, int, List[str]]]],
+                 progress: Callable[[str], None], max_tracks: Optional[int]) -> Dict[str, Any]:
+        # Une analyse limitée à `max_tracks` pistes ne doit pas être servie à une analyse complète
+        cache_key = analysis_key(playlist_id, snapshot_id, max_tracks)
+        if snapshot_id:
+            cached = self.result_cache.get(cache_key)
+            if cached is not None:
+                progress("cocktails")
+                with stage_timer("cocktail_fetch"):
+                    result = self._from_cache(playlist_id, snapshot_id, info, cached)
+                if result is not None:
+                    logging.debug(f"Analysis cache hit for {cache_key}")
+                    return result
+
+        # Get top artists and their genres from playlist
+        progress("artists")
+        top_artists = get_top_artists()
+        logging.debug(f"Top artists: {top_artists}")
+
+        progress("moods")
+        with stage_timer("mood_computation"):
+            characteristics, mood_scores, dominant_moods = self._analyze_moods(top_artists)
+
+        # Get cocktail recommendations based on mood scores
+        progress("cocktails")
+        seed = analysis_seed(playlist_id, snapshot_id, max_tracks)
+        with stage_timer("cocktail_fetch"):
+            cocktails = self.cocktail_client.get_cocktails_by_moods(mood_scores, seed=seed,
+                                                                    characteristics=characteristics)
+            logging.debug(f"Number of cocktails recommended: {len(cocktails)}")
+
+            # Ensure we have some cocktails
+            if not cocktails:
+                logging.warning("No cocktails were returned, using fallback")
+                cocktails = self.cocktail_client.get_cocktails_by_moods(
+                    {"energetic": 100.0}, num_cocktails=1, seed=seed
+                )
+
+        if snapshot_id:
+            self.result_cache.set(cache_key, {
+                "top_artists": [list(artist) for artist in top_artists],
+                "characteristics": characteristics,
+                "mood_scores": mood_scores,
+                "dominant_moods": dominant_moods,
+                "cocktails": [{"id": cocktail.get("idDrink"),
+                               "mood_characteristics": cocktail.get("mood_characteristics", [])}
+                              for cocktail in cocktails]
+            })
+
+        return {
+            "playlist_id": playlist_id,
+            "snapshot_id": snapshot_id,
+            "playlist": info,
+            "top_artists": top_artists,
+            "characteristics": characteristics,
+            "mood_scores": mood_scores,
+            "dominant_moods": dominant_moods,
+            "cocktails": cocktails
+        }
+
+    def _analyze_moods(self, top_artists: List[Tuple[str, int, List[str]]]):
+        # Analyze the moods and get detailed characteristics
+        total_count = sum(count for _, count, _ in top_artists)
+        genres_with_weights = []
+        for _, count, genres in top_artists:
+            weight = count / total_count
+            if genres:
+                genres_with_weights.append((genres, weight))
+            else:
+                genres_with_weights.append((["pop"], weight))
+
+        # Get detailed characteristics
+        characteristics = self.mood_analyzer._calculate_playlist_characteristics(genres_with_weights)
+        characteristics_list = characteristics.tolist()  # Convert numpy array to list for JSON serialization
+
+        # Calculate mood scores based on characteristics
+        mood_scores = self.mood_analyzer._calculate_mood_scores(characteristics)
+        logging.debug(f"Mood scores: {mood_scores}")
+
+        dominant_moods = self.mood_analyzer.get_dominant_moods(mood_scores)
+        logging.debug(f"Dominant moods: {dominant_moods}")
+
+        return characteristics_list, mood_scores, dominant_moods
+
+    def _from_cache(self, playlist_id: str, snapshot_id: str, info: Dict[str, str],
+                    cached: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        cocktails = self.cocktail_client.get_cocktails_by_ids(cached["cocktails"])
+        if len(cocktails) != len(cached["cocktails"]):
+            # Un cocktail n'est plus disponible : on refait l'analyse
+            return None
+
+        return {
+            "playlist_id": playlist_id,
+            "snapshot_id": snapshot_id,
+            "playlist": info,
+            "top_artists": [tuple(artist) for artist in cached["top_artists"]],
+            "characteristics": cached["characteristics"],
+            "mood_scores": cached["mood_scores"],
+            "dominant_moods": cached["dominant_moods"],
+            "cocktails": cocktails
+        }
@@ -1,100 +1,194 @@
 from flask import Flask, render_template, request, redirect, url_for, session, jsonify
+import json
 import logging
-import os
-from spotify_client import SpotifyClient
-from cocktail_client import CocktailClient
-from mood_analyzer import MoodAnalyzer
+import requests
+from jobs import JobManager, JobQueueFull
+from serializers import serialize_analysis
+from analysis import is_profile_url, parse_playlist_urls
+from spotify_client import SpotifyAPIError, SpotifyAuthError
+from compression import compressed_json
+from assets import AssetManifest, send_dist_asset
 from config import Config
+from services import Services
+import metrics
 
 app = Flask(__name__)
 app.config.from_object(Config)
 logging.basicConfig(level=logging.DEBUG)
 
-try:
-    spotify_client = SpotifyClient()
-    cocktail_client = CocktailClient()
-    mood_analyzer = MoodAnalyzer()
-except Exception as e:
-    logging.error(f"Failed to initialize clients: {str(e)}")
+# Assets versionnés générés par `python assets.py` (fichiers d'origine si absents)
+asset_manifest = AssetManifest()
+app.jinja_env.globals.update(asset_url=asset_manifest.url, has_asset=asset_manifest.has)
+
+# Analyses asynchrones : pool borné, indépendant des workers HTTP
+job_manager = JobManager(max_workers=Config.JOB_WORKERS, max_pending=Config.JOB_MAX_PENDING, ttl=Config.JOB_TTL,
+                         max_finished=Config.JOB_MAX_FINISHED)
+
+# Clients construits au premier accès : l'import de l'application ne fait aucun appel réseau
+services = Services()
+
+@app.before_request
+def ensure_warm_up():
+    # Serveurs sans hook post-fork (flask run) : le préchauffage démarre à la première requête
+    services.start_warm_up()
 
 @app.route('/')
 def index():
     return render_template('index.html')
 
+def get_analysis_service():
+    return services.analysis_service
+
+def requested_playlists(payload):
+    """URLs demandées : liste `playlist_urls` (JSON) ou `playlist_url`, une ou plusieurs URLs par ligne"""
+    playlist_urls = payload.get('playlist_urls')
+    if isinstance(playlist_urls, list):
+        return list(dict.fromkeys(url.strip() for url in playlist_urls if isinstance(url, str) and url.strip()))
+    return parse_playlist_urls(payload.get('playlist_url'))
+
+def run_analysis(playlist_urls, progress=None):
+    """Une playlist, plusieurs playlists combinées, ou toutes les playlists publiques d'un profil"""
+    service = get_analysis_service()
+    if len(playlist_urls) > 1:
+        return service.analyze_playlists(playlist_urls, progress=progress)
+    if is_profile_url(playlist_urls[0]):
+        return service.analyze_profile(playlist_urls[0], progress=progress)
+    return service.analyze(playlist_urls[0], progress=progress)
+
+def render_results(result):
+    playlist_info = result["playlist"]
+    top_artists = result["top_artists"]
+    with metrics.stage_timer("template_render"):
+        return render_template('results.html',
+                              playlist_name=playlist_info["name"], playlist_owner=playlist_info["owner"],
+                              playlist_description=playlist_info["description"], playlist_image=playlist_info["image"],
+                              artists=[(name, count) for name, count, _ in top_artists],
+                              artist_genres=[(name, genres) for name, _, genres in top_artists],
+                              mood_scores=result["mood_scores"],
+                              dominant_moods=result["dominant_moods"],
+                              characteristics=result["characteristics"],
+                              cocktails=result["cocktails"])
+
+def error_response(error):
+    """Message affiché et statut HTTP d'une analyse en échec, d'après le type d'erreur et le statut Spotify"""
+    if isinstance(error, SpotifyAuthError):
+        return "Failed to authenticate with Spotify. Please check the API credentials.", 500
+    status_code = error.status_code if isinstance(error, SpotifyAPIError) else None
+    if status_code in (400, 404):
+        # ID invalide ou ressource absente : c'est l'URL demandée qui est en cause
+        return ("Playlist or profile not found, or the URL is invalid. Please check the URL and try again.",
+                status_code)
+    if status_code == 429:
+        return "Spotify is temporarily unavailable. Please try again later.", 503
+    if (status_code or 0) >= 500 or isinstance(error, (requests.RequestException, ConnectionError, TimeoutError)):
+        return "Spotify is temporarily unavailable. Please try again later.", 502
+    return "An error occurred while analyzing the playlist. Please try again later.", 500
+
+def user_error_message(error):
+    return error_response(error)[0]
+
 @app.route('/analyze', methods=['POST'])
 def analyze():
-    playlist_url = request.form.get('playlist_url')
-    if not playlist_url:
+    playlist_urls = requested_playlists(request.form)
+    if not playlist_urls:
         return render_template('index.html', error="Please provide a Spotify playlist URL")
 
     try:
-        if not hasattr(app, 'spotify_client'):
-            app.spotify_client = SpotifyClient()
-        if not hasattr(app, 'cocktail_client'):
-            app.cocktail_client = CocktailClient()
-        if not hasattr(app, 'mood_analyzer'):
-            app.mood_analyzer = MoodAnalyzer()
-
-        # Get top artists and their genres from playlist
-        top_artists = app.spotify_client.get_playlist_top_artists(playlist_url)
-        logging.debug(f"Top artists: {top_artists}")
-
-        playlist_info = app.spotify_client.get_playlist_info(playlist_url)
-        logging.debug(f"Playlist info: {playlist_info}")
-
-        # Analyze the moods and get detailed characteristics
-        total_count = sum(count for _, count, _ in top_artists)
-        genres_with_weights = []
-        for _, count, genres in top_artists:
-            weight = count / total_count
-            if genres:
-                genres_with_weights.append((genres, weight))
-            else:
-                genres_with_weights.append((["pop"], weight))
-
-        # Get detailed characteristics
-        characteristics = app.mood_analyzer._calculate_playlist_characteristics(genres_with_weights)
-        characteristics_list = characteristics.tolist()  # Convert numpy array to list for JSON serialization
-
-        # Calculate mood scores based on characteristics
-        mood_scores = app.mood_analyzer._calculate_mood_scores(characteristics)
-        logging.debug(f"Mood scores: {mood_scores}")
-
-        dominant_moods = app.mood_analyzer.get_dominant_moods(mood_scores)
-        logging.debug(f"Dominant moods: {dominant_moods}")
-
-        # Get cocktail recommendations based on mood scores
-        cocktails = app.cocktail_client.get_cocktails_by_moods(mood_scores)
-        logging.debug(f"Number of cocktails recommended: {len(cocktails)}")
-
-        # Ensure we have some cocktails
-        if not cocktails:
-            logging.warning("No cocktails were returned, using fallback")
-            cocktails = app.cocktail_client.get_cocktails_by_moods(
-                {"energetic": 100.0}, num_cocktails=1
-            )
+        return render_results(run_analysis(playlist_urls))
 
-        return render_template('results.html',
-                              playlist_name=playlist_info["name"], playlist_owner=playlist_info["owner"],
-                              playlist_description=playlist_info["description"], playlist_image=playlist_info["image"],
-                              artists=[(name, count) for name, count, _ in top_artists],
-                              artist_genres=[(name, genres) for name, _, genres in top_artists],
-                              mood_scores=mood_scores,
-                              dominant_moods=dominant_moods,
-                              characteristics=characteristics_list,
-                              cocktails=cocktails)
+    except Exception as e:
+        logging.error(f"Error in analyze route: {str(e)}")
+        return render_template('index.html', error=user_error_message(e))
+
+@app.route('/api/analyze', methods=['POST'])
+def api_analyze():
+    payload = request.get_json(silent=True) or request.form
+    playlist_urls = requested_playlists(payload)
+    if not playlist_urls:
+        return compressed_json({"error": "Please provide a Spotify playlist URL"}, 400)
+
+    try:
+        return compressed_json(serialize_analysis(run_analysis(playlist_urls)))
 
     except Exception as e:
-        error_message = str(e)
-        if "token" in error_message.lower():
-            error_message = "Failed to authenticate with Spotify. Please check the API credentials."
-        elif "playlist" in error_message.lower():
-            error_message = "Invalid playlist URL or playlist not found. Please check the URL and try again."
-        else:
-            error_message = "An error occurred while analyzing the playlist. Please try again later."
+        logging.error(f"Error in api_analyze route: {str(e)}")
+        message, status = error_response(e)
+        return compressed_json({"error": message}, status)
 
-        logging.error(f"Error in analyze route: {str(e)}")
-        return render_template('index.html', error=error_message)
+@app.route('/api/jobs', methods=['POST'])
+def create_job():
+    payload = request.get_json(silent=True) or request.form
+    playlist_urls = requested_playlists(payload)
+    if not playlist_urls:
+        return jsonify({"error": "Please provide a Spotify playlist URL"}), 400
+
+    try:
+        job = job_manager.submit(run_analysis, playlist_urls)
+    except JobQueueFull as e:
+        logging.warning(f"Rejecting analysis job: {str(e)}")
+        return jsonify({"error": "Too many analyses in progress. Please try again later."}), 503
+
+    return jsonify({
+        "job_id": job.id,
+        "status_url": url_for('job_status', job_id=job.id),
+        "events_url": url_for('job_events', job_id=job.id),
+        "result_url": url_for('job_result', job_id=job.id)
+    }), 202
+
+@app.route('/api/jobs/<job_id>')
+def job_status(job_id):
+    job = job_manager.get(job_id)
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+    status = job.to_dict()
+    if job.error:
+        status["error"] = user_error_message(job.exception)
+    return jsonify(status)
+
+@app.route('/api/jobs/<job_id>/events')
+def job_events(job_id):
+    job = job_manager.get(job_id)
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+
+    def stream():
+        version = -1
+        while True:
+            current = job_manager.wait(job, version, timeout=15)
+            if current == version:
+                # Commentaire SSE : garde la connexion ouverte derrière les proxies
+                yield ": keep-alive\n\n"
+                continue
+            version = current
+            status = job.to_dict()
+            if job.error:
+                status["error"] = user_error_message(job.exception)
+            yield f"event: progress\ndata: {json.dumps(status)}\n\n"
+            if job.finished:
+                return
+
+    return app.response_class(stream(), mimetype='text/event-stream',
+                              headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@app.route('/jobs/<job_id>')
+def job_result(job_id):
+    job = job_manager.get(job_id)
+    if job is None:
+        return render_template('index.html', error="This analysis has expired. Please submit the playlist again."), 404
+    if job.status == "failed":
+        return render_template('index.html', error=user_error_message(job.exception))
+    if job.status != "done":
+        return render_template('job.html', job_id=job.id)
+
+    # Le résultat n'est rendu qu'une fois : il n'occupe pas la mémoire jusqu'à l'expiration du job
+    result = job_manager.take_result(job)
+    if result is None:
+        return render_template('index.html', error="This analysis has expired. Please submit the playlist again."), 404
+    try:
+        return render_results(result)
+    except Exception as e:
+        logging.error(f"Error rendering job {job_id}: {str(e)}")
+        return render_template('index.html', error=user_error_message(e))
 
 @app.route('/visualization')
 def visualization():
@@ -102,42 +196,33 @@ def visualization():
 
 @app.route('/api/visualization-data')
 def visualization_data():
-    # Calculer les connexions entre genres et cocktails
-    nodes = []
-    links = []
-
-    # Ajouter les genres principaux
-    main_genres = list(mood_analyzer.base_characteristics.keys())
-    for genre in main_genres:
-        nodes.append({
-            "id": f"genre_{genre}",
-            "name": genre.title(),
-            "type": "genre"
-        })
-
-    # Ajouter les cocktails principaux de chaque mood
-    cocktail_mapping = cocktail_client.mood_cocktail_mapping
-    for mood, cocktails in cocktail_mapping.items():
-        for cocktail in cocktails[:3]:  # Limiter à 3 cocktails par mood
-            nodes.append({
-                "id": f"cocktail_{cocktail}",
-                "name": cocktail,
-                "type": "cocktail"
-            })
-
-            # Créer des liens basés sur les caractéristiques
-            for genre in main_genres:
-                genre_chars = mood_analyzer._get_genre_characteristics(genre)
-                mood_scores = mood_analyzer._calculate_mood_scores(genre_chars)
-
-                if mood in mood_scores and mood_scores[mood] > 20:  # Seuil de connexion
-                    links.append({
-                        "source": f"genre_{genre}",
-                        "target": f"cocktail_{cocktail}",
-                        "value": mood_scores[mood] / 100  # Normaliser entre 0 et 1
-                    })
-
-    return jsonify({"nodes": nodes, "links": links})
+    payload, etag = services.visualization_graph.get()
+    response = app.response_class(payload, mimetype='application/json')
+    response.set_etag(etag)
+    # Le client revalide à chaque fois et reçoit un 304 si le graphe n'a pas changé
+    response.cache_control.no_cache = True
+    return response.make_conditional(request)
+
+@app.route('/static/dist/<path:filename>')
+def dist_asset(filename):
+    return send_dist_asset(filename)
+
+@app.route('/healthz')
+def healthz():
+    # Vivacité : le processus répond, sans dépendre des APIs externes
+    return jsonify({"status": "ok"})
+
+@app.route('/readyz')
+def readyz():
+    # Disponibilité : token Spotify obtenu et graphe de visualisation construit
+    readiness = services.readiness()
+    return jsonify(readiness), 200 if readiness["ready"] else 503
+
+@app.route('/metrics')
+def metrics_endpoint():
+    # Métriques du processus courant, au format texte Prometheus
+    return app.response_class(metrics.render(), mimetype='text/plain; version=0.0.4')
 
 if __name__ == '__main__':
+    services.start_warm_up()
     app.run(host='0.0.0.0', port=5000, debug=True)
\ No newline at end of file
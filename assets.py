@@ -0,0 +1,181 @@
+"""Pipeline des assets statiques : noms versionnés, variantes pré-compressées et icônes
+
+Usage :
+    python assets.py            # génère static/dist/ et static/dist/manifest.json
+
+Chaque fichier de static/css et static/js est copié sous un nom contenant le hash de son
+contenu (style.3f2a9c1b.css), accompagné de variantes .gz et .br. L'icône generated-icon.png
+est déclinée en plusieurs tailles si Pillow est installé. Les templates passent par
+`asset_url()`, qui consulte le manifest et retombe sur le fichier d'origine s'il est absent.
+"""
+import gzip
+import hashlib
+import io
+import json
+import logging
+import mimetypes
+import os
+import shutil
+import sys
+from typing import Dict, Optional
+
+from flask import request, send_from_directory, url_for
+
+try:
+    import brotli
+except ImportError:  # brotli est optionnel : seules les variantes gzip sont produites
+    brotli = None
+
+try:
+    from PIL import Image
+except ImportError:  # Pillow est optionnel : pas d'icônes redimensionnées
+    Image = None
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+STATIC_DIR = os.path.join(ROOT, "static")
+DIST_DIR = os.path.join(STATIC_DIR, "dist")
+MANIFEST_NAME = "manifest.json"
+ICON_SOURCE = os.path.join(ROOT, "generated-icon.png")
+
+# Sous-dossiers de static/ traités par le pipeline
+ASSET_DIRS = ("css", "js")
+COMPRESSIBLE_EXTENSIONS = {".css", ".js", ".svg", ".json", ".html", ".txt"}
+# En dessous de cette taille, la variante compressée n'apporte rien
+MIN_COMPRESS_SIZE = 512
+# Favicon, apple-touch-icon et icônes de manifest web
+ICON_SIZES = (32, 180, 192, 512)
+
+# Un an : les noms versionnés changent à chaque modification du contenu
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+
+
+def _hashed_name(path: str, content: bytes) -> str:
+    stem, extension = os.path.splitext(path)
+    return f"{stem}.{hashlib.sha256(content).hexdigest()[:12]}{extension}"
+
+
+def _write(dist_dir: str, name: str, content: bytes) -> None:
+    target = os.path.join(dist_dir, name)
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    with open(target, "wb") as f:
+        f.write(content)
+
+
+def _write_compressed(dist_dir: str, name: str, content: bytes) -> None:
+    if os.path.splitext(name)[1] not in COMPRESSIBLE_EXTENSIONS or len(content) < MIN_COMPRESS_SIZE:
+        return
+    # mtime fixe : la sortie est reproductible d'un build à l'autre
+    _write(dist_dir, f"{name}.gz", gzip.compress(content, compresslevel=9, mtime=0))
+    if brotli is not None:
+        _write(dist_dir, f"{name}.br", brotli.compress(content, quality=11))
+
+
+def _resize_icon(source: str, size: int) -> bytes:
+    with Image.open(source) as image:
+        icon = image.convert("RGBA")
+        icon.thumbnail((size, size), Image.LANCZOS)
+        output = io.BytesIO()
+        icon.save(output, format="PNG", optimize=True)
+        return output.getvalue()
+
+
+def build(static_dir: str = STATIC_DIR, dist_dir: str = DIST_DIR,
+          icon_source: Optional[str] = ICON_SOURCE) -> Dict[str, str]:
+    """Génère le dossier dist/ et son manifest ; renvoie le manifest (nom logique -> chemin sous static/)"""
+    if os.path.isdir(dist_dir):
+        shutil.rmtree(dist_dir)
+    os.makedirs(dist_dir)
+    dist_prefix = os.path.relpath(dist_dir, static_dir).replace(os.sep, "/")
+
+    manifest = {}
+    for asset_dir in ASSET_DIRS:
+        for dirpath, _, filenames in os.walk(os.path.join(static_dir, asset_dir)):
+            for filename in sorted(filenames):
+                path = os.path.join(dirpath, filename)
+                logical_name = os.path.relpath(path, static_dir).replace(os.sep, "/")
+                with open(path, "rb") as f:
+                    content = f.read()
+                name = _hashed_name(logical_name, content)
+                _write(dist_dir, name, content)
+                _write_compressed(dist_dir, name, content)
+                manifest[logical_name] = f"{dist_prefix}/{name}"
+
+    if icon_source and os.path.exists(icon_source):
+        if Image is None:
+            logging.warning("Pillow is not installed, skipping resized icons")
+        else:
+            for size in ICON_SIZES:
+                logical_name = f"icons/icon-{size}.png"
+                content = _resize_icon(icon_source, size)
+                name = _hashed_name(logical_name, content)
+                _write(dist_dir, name, content)
+                manifest[logical_name] = f"{dist_prefix}/{name}"
+
+    with open(os.path.join(dist_dir, MANIFEST_NAME), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+        f.write("\n")
+    return manifest
+
+
+class AssetManifest:
+    """Manifest des assets versionnés, rechargé si le fichier change (nouveau build)"""
+
+    def __init__(self, path: str = os.path.join(DIST_DIR, MANIFEST_NAME)):
+        self.path = path
+        self._mtime = None
+        self._entries: Dict[str, str] = {}
+
+    def entries(self) -> Dict[str, str]:
+        try:
+            mtime = os.path.getmtime(self.path)
+        except OSError:
+            # Pas de build : les templates utilisent les fichiers d'origine
+            self._mtime, self._entries = None, {}
+            return self._entries
+        if mtime != self._mtime:
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    self._entries = json.load(f)
+            except (OSError, ValueError) as e:
+                logging.warning(f"Unable to read asset manifest {self.path}: {str(e)}")
+                self._entries = {}
+            self._mtime = mtime
+        return self._entries
+
+    def has(self, filename: str) -> bool:
+        return filename in self.entries()
+
+    def url(self, filename: str) -> str:
+        """URL de l'asset versionné, ou du fichier d'origine s'il n'a pas été généré"""
+        return url_for("static", filename=self.entries().get(filename, filename))
+
+
+def send_dist_asset(filename: str, dist_dir: str = DIST_DIR):
+    """Sert un asset versionné, pré-compressé si possible, avec un cache immuable"""
+    response = None
+    for encoding, suffix in (("br", ".br"), ("gzip", ".gz")):
+        if request.accept_encodings[encoding] and os.path.isfile(os.path.join(dist_dir, filename + suffix)):
+            response = send_from_directory(dist_dir, filename + suffix, max_age=IMMUTABLE_MAX_AGE)
+            response.headers["Content-Encoding"] = encoding
+            # Le type MIME est celui du fichier d'origine, pas de l'archive
+            response.mimetype = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+            break
+    if response is None:
+        response = send_from_directory(dist_dir, filename, max_age=IMMUTABLE_MAX_AGE)
+
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    response.vary.add("Accept-Encoding")
+    return response
+
+
+def main() -> int:
+    logging.basicConfig(level=logging.INFO, stream=sys.stderr)
+    manifest = build()
+    for logical_name, path in sorted(manifest.items()):
+        print(f"{logical_name} -> {path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
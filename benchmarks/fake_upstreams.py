@@ -0,0 +1,268 @@
+"""Faux serveurs Spotify et CocktailDB pour les benchmarks hors ligne
+
+Les réponses sont générées de façon déterministe à partir des IDs demandés. La latence,
+le taux d'erreur (503) et la taille des payloads sont configurables.
+
+Usage autonome (pour lancer l'application à la main contre les faux serveurs) :
+    python -m benchmarks.fake_upstreams --latency-ms 30 --tracks 300
+"""
+import argparse
+import hashlib
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+GENRES = [
+    "pop", "dance pop", "indie pop", "rock", "alternative rock", "hard rock", "punk rock",
+    "hip hop", "trap", "rap", "electronic", "house", "deep house", "techno", "edm",
+    "jazz", "smooth jazz", "classical", "r&b", "soul", "funk", "metal", "heavy metal",
+    "folk", "indie folk", "country", "latin", "reggaeton", "k-pop", "ambient", "lo-fi"
+]
+
+COCKTAIL_CATEGORIES = ["Cocktail", "Ordinary Drink", "Punch / Party Drink", "Shot"]
+COCKTAIL_GLASSES = ["Cocktail glass", "Highball glass", "Old-fashioned glass", "Champagne flute"]
+INGREDIENTS = ["Vodka", "Gin", "Rum", "Tequila", "Whiskey", "Lime juice", "Sugar syrup",
+               "Mint", "Soda water", "Triple sec", "Vermouth", "Bitters", "Champagne", "Coffee liqueur"]
+
+
+def _stable_int(value: str) -> int:
+    return int(hashlib.md5(value.encode("utf-8")).hexdigest()[:12], 16)
+
+
+class FakeUpstream:
+    """Serveur HTTP lancé dans un thread ; les sous-classes implémentent `route`"""
+
+    def __init__(self, latency: float = 0.0, error_rate: float = 0.0, host: str = "127.0.0.1", port: int = 0):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.requests = 0
+        self.errors = 0
+        self._stats_lock = threading.Lock()
+        self._random = random.Random(0)
+        upstream = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                upstream._handle(self, "GET")
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                if length:
+                    self.rfile.read(length)
+                upstream._handle(self, "POST")
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        self._thread = threading.Thread(target=self.server.serve_forever, name=type(self).__name__, daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "FakeUpstream":
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def route(self, method: str, path: str, query: Dict[str, str]) -> Tuple[int, Any]:
+        raise NotImplementedError
+
+    def _handle(self, handler: BaseHTTPRequestHandler, method: str) -> None:
+        if self.latency:
+            time.sleep(self.latency)
+
+        with self._stats_lock:
+            self.requests += 1
+            failed = self.error_rate and self._random.random() < self.error_rate
+            if failed:
+                self.errors += 1
+
+        if failed:
+            status, payload = 503, {"error": {"status": 503, "message": "Service unavailable"}}
+        else:
+            parts = urlsplit(handler.path)
+            query = {key: values[-1] for key, values in parse_qs(parts.query).items()}
+            status, payload = self.route(method, parts.path, query)
+
+        body = json.dumps(payload).encode("utf-8")
+        handler.send_response(status)
+        handler.send_header("Content-Type", "application/json")
+        handler.send_header("Content-Length", str(len(body)))
+        if status == 503:
+            handler.send_header("Retry-After", "0")
+        handler.end_headers()
+        handler.wfile.write(body)
+
+
+class FakeSpotify(FakeUpstream):
+    """Endpoints token, playlist, pistes et artistes de l'API Spotify
+
+    Chaque playlist contient `tracks` pistes réparties sur un catalogue de `artists` artistes ;
+    `padding` ajoute autant d'octets par piste pour simuler des payloads complets (sauf si la
+    requête filtre les champs avec `fields=`, comme le fait Spotify).
+    """
+
+    def __init__(self, tracks: int = 200, artists: int = 1000, padding: int = 0, **kwargs):
+        super().__init__(**kwargs)
+        self.tracks = tracks
+        self.artists = artists
+        self.padding = "x" * padding
+
+    @property
+    def api_url(self) -> str:
+        return f"{self.url}/v1"
+
+    @property
+    def token_url(self) -> str:
+        return f"{self.url}/api/token"
+
+    def route(self, method: str, path: str, query: Dict[str, str]) -> Tuple[int, Any]:
+        segments = [segment for segment in path.split("/") if segment]
+        if method == "POST" and segments == ["api", "token"]:
+            return 200, {"access_token": "fake-token", "token_type": "Bearer", "expires_in": 3600}
+        if method != "GET" or segments[:1] != ["v1"]:
+            return 404, {"error": {"status": 404, "message": "Not found"}}
+
+        filtered = "fields" in query
+        if len(segments) == 3 and segments[1] == "playlists":
+            return 200, self.playlist(segments[2], filtered)
+        if len(segments) == 4 and segments[1] == "playlists" and segments[3] == "tracks":
+            return 200, self.tracks_page(segments[2], int(query.get("offset", 0)), int(query.get("limit", 100)),
+                                         filtered)
+        if segments[1:] == ["artists"]:
+            return 200, {"artists": [self.artist(artist_id) for artist_id in query.get("ids", "").split(",")]}
+        if len(segments) == 3 and segments[1] == "artists":
+            return 200, self.artist(segments[2])
+        return 404, {"error": {"status": 404, "message": "Not found"}}
+
+    def playlist(self, playlist_id: str, filtered: bool = False) -> Dict[str, Any]:
+        return {
+            "name": f"Benchmark playlist {playlist_id}",
+            "description": "Generated playlist",
+            "snapshot_id": f"snapshot-{playlist_id}",
+            "owner": {"display_name": "benchmark"},
+            "images": [{"url": "https://example.invalid/cover.jpg"}],
+            "tracks": self.tracks_page(playlist_id, 0, 100, filtered)
+        }
+
+    def tracks_page(self, playlist_id: str, offset: int, limit: int, filtered: bool = False) -> Dict[str, Any]:
+        end = min(self.tracks, offset + limit)
+        next_url = None
+        if end < self.tracks:
+            next_url = f"{self.api_url}/playlists/{playlist_id}/tracks?offset={end}&limit={limit}"
+        return {"items": [self._track(playlist_id, index, filtered) for index in range(offset, end)],
+                "next": next_url, "total": self.tracks}
+
+    def _track(self, playlist_id: str, index: int, filtered: bool = False) -> Dict[str, Any]:
+        # Distribution biaisée : quelques artistes reviennent souvent, comme dans une vraie playlist
+        rng = random.Random(_stable_int(f"{playlist_id}:{index}"))
+        artist_index = min(int(rng.paretovariate(1.2)) - 1 + _stable_int(playlist_id) % 50, self.artists - 1)
+        track = {"track": {"id": f"{playlist_id}-{index}", "artists": [{"id": f"artist{artist_index}"}]}}
+        if self.padding and not filtered:
+            track["track"]["album"] = {"name": self.padding}
+        return track
+
+    def artist(self, artist_id: str) -> Optional[Dict[str, Any]]:
+        if not artist_id.startswith("artist"):
+            return None
+        rng = random.Random(_stable_int(artist_id))
+        return {"id": artist_id, "name": f"Artist {artist_id[6:]}", "genres": rng.sample(GENRES, rng.randint(0, 3))}
+
+
+class FakeCocktailDB(FakeUpstream):
+    """Endpoints search.php et lookup.php de TheCocktailDB ; tout nom de cocktail existe"""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self._names: Dict[str, str] = {}
+
+    @property
+    def api_url(self) -> str:
+        return f"{self.url}/api/json/v1/1"
+
+    def route(self, method: str, path: str, query: Dict[str, str]) -> Tuple[int, Any]:
+        if path.endswith("/search.php"):
+            name = query.get("s", "")
+            if not name:
+                return 200, {"drinks": None}
+            drink = self.drink(name)
+            self._names[drink["idDrink"]] = name
+            return 200, {"drinks": [drink]}
+        if path.endswith("/lookup.php"):
+            name = self._names.get(query.get("i", ""))
+            return 200, {"drinks": [self.drink(name)] if name else None}
+        return 404, {"error": "Not found"}
+
+    @staticmethod
+    def drink(name: str) -> Dict[str, Any]:
+        rng = random.Random(_stable_int(name.lower()))
+        drink = {
+            "idDrink": str(10000 + _stable_int(name.lower()) % 90000),
+            "strDrink": name,
+            "strCategory": rng.choice(COCKTAIL_CATEGORIES),
+            "strGlass": rng.choice(COCKTAIL_GLASSES),
+            "strInstructions": f"Mix the {name} ingredients and serve.",
+            "strDrinkThumb": "https://example.invalid/drink.jpg"
+        }
+        ingredients: List[str] = rng.sample(INGREDIENTS, rng.randint(2, 5))
+        for position, ingredient in enumerate(ingredients, start=1):
+            drink[f"strIngredient{position}"] = ingredient
+            drink[f"strMeasure{position}"] = f"{rng.randint(1, 4)} cl"
+        return drink
+
+
+def upstream_environ(spotify: FakeSpotify, cocktaildb: FakeCocktailDB) -> Dict[str, str]:
+    """Variables d'environnement qui redirigent l'application vers les faux serveurs"""
+    return {
+        "SPOTIFY_API_URL": spotify.api_url,
+        "SPOTIFY_TOKEN_URL": spotify.token_url,
+        "SPOTIFY_CLIENT_ID": "benchmark",
+        "SPOTIFY_CLIENT_SECRET": "benchmark",
+        "COCKTAILDB_API_URL": cocktaildb.api_url
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Faux serveurs Spotify et CocktailDB")
+    parser.add_argument("--spotify-port", type=int, default=8901)
+    parser.add_argument("--cocktaildb-port", type=int, default=8902)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--tracks", type=int, default=200)
+    parser.add_argument("--artists", type=int, default=1000)
+    parser.add_argument("--padding", type=int, default=0, help="Octets ajoutés à chaque piste")
+    args = parser.parse_args()
+
+    latency = args.latency_ms / 1000
+    spotify = FakeSpotify(tracks=args.tracks, artists=args.artists, padding=args.padding, latency=latency,
+                          error_rate=args.error_rate, port=args.spotify_port).start()
+    cocktaildb = FakeCocktailDB(latency=latency, error_rate=args.error_rate, port=args.cocktaildb_port).start()
+    for key, value in upstream_environ(spotify, cocktaildb).items():
+        print(f"export {key}={value}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+"""Benchmark de charge de bout en bout : gunicorn + faux serveurs Spotify/CocktailDB
+
+Usage :
+    python -m benchmarks.load_test --requests 500 --concurrency 16 --latency-ms 20
+    python -m benchmarks.load_test --endpoint /api/analyze --playlists 20 --json
+
+Chaque requête analyse une playlist parmi `--playlists` (par défaut toutes différentes,
+donc sans cache d'analyse). Le rapport donne le débit et les latences p50/p95/p99.
+"""
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Sequence
+
+import requests
+
+from benchmarks.fake_upstreams import FakeCocktailDB, FakeSpotify, upstream_environ
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def percentile(values: Sequence[float], pct: float) -> float:
+    """Percentile par interpolation linéaire (0 si aucune valeur)"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * pct / 100
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def summarize(latencies: List[float], failures: int, elapsed: float) -> Dict[str, Any]:
+    total = len(latencies) + failures
+    return {
+        "requests": total,
+        "failures": failures,
+        "elapsed_s": round(elapsed, 3),
+        "req_per_s": round(total / elapsed, 2) if elapsed else 0.0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 1),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 1),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 1),
+        "max_ms": round(max(latencies) * 1000, 1) if latencies else 0.0
+    }
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_gunicorn(port: int, env: Dict[str, str], workers: int, threads: int,
+                   verbose: bool = False) -> subprocess.Popen:
+    command = [sys.executable, "-m", "gunicorn", "--bind", f"127.0.0.1:{port}", "--workers", str(workers),
+               "--worker-class", "gthread", "--threads", str(threads), "--log-level", "warning", "app:app"]
+    # Les logs DEBUG de l'application ralentiraient le benchmark et noieraient le rapport
+    output = None if verbose else subprocess.DEVNULL
+    return subprocess.Popen(command, cwd=ROOT, env=env, stdout=output, stderr=output)
+
+
+def wait_until_ready(base_url: str, process: subprocess.Popen, timeout: float = 60.0) -> None:
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise Exception(f"gunicorn exited with status {process.returncode} (use --verbose to see its logs)")
+        try:
+            # Worker préchauffé (token obtenu auprès du faux Spotify, graphe construit)
+            if requests.get(f"{base_url}/readyz", timeout=1).status_code == 200:
+                return
+        except requests.RequestException:
+            pass
+        time.sleep(0.2)
+    raise Exception(f"Application not ready after {timeout:.0f}s")
+
+
+def run_load(base_url: str, endpoint: str, total: int, concurrency: int, playlists: int,
+             offset: int = 0) -> Dict[str, Any]:
+    """Envoie `total` analyses avec `concurrency` clients et mesure chaque requête"""
+    local = threading.local()
+    latencies: List[float] = []
+    failures = [0]
+    lock = threading.Lock()
+
+    def one(index: int) -> None:
+        session = getattr(local, "session", None)
+        if session is None:
+            session = local.session = requests.Session()
+        playlist_url = f"https://open.spotify.com/playlist/bench{(offset + index) % playlists}"
+        start = time.perf_counter()
+        try:
+            if endpoint == "/api/analyze":
+                response = session.post(f"{base_url}{endpoint}", json={"playlist_url": playlist_url}, timeout=60)
+                ok = response.status_code == 200
+            else:
+                response = session.post(f"{base_url}{endpoint}", data={"playlist_url": playlist_url}, timeout=60)
+                # Les erreurs d'analyse sont rendues dans index.html avec un statut 200
+                ok = response.status_code == 200 and "results-container" in response.text
+        except requests.RequestException:
+            ok = False
+        duration = time.perf_counter() - start
+
+        with lock:
+            if ok:
+                latencies.append(duration)
+            else:
+                failures[0] += 1
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(one, range(total)))
+    return summarize(latencies, failures[0], time.perf_counter() - start)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark de charge de l'analyse de playlists")
+    parser.add_argument("--requests", type=int, default=200, help="Nombre total de requêtes")
+    parser.add_argument("--concurrency", type=int, default=16, help="Clients simultanés")
+    parser.add_argument("--endpoint", choices=["/analyze", "/api/analyze"], default="/analyze")
+    parser.add_argument("--playlists", type=int, default=0,
+                        help="Nombre de playlists distinctes (0 = une par requête, pas de cache d'analyse)")
+    parser.add_argument("--warmup", type=int, default=10, help="Requêtes non mesurées avant le benchmark")
+    parser.add_argument("--workers", type=int, default=2, help="Workers gunicorn")
+    parser.add_argument("--threads", type=int, default=8, help="Threads par worker gunicorn")
+    parser.add_argument("--latency-ms", type=float, default=20.0, help="Latence des faux serveurs")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Part de réponses 503 des faux serveurs")
+    parser.add_argument("--tracks", type=int, default=200, help="Pistes par playlist")
+    parser.add_argument("--artists", type=int, default=1000, help="Taille du catalogue d'artistes")
+    parser.add_argument("--padding", type=int, default=0, help="Octets ajoutés à chaque piste")
+    parser.add_argument("--json", action="store_true", help="Rapport au format JSON")
+    parser.add_argument("--verbose", action="store_true", help="Afficher les logs de gunicorn et de l'application")
+    args = parser.parse_args(argv)
+
+    latency = args.latency_ms / 1000
+    playlists = args.playlists or args.requests + args.warmup
+
+    with FakeSpotify(tracks=args.tracks, artists=args.artists, padding=args.padding,
+                     latency=latency, error_rate=args.error_rate) as spotify, \
+            FakeCocktailDB(latency=latency, error_rate=args.error_rate) as cocktaildb, \
+            tempfile.TemporaryDirectory() as tmpdir:
+        env = dict(os.environ)
+        env.update(upstream_environ(spotify, cocktaildb))
+        env["SPOTIFY_TOKEN_CACHE"] = os.path.join(tmpdir, "token.json")
+        env.setdefault("CACHE_DB_PATH", "")
+        # Les faux serveurs ne limitent pas le débit : on mesure l'application, pas le limiteur
+        env.setdefault("SPOTIFY_RATE_LIMIT", "0")
+        env.setdefault("COCKTAILDB_RATE_LIMIT", "0")
+
+        port = _free_port()
+        base_url = f"http://127.0.0.1:{port}"
+        process = start_gunicorn(port, env, args.workers, args.threads, verbose=args.verbose)
+        try:
+            wait_until_ready(base_url, process)
+            if args.warmup:
+                # Playlists décalées : l'échauffement ne pré-remplit pas le cache d'analyse des requêtes mesurées
+                run_load(base_url, args.endpoint, args.warmup, min(args.concurrency, args.warmup), playlists,
+                         offset=args.requests)
+            report = run_load(base_url, args.endpoint, args.requests, args.concurrency, playlists)
+        finally:
+            process.terminate()
+            process.wait(timeout=30)
+
+        report.update({"endpoint": args.endpoint, "concurrency": args.concurrency, "workers": args.workers,
+                       "threads": args.threads, "upstream_latency_ms": args.latency_ms,
+                       "upstream_requests": spotify.requests + cocktaildb.requests})
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print(f"{report['requests']} requests on {report['endpoint']} in {report['elapsed_s']}s "
+              f"({report['failures']} failed)")
+        print(f"  throughput: {report['req_per_s']} req/s")
+        print(f"  latency: p50 {report['p50_ms']} ms, p95 {report['p95_ms']} ms, "
+              f"p99 {report['p99_ms']} ms, max {report['max_ms']} ms")
+        print(f"  upstream requests: {report['upstream_requests']}")
+    return 1 if report["failures"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,271 @@
+"""Micro-benchmark de MoodAnalyzer avec détection de régressions
+
+Usage :
+    python -m benchmarks.mood_analyzer_bench                      # mesure et compare à la baseline
+    python -m benchmarks.mood_analyzer_bench --sizes 10 1000      # tailles de corpus réduites
+    python -m benchmarks.mood_analyzer_bench --save-baseline      # enregistre une nouvelle baseline
+
+Les corpus sont des chaînes de genre synthétiques tirées selon une loi de Zipf (quelques
+genres très fréquents, une longue traîne de genres rares ou inconnus). Les temps sont
+exprimés en nanosecondes par chaîne de genre et normalisés par une mesure de calibration,
+pour que la baseline reste comparable d'une machine à l'autre. La commande échoue (code 1)
+si un cas est plus lent que la baseline au-delà du seuil (`--threshold`).
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from mood_analyzer import MoodAnalyzer
+
+SIZES = (10, 1_000, 100_000, 1_000_000)
+VOCABULARY_SIZE = 20_000
+ZIPF_EXPONENT = 1.1
+DEFAULT_THRESHOLD = 0.25
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "mood_analyzer_baseline.json")
+
+# Durée minimale mesurée par cas : les petits corpus sont répétés pour limiter le bruit
+MIN_TIME = 0.2
+MAX_RUNS = 10_000
+
+PREFIXES = ["", "", "", "french", "uk", "k", "latin", "german", "brazilian", "nordic", "deep", "modern",
+            "classic", "underground", "melodic", "vapor", "neo", "post", "afro", "nu"]
+STEMS = ["pop", "rap", "rock", "electronic", "classical", "jazz", "metal", "indie", "soul", "folk",
+         "ambient", "latin", "blues", "punk", "house", "techno", "edm", "hip hop", "r&b", "core", "wave",
+         "country", "reggae", "disco", "funk", "gospel", "opera", "grunge", "drill", "shoegaze"]
+MODIFIERS = ["", "", "", "", "alternative", "dance", "trap", "hardcore", "progressive", "psychedelic",
+             "experimental", "lo-fi", "dark", "chill"]
+
+
+def make_vocabulary(size: int = VOCABULARY_SIZE, seed: int = 0) -> List[str]:
+    """Chaînes de genre distinctes, des plus courantes (genres simples) aux plus rares"""
+    rng = np.random.default_rng(seed)
+    vocabulary = list(dict.fromkeys(STEMS))
+    seen = set(vocabulary)
+    while len(vocabulary) < size:
+        words = [PREFIXES[rng.integers(len(PREFIXES))], MODIFIERS[rng.integers(len(MODIFIERS))],
+                 STEMS[rng.integers(len(STEMS))]]
+        if rng.random() < 0.1:
+            # Genres inconnus des tables (retombent sur "pop")
+            words[-1] = "".join(chr(97 + c) for c in rng.integers(0, 26, size=int(rng.integers(4, 10))))
+        genre = " ".join(word for word in words if word)
+        if genre not in seen:
+            seen.add(genre)
+            vocabulary.append(genre)
+    return vocabulary
+
+
+def make_corpus(size: int, seed: int = 0, vocabulary: Optional[List[str]] = None) -> List[str]:
+    """Tire `size` chaînes de genre selon une loi de Zipf sur le vocabulaire"""
+    vocabulary = vocabulary or make_vocabulary(seed=seed)
+    ranks = np.arange(1, len(vocabulary) + 1)
+    probabilities = 1.0 / ranks ** ZIPF_EXPONENT
+    probabilities /= probabilities.sum()
+    indices = np.random.default_rng(seed + 1).choice(len(vocabulary), size=size, p=probabilities)
+    return [vocabulary[i] for i in indices]
+
+
+def make_playlists(corpus: Sequence[str], seed: int = 0) -> List[List[Tuple[List[str], float]]]:
+    """Regroupe le corpus en playlists de 5 artistes ayant 1 à 3 genres chacun"""
+    rng = np.random.default_rng(seed + 2)
+    playlists = []
+    position = 0
+    while position < len(corpus):
+        genres_with_weights = []
+        for count in (rng.integers(20, 60), 15, 10, 6, 4):
+            if position >= len(corpus):
+                break
+            num_genres = int(rng.integers(1, 4))
+            genres_with_weights.append((list(corpus[position:position + num_genres]), float(count)))
+            position += num_genres
+        total = sum(weight for _, weight in genres_with_weights)
+        playlists.append([(genres, weight / total) for genres, weight in genres_with_weights])
+    return playlists
+
+
+def _base_genre_case(corpus):
+    analyzer = MoodAnalyzer()
+    return lambda: [analyzer._get_base_genre(genre) for genre in corpus]
+
+
+def _genre_characteristics_case(corpus):
+    # Cache froid à chaque passe : un nouvel analyseur par mesure
+    def setup():
+        analyzer = MoodAnalyzer()
+        return lambda: [analyzer._get_genre_characteristics(genre) for genre in corpus]
+    return setup
+
+
+def _playlist_characteristics_case(corpus):
+    analyzer = MoodAnalyzer()
+    playlists = make_playlists(corpus)
+    return lambda: [analyzer._calculate_playlist_characteristics(playlist) for playlist in playlists]
+
+
+def _mood_scores_case(corpus):
+    analyzer = MoodAnalyzer()
+    characteristics = np.random.default_rng(3).random((len(corpus), 5))
+    return lambda: [analyzer._calculate_mood_scores(row) for row in characteristics]
+
+
+def _analyze_batch_case(corpus):
+    analyzer = MoodAnalyzer()
+    playlists = make_playlists(corpus)
+    return lambda: analyzer.analyze_batch(playlists)
+
+
+# Nom du cas -> fabrique (corpus -> fonction mesurée, ou setup renvoyant la fonction mesurée)
+CASES: Dict[str, Callable] = {
+    "get_base_genre": _base_genre_case,
+    "get_genre_characteristics": _genre_characteristics_case,
+    "calculate_playlist_characteristics": _playlist_characteristics_case,
+    "calculate_mood_scores": _mood_scores_case,
+    "analyze_batch": _analyze_batch_case
+}
+NEEDS_SETUP = {"get_genre_characteristics"}
+
+
+def time_case(factory: Callable, corpus: Sequence[str], needs_setup: bool = False,
+              min_time: float = MIN_TIME) -> float:
+    """Meilleur temps d'une passe sur le corpus, en secondes"""
+    prepared = factory(corpus)
+    best = float("inf")
+    elapsed = 0.0
+    runs = 0
+    while runs < 1 or (elapsed < min_time and runs < MAX_RUNS):
+        fn = prepared() if needs_setup else prepared
+        start = time.perf_counter()
+        fn()
+        duration = time.perf_counter() - start
+        best = min(best, duration)
+        elapsed += duration
+        runs += 1
+    return best
+
+
+def calibrate(min_time: float = MIN_TIME) -> float:
+    """Temps de référence (ns) d'une charge mêlant Python et petites opérations NumPy"""
+    vector = np.linspace(0, 1, 5)
+    words = [f"genre {i}" for i in range(1000)]
+
+    def workload():
+        total = 0
+        for word in words:
+            total += len(word.lower().split())
+            np.clip(vector + 0.1, 0, 1)
+        return total
+
+    return time_case(lambda corpus: workload, [], min_time=min_time) * 1e9
+
+
+def measure(name: str, corpus: Sequence[str], min_time: float = MIN_TIME) -> float:
+    """Temps d'un cas en ns par chaîne de genre"""
+    seconds = time_case(CASES[name], corpus, needs_setup=name in NEEDS_SETUP, min_time=min_time)
+    return round(seconds * 1e9 / len(corpus), 2)
+
+
+def confirm_regressions(current: Dict[str, Any], baseline: Dict[str, Any], threshold: float,
+                        attempts: int, min_time: float = MIN_TIME) -> None:
+    """Remesure les cas en régression et garde le meilleur temps, pour écarter les à-coups ponctuels"""
+    vocabulary = make_vocabulary()
+    for _ in range(attempts):
+        regressed = [key for key, _, _, _, is_regression in compare(current, baseline, threshold) if is_regression]
+        if not regressed:
+            return
+        for key in regressed:
+            name, size = key.rsplit("/", 1)
+            corpus = make_corpus(int(size), vocabulary=vocabulary)
+            current["results"][key] = min(current["results"][key], measure(name, corpus, min_time))
+
+
+def run(sizes: Sequence[int] = SIZES, cases: Optional[Sequence[str]] = None,
+        min_time: float = MIN_TIME) -> Dict[str, Any]:
+    """Mesure chaque cas pour chaque taille et renvoie les ns par chaîne de genre"""
+    vocabulary = make_vocabulary()
+    results = {}
+    # Calibration répétée entre les tailles : on garde le minimum, moins sensible aux à-coups de la machine
+    calibrations = [calibrate(min_time)]
+    for size in sizes:
+        corpus = make_corpus(size, vocabulary=vocabulary)
+        for name in cases or CASES:
+            results[f"{name}/{size}"] = measure(name, corpus, min_time)
+        calibrations.append(calibrate(min_time))
+    return {
+        "calibration_ns": round(min(calibrations), 1),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "results": results
+    }
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any],
+            threshold: float = DEFAULT_THRESHOLD) -> List[Tuple[str, float, float, float, bool]]:
+    """Compare deux mesures normalisées par leur calibration
+
+    Renvoie (cas, ns baseline, ns courant, ratio normalisé, régression) pour les cas communs.
+    """
+    scale = baseline["calibration_ns"] / current["calibration_ns"]
+    rows = []
+    for key, current_ns in current["results"].items():
+        baseline_ns = baseline["results"].get(key)
+        if not baseline_ns:
+            continue
+        ratio = current_ns * scale / baseline_ns
+        rows.append((key, baseline_ns, current_ns, ratio, ratio > 1 + threshold))
+    return rows
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Micro-benchmark de MoodAnalyzer")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(SIZES), help="Tailles de corpus")
+    parser.add_argument("--cases", nargs="+", choices=list(CASES), default=None, help="Cas à mesurer")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="Fichier JSON de baseline")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="Ralentissement toléré par rapport à la baseline (0.25 = +25%%)")
+    parser.add_argument("--min-time", type=float, default=MIN_TIME, help="Durée minimale mesurée par cas (s)")
+    parser.add_argument("--confirm", type=int, default=2,
+                        help="Nombre de nouvelles mesures d'un cas en régression avant d'échouer")
+    parser.add_argument("--save-baseline", action="store_true", help="Enregistrer les mesures comme baseline")
+    args = parser.parse_args(argv)
+
+    if not args.save_baseline and not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}, run with --save-baseline first", file=sys.stderr)
+        return 2
+
+    current = run(args.sizes, args.cases, args.min_time)
+
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(current, f, indent=2, sort_keys=True)
+            f.write("\n")
+        for key, ns in current["results"].items():
+            print(f"{key:45} {ns:12.1f} ns/genre")
+        print(f"Baseline saved to {args.baseline}")
+        return 0
+
+    with open(args.baseline, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+
+    confirm_regressions(current, baseline, args.threshold, args.confirm, args.min_time)
+
+    regressions = 0
+    print(f"{'case':45} {'baseline':>12} {'current':>12} {'ratio':>7}")
+    for key, baseline_ns, current_ns, ratio, regressed in compare(current, baseline, args.threshold):
+        regressions += regressed
+        flag = "  REGRESSION" if regressed else ""
+        print(f"{key:45} {baseline_ns:12.1f} {current_ns:12.1f} {ratio:7.2f}{flag}")
+    print(f"calibration: baseline {baseline['calibration_ns']:.0f} ns, current {current['calibration_ns']:.0f} ns")
+
+    if regressions:
+        print(f"{regressions} case(s) slower than baseline by more than {args.threshold:.0%}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
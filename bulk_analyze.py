@@ -0,0 +1,180 @@
+"""Analyse hors ligne d'un lot de playlists (sans passer par la route Flask /analyze)
+
+Usage :
+    python bulk_analyze.py playlists.txt -o results.jsonl --workers 8 --rate 20
+    cat playlists.txt | python bulk_analyze.py - -o results.jsonl --resume
+
+Chaque ligne d'entrée est un ID ou une URL de playlist Spotify. Les résultats sont écrits
+au fil de l'eau en JSONL ; avec --resume, les playlists déjà présentes sans erreur dans le
+fichier de sortie sont ignorées.
+"""
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import sys
+import tempfile
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+from analysis import AnalysisService
+from cocktail_client import CocktailClient
+from config import Config
+from http_transport import get_transport
+from mood_analyzer import MoodAnalyzer
+from rate_limiter import BATCH, build_rate_limiter
+from spotify_client import SpotifyClient
+
+# État propre à chaque processus du pool (initialisé par _init_worker)
+_service = None
+_init_error = ""
+
+
+def read_playlist_ids(lines: Iterable[str]) -> List[str]:
+    """Extrait les IDs de playlist (dédupliqués, ordre conservé) ; ignore lignes vides et commentaires"""
+    playlist_ids = []
+    for line in lines:
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        playlist_ids.append(SpotifyClient._parse_playlist_id(line))
+    return list(dict.fromkeys(playlist_ids))
+
+
+def read_checkpoint(path: str) -> Set[str]:
+    """IDs déjà analysés avec succès dans un fichier de sortie existant"""
+    done = set()
+    if not os.path.exists(path):
+        return done
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                # Dernière ligne tronquée par un arrêt brutal
+                continue
+            if record.get("playlist_id") and "error" not in record:
+                done.add(record["playlist_id"])
+    return done
+
+
+def to_record(result: Dict[str, Any]) -> Dict[str, Any]:
+    """Version sérialisable et compacte d'un résultat d'AnalysisService"""
+    return {
+        "playlist_id": result["playlist_id"],
+        "snapshot_id": result["snapshot_id"],
+        "playlist_name": result["playlist"]["name"],
+        "top_artists": [list(artist) for artist in result["top_artists"]],
+        "characteristics": result["characteristics"],
+        "mood_scores": result["mood_scores"],
+        "dominant_moods": result["dominant_moods"],
+        "cocktails": [{"id": cocktail.get("idDrink"), "name": cocktail.get("strDrink"),
+                       "mood_characteristics": cocktail.get("mood_characteristics", [])}
+                      for cocktail in result["cocktails"]]
+    }
+
+
+def _init_worker(cache_db_path: str, rate: Optional[float], rate_dir: str, max_tracks: Optional[int]) -> None:
+    global _service, _init_error
+    # Le cache SQLite partagé déduplique les recherches d'artistes entre tous les processus
+    Config.CACHE_DB_PATH = cache_db_path
+    # Les seaux à jetons sont partagés avec les autres processus (y compris les workers web) ;
+    # --rate ajoute un plafond commun aux seuls processus de cette analyse
+    transport = get_transport()
+    if rate is not None:
+        transport.rate_limiter = build_rate_limiter(cap=rate, cap_state_dir=rate_dir)
+    # Trafic de fond : les analyses interactives passent en premier
+    transport.rate_limiter.default_priority = BATCH
+
+    # Une exception dans l'initializer ferait relancer les workers du pool en boucle
+    try:
+        _service = AnalysisService(SpotifyClient(), CocktailClient(), MoodAnalyzer(), max_tracks=max_tracks)
+    except Exception as e:
+        _init_error = str(e)
+
+
+def _analyze_one(playlist_id: str) -> Dict[str, Any]:
+    if _service is None:
+        return {"playlist_id": playlist_id, "error": f"Worker initialization failed: {_init_error}"}
+    try:
+        return to_record(_service.analyze(playlist_id))
+    except Exception as e:
+        logging.error(f"Failed to analyze playlist {playlist_id}: {str(e)}")
+        return {"playlist_id": playlist_id, "error": str(e)}
+
+
+def run(playlist_ids: List[str], output, workers: int, rate: Optional[float], cache_db_path: str,
+        max_tracks: Optional[int] = None) -> Dict[str, int]:
+    """Analyse les playlists avec un pool de processus et écrit chaque résultat dès qu'il arrive"""
+    stats = {"ok": 0, "error": 0}
+    if not playlist_ids:
+        return stats
+
+    with tempfile.TemporaryDirectory(prefix="cartel_bulk_rate_") as rate_dir, \
+            multiprocessing.Pool(processes=workers, initializer=_init_worker,
+                                 initargs=(cache_db_path, rate, rate_dir, max_tracks)) as pool:
+        for record in pool.imap_unordered(_analyze_one, playlist_ids):
+            output.write(json.dumps(record, ensure_ascii=False) + "\n")
+            output.flush()
+            stats["error" if "error" in record else "ok"] += 1
+            done = stats["ok"] + stats["error"]
+            if done % 100 == 0:
+                logging.info(f"{done}/{len(playlist_ids)} playlists analysed")
+    return stats
+
+
+def _terminate_last_line(path: str) -> None:
+    """Termine une éventuelle ligne tronquée avant d'ajouter de nouveaux résultats"""
+    if not os.path.exists(path) or os.path.getsize(path) == 0:
+        return
+    with open(path, "rb+") as f:
+        f.seek(-1, os.SEEK_END)
+        if f.read(1) != b"\n":
+            f.write(b"\n")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Analyse hors ligne de playlists Spotify (JSONL en sortie)")
+    parser.add_argument("input", nargs="?", default="-", help="Fichier d'IDs/URLs de playlists ('-' = stdin)")
+    parser.add_argument("-o", "--output", default="-", help="Fichier JSONL de sortie ('-' = stdout)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Nombre de processus")
+    parser.add_argument("--rate", type=float, default=None,
+                        help="Plafond de requêtes sortantes par seconde et par API pour cette analyse, "
+                             "tous processus confondus, en plus du budget commun SPOTIFY_RATE_LIMIT / "
+                             "COCKTAILDB_RATE_LIMIT partagé avec les workers web (0 = pas de plafond)")
+    parser.add_argument("--cache-db", default=Config.CACHE_DB_PATH or "bulk_cache.db",
+                        help="Fichier SQLite partagé des caches artistes/cocktails/analyses")
+    parser.add_argument("--max-tracks", type=int, default=None, help="Nombre maximal de pistes lues par playlist")
+    parser.add_argument("--resume", action="store_true",
+                        help="Reprendre : ignorer les playlists déjà présentes dans le fichier de sortie")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, stream=sys.stderr)
+
+    if args.resume and args.output == "-":
+        parser.error("--resume requires --output to be a file")
+
+    if args.input == "-":
+        playlist_ids = read_playlist_ids(sys.stdin)
+    else:
+        with open(args.input, "r", encoding="utf-8") as f:
+            playlist_ids = read_playlist_ids(f)
+
+    if args.resume:
+        done = read_checkpoint(args.output)
+        playlist_ids = [playlist_id for playlist_id in playlist_ids if playlist_id not in done]
+        logging.info(f"Resuming: {len(done)} playlists already done, {len(playlist_ids)} remaining")
+
+    if args.output == "-":
+        stats = run(playlist_ids, sys.stdout, args.workers, args.rate, args.cache_db, args.max_tracks)
+    else:
+        _terminate_last_line(args.output)
+        with open(args.output, "a", encoding="utf-8") as output:
+            stats = run(playlist_ids, output, args.workers, args.rate, args.cache_db, args.max_tracks)
+
+    logging.info(f"Done: {stats['ok']} analysed, {stats['error']} failed")
+    return 1 if stats["error"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
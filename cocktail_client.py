@@ -1,12 +1,34 @@
-import requests
+import contextvars
+import logging
 import random
-from typing import List, Dict, Any
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Optional
+import requests
 from config import Config
+from http_transport import get_transport
+from cache import build_cache
+from cocktail_index import CocktailIndex
+from singleflight import SingleFlight
+
+# Valeur mise en cache pour un cocktail introuvable (sérialisable, contrairement à un objet sentinelle)
+MISSING_DRINK: Dict[str, Any] = {}
 
 class CocktailClient:
-    def __init__(self):
+    def __init__(self, transport=None, index: Optional[CocktailIndex] = None):
+        self.http = transport or get_transport()
         self.api_key = Config.COCKTAILDB_API_KEY
-        self.base_url = "https://www.thecocktaildb.com/api/json/v1/1"
+        self.base_url = Config.COCKTAILDB_API_URL
+        # Pool borné pour les recherches de cocktails concurrentes
+        self._executor = ThreadPoolExecutor(max_workers=Config.COCKTAIL_FETCH_WORKERS,
+                                            thread_name_prefix="cocktail-fetch")
+        # Les fiches CocktailDB ne changent quasiment jamais : cache LRU/TTL, persistant si configuré
+        self.cache = build_cache("cocktails", maxsize=Config.COCKTAIL_CACHE_SIZE,
+                                 ttl=Config.COCKTAIL_CACHE_TTL, path=Config.CACHE_DB_PATH)
+        # Catalogue local (python cocktail_index.py) : recommandations sans appel réseau
+        self.index = index if index is not None else CocktailIndex.load(Config.COCKTAIL_INDEX_PATH)
+        # Recherches identiques simultanées (même nom, même ID) : un seul appel CocktailDB
+        self.flight = SingleFlight("cocktails", handoff_dir=Config.SINGLE_FLIGHT_DIR,
+                                   lock_timeout=Config.SINGLE_FLIGHT_LOCK_TIMEOUT)
 
         # Mapping enrichi des moods vers les cocktails
         self.mood_cocktail_mapping = {
@@ -39,11 +61,31 @@ class CocktailClient:
             "romantic": ["elegant", "delicate", "floral", "sparkling"],
             "dark": ["bold", "complex", "intense", "mysterious"]
         }
+        # Incrémentée à chaque set_mood_cocktails (cf. VisualizationGraph)
+        self.mapping_version = 0
 
-    def get_cocktails_by_moods(self, mood_scores: Dict[str, float], num_cocktails: int = 3) -> List[Dict[str, Any]]:
+    def set_mood_cocktails(self, mood: str, cocktail_names: List[str]) -> None:
+        """Remplace les cocktails d'un mood (le mapping ne doit pas être modifié directement)"""
+        self.mood_cocktail_mapping = {**self.mood_cocktail_mapping, mood: list(cocktail_names)}
+        self.mapping_version += 1
+
+    def get_cocktails_by_moods(self, mood_scores: Dict[str, float], num_cocktails: int = 3,
+                               seed: Optional[int] = None,
+                               characteristics: Optional[List[float]] = None) -> List[Dict[str, Any]]:
         """
         Récupère des cocktails basés sur les scores de différents moods
+
+        Avec un `seed`, le tirage est reproductible (même seed et mêmes scores => mêmes cocktails).
+        Si un index local est chargé et que les `characteristics` de la playlist sont fournies,
+        les cocktails sont les plus proches voisins de la playlist dans le catalogue complet.
         """
+        if self.index is not None and characteristics is not None:
+            cocktails = self._get_cocktails_from_index(characteristics, num_cocktails, seed)
+            if cocktails:
+                return cocktails
+
+        rng = random.Random(seed) if seed is not None else random
+
         # Ensure all mood scores are present with at least 0.0
         all_moods = ["energetic", "chill", "romantic", "dark"]
         mood_scores = {mood: mood_scores.get(mood, 0.0) for mood in all_moods}
@@ -56,30 +98,146 @@ class CocktailClient:
             max_mood = max(mood_scores.items(), key=lambda x: x[1])
             significant_moods = {max_mood[0]: max_mood[1]}
 
-        selected_cocktails = []
+        # Tirage des cocktails pour chaque mood significatif
+        selections = []
         for mood in significant_moods:
-            # Select cocktails for each significant mood
             available_cocktails = self.mood_cocktail_mapping[mood]
             num_to_select = min(max(1, int(num_cocktails * significant_moods[mood] / 100)), len(available_cocktails))
-            selected_names = random.sample(available_cocktails, num_to_select)
-
-            for cocktail_name in selected_names:
-                response = requests.get(f"{self.base_url}/search.php?s={cocktail_name}")
-                if response.status_code == 200 and response.json().get("drinks"):
-                    cocktail_data = response.json()["drinks"][0]
-                    # Ajouter les caractéristiques du mood
-                    cocktail_data["mood_characteristics"] = random.sample(
-                        self.cocktail_characteristics[mood], 
-                        k=min(2, len(self.cocktail_characteristics[mood]))
-                    )
-                    selected_cocktails.append(cocktail_data)
+            selected_names = rng.sample(available_cocktails, num_to_select)
+            selections.extend((mood, cocktail_name) for cocktail_name in selected_names)
+
+        # Recherches lancées en parallèle ; map() conserve l'ordre du tirage
+        drinks = self._map(self._fetch_cocktail, [cocktail_name for _, cocktail_name in selections])
+
+        selected_cocktails = []
+        for (mood, _), cocktail_data in zip(selections, drinks):
+            if cocktail_data:
+                # Ajouter les caractéristiques du mood
+                cocktail_data["mood_characteristics"] = rng.sample(
+                    self.cocktail_characteristics[mood],
+                    k=min(2, len(self.cocktail_characteristics[mood]))
+                )
+                selected_cocktails.append(cocktail_data)
 
         # If we still don't have any cocktails, fallback to a default
         if not selected_cocktails:
-            response = requests.get(f"{self.base_url}/search.php?s=Margarita")
-            if response.status_code == 200 and response.json().get("drinks"):
-                cocktail_data = response.json()["drinks"][0]
+            # Dernier recours : on retente même si la recherche vient d'échouer
+            cocktail_data = self._fetch_cocktail("Margarita", retry_missing=True)
+            if cocktail_data:
                 cocktail_data["mood_characteristics"] = ["refreshing", "bright"]
                 selected_cocktails.append(cocktail_data)
 
-        return selected_cocktails
\ No newline at end of file
+        return selected_cocktails
+
+    def _get_cocktails_from_index(self, characteristics: List[float], num_cocktails: int,
+                                  seed: Optional[int]) -> List[Dict[str, Any]]:
+        rng = random.Random(seed) if seed is not None else random
+        cocktails = []
+        for position in self.index.recommend(characteristics, num_cocktails, seed=seed):
+            cocktail_data = dict(self.index.drinks[position])
+            mood = self.index.dominant_mood(position, self.cocktail_characteristics)
+            cocktail_data["mood_characteristics"] = rng.sample(
+                self.cocktail_characteristics[mood], k=min(2, len(self.cocktail_characteristics[mood]))
+            )
+            cocktails.append(cocktail_data)
+        return cocktails
+
+    def get_cocktails_by_ids(self, selections: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Recharge des cocktails déjà choisis à partir de leurs IDs
+        (`selections` : liste de {"id", "mood_characteristics"}) ; les IDs introuvables sont ignorés
+        """
+        drinks = self._map(self._fetch_cocktail_by_id, [selection["id"] for selection in selections])
+
+        cocktails = []
+        for selection, cocktail_data in zip(selections, drinks):
+            if cocktail_data:
+                cocktail_data["mood_characteristics"] = list(selection.get("mood_characteristics", []))
+                cocktails.append(cocktail_data)
+        return cocktails
+
+    def prewarm(self) -> int:
+        """Charge dans le cache tous les cocktails du mapping ; renvoie le nombre de fiches disponibles"""
+        names = {"Margarita"}
+        for cocktails in self.mood_cocktail_mapping.values():
+            names.update(cocktails)
+        warmed = sum(1 for drink in self._map(self._fetch_cocktail, sorted(names)) if drink)
+        logging.info(f"Cocktail cache warmed with {warmed}/{len(names)} drinks")
+        return warmed
+
+    def _map(self, fn, items) -> List[Any]:
+        """Comme executor.map (ordre conservé), en propageant le contexte de l'appelant (priorité des appels sortants)"""
+        futures = [self._executor.submit(contextvars.copy_context().run, fn, item) for item in items]
+        return [future.result() for future in futures]
+
+    def _cache_miss(self, cache_key: str) -> None:
+        # Absence mémorisée peu de temps, et seulement en mémoire : l'entrée n'est pas remontée
+        # depuis le cache persistant avec la durée de vie d'une vraie fiche
+        self.cache.memory.set(cache_key, MISSING_DRINK, ttl=Config.COCKTAIL_MISS_TTL)
+
+    def _fetch_cocktail(self, cocktail_name: str, retry_missing: bool = False) -> Optional[Dict[str, Any]]:
+        """Recherche un cocktail par son nom (via le cache) et renvoie une copie du premier résultat (ou None)
+
+        Un nom introuvable récemment n'est pas redemandé, sauf avec `retry_missing`.
+        """
+        cache_key = cocktail_name.lower()
+        cocktail_data = self.cache.get(cache_key)
+        if cocktail_data is None or (retry_missing and cocktail_data == MISSING_DRINK):
+            cocktail_data = self.flight.do(f"search:{cache_key}", lambda: self._search_cocktail(cocktail_name))
+            if cocktail_data is None:
+                self._cache_miss(cache_key)
+                return None
+            self.cache.set(cache_key, cocktail_data)
+            if cocktail_data.get("idDrink"):
+                self.cache.set(f"id:{cocktail_data['idDrink']}", cocktail_data)
+        elif cocktail_data == MISSING_DRINK:
+            return None
+
+        # Copie : l'appelant ajoute ses propres clés (mood_characteristics)
+        return dict(cocktail_data)
+
+    def _fetch_cocktail_by_id(self, cocktail_id: str) -> Optional[Dict[str, Any]]:
+        """Récupère un cocktail par son ID (via le cache) et renvoie une copie (ou None)"""
+        if self.index is not None:
+            cocktail_data = self.index.get(cocktail_id)
+            if cocktail_data is not None:
+                return cocktail_data
+
+        cache_key = f"id:{cocktail_id}"
+        cocktail_data = self.cache.get(cache_key)
+        if cocktail_data is None:
+            cocktail_data = self.flight.do(f"id:{cocktail_id}", lambda: self._lookup_cocktail(cocktail_id))
+            if cocktail_data is None:
+                self._cache_miss(cache_key)
+                return None
+            self.cache.set(cache_key, cocktail_data)
+        elif cocktail_data == MISSING_DRINK:
+            return None
+
+        return dict(cocktail_data)
+
+    def _lookup_cocktail(self, cocktail_id: str) -> Optional[Dict[str, Any]]:
+        try:
+            response = self.http.get(f"{self.base_url}/lookup.php?i={cocktail_id}")
+        except requests.RequestException as e:
+            logging.error(f"Failed to look up cocktail {cocktail_id}: {str(e)}")
+            return None
+
+        if response.status_code != 200:
+            return None
+
+        drinks = response.json().get("drinks")
+        return drinks[0] if drinks else None
+
+    def _search_cocktail(self, cocktail_name: str) -> Optional[Dict[str, Any]]:
+        try:
+            response = self.http.get(f"{self.base_url}/search.php?s={cocktail_name}")
+        except requests.RequestException as e:
+            logging.error(f"Failed to fetch cocktail {cocktail_name}: {str(e)}")
+            return None
+
+        if response.status_code != 200:
+            return None
+
+        drinks = response.json().get("drinks")
+        return drinks[0] if drinks else None
@@ -0,0 +1,295 @@
+"""Miroir local du catalogue CocktailDB et recommandation par plus proches voisins
+
+Usage :
+    python cocktail_index.py                 # télécharge le catalogue vers COCKTAIL_INDEX_PATH
+    python cocktail_index.py -o cocktails.json.gz
+
+L'ingestion parcourt search.php?f=a..z et 0..9 et enregistre les fiches (sans champs vides)
+dans un JSON gzippé. Au chargement, chaque cocktail reçoit un vecteur dans l'espace de
+MoodAnalyzer (energy, danceability, emotion, intensity, sophistication) déduit de ses
+ingrédients, de sa catégorie et de son verre ; la recommandation est alors une requête
+NumPy en mémoire, sans appel réseau.
+"""
+import argparse
+import gzip
+import json
+import logging
+import os
+import random
+import re
+import string
+import sys
+import unicodedata
+from typing import Any, Dict, Iterable, List, Optional, Pattern, Sequence, Tuple
+
+import numpy as np
+
+from config import Config
+from http_transport import get_transport
+from mood_analyzer import MoodAnalyzer
+from rate_limiter import BATCH, priority
+
+FORMAT_VERSION = 1
+# Nombre maximal d'ingrédients d'une fiche CocktailDB (strIngredient1..15)
+MAX_INGREDIENTS = 15
+# Le premier ingrédient (l'alcool de base, le plus souvent) pèse plus que les suivants
+SECONDARY_INGREDIENT_WEIGHT = 0.6
+# Les cocktails recommandés sont tirés parmi les N plus proches voisins (N = facteur x nombre demandé)
+CANDIDATE_POOL_FACTOR = 3
+
+# Décalages par rapport au vecteur neutre (0.5, ...) : (energy, danceability, emotion, intensity, sophistication)
+# La clé la plus longue présente comme mot (ou au pluriel) dans le nom de l'ingrédient s'applique :
+# "ginger beer" l'emporte sur "beer", et "gin" ne s'applique pas à "ginger"
+INGREDIENT_MODIFIERS = {
+    "tequila": [0.2, 0.2, 0.0, 0.1, -0.05],
+    "mezcal": [0.1, 0.0, 0.1, 0.2, 0.1],
+    "dark rum": [0.0, 0.1, 0.1, 0.15, 0.05],
+    "rum": [0.1, 0.2, 0.05, 0.0, -0.05],
+    "cachaca": [0.15, 0.2, 0.0, 0.05, -0.05],
+    "vodka": [0.1, 0.1, -0.05, 0.1, -0.05],
+    "gin": [0.05, 0.0, 0.05, 0.0, 0.15],
+    "bourbon": [-0.1, -0.1, 0.1, 0.2, 0.15],
+    "scotch": [-0.15, -0.15, 0.1, 0.2, 0.2],
+    "whiskey": [-0.1, -0.1, 0.1, 0.2, 0.15],
+    "whisky": [-0.1, -0.1, 0.1, 0.2, 0.15],
+    "rye": [-0.1, -0.1, 0.05, 0.2, 0.15],
+    "cognac": [-0.1, -0.1, 0.15, 0.1, 0.2],
+    "brandy": [-0.1, -0.1, 0.15, 0.1, 0.15],
+    "champagne": [0.1, 0.05, 0.2, -0.1, 0.15],
+    "prosecco": [0.1, 0.1, 0.15, -0.1, 0.1],
+    "sparkling wine": [0.1, 0.05, 0.15, -0.1, 0.1],
+    "vermouth": [-0.05, -0.1, 0.05, 0.05, 0.15],
+    "campari": [0.0, -0.05, 0.0, 0.15, 0.15],
+    "aperol": [0.05, 0.05, 0.05, 0.0, 0.1],
+    "absinthe": [0.1, -0.1, 0.0, 0.25, 0.1],
+    "bitters": [0.0, -0.05, 0.0, 0.1, 0.1],
+    "coffee": [0.2, -0.05, -0.1, 0.15, 0.05],
+    "espresso": [0.2, -0.05, -0.1, 0.15, 0.1],
+    "kahlua": [0.1, 0.0, 0.0, 0.1, 0.0],
+    "chocolate": [0.0, 0.0, 0.15, 0.05, 0.0],
+    "creme de cacao": [0.0, 0.0, 0.15, 0.05, 0.0],
+    "cream": [-0.1, 0.0, 0.1, -0.1, 0.0],
+    "milk": [-0.1, 0.0, 0.1, -0.1, -0.05],
+    "baileys": [-0.05, 0.0, 0.1, -0.05, 0.0],
+    "coconut": [0.0, 0.15, 0.1, -0.1, -0.05],
+    "egg white": [0.0, 0.0, 0.05, -0.05, 0.1],
+    "red wine": [-0.05, -0.05, 0.15, 0.05, 0.1],
+    "wine": [0.0, 0.0, 0.1, 0.0, 0.05],
+    "ginger beer": [0.15, 0.1, 0.0, 0.05, 0.0],
+    "ginger ale": [0.1, 0.1, 0.0, 0.0, -0.05],
+    "beer": [0.1, 0.1, 0.0, 0.0, -0.15],
+    "tonic": [0.1, 0.05, 0.0, 0.0, 0.05],
+    "soda": [0.1, 0.1, 0.0, -0.05, -0.05],
+    "cola": [0.15, 0.1, 0.0, 0.0, -0.1],
+    "lime": [0.1, 0.1, 0.0, 0.0, 0.0],
+    "lemon": [0.1, 0.05, 0.0, 0.0, 0.0],
+    "grapefruit": [0.1, 0.05, 0.0, 0.05, 0.05],
+    "orange": [0.05, 0.1, 0.05, 0.0, 0.0],
+    "mint": [0.1, 0.05, 0.0, -0.05, 0.0],
+    "pineapple": [0.05, 0.15, 0.05, -0.05, -0.05],
+    "cranberry": [0.05, 0.1, 0.1, 0.0, -0.05],
+    "strawberry": [0.0, 0.1, 0.15, -0.05, -0.05],
+    "raspberry": [0.0, 0.1, 0.15, -0.05, 0.0],
+    "peach": [0.0, 0.1, 0.15, -0.1, 0.0],
+    "grenadine": [0.05, 0.1, 0.1, 0.0, -0.1],
+    "sugar": [0.0, 0.05, 0.05, 0.0, -0.05],
+    "syrup": [0.0, 0.05, 0.05, 0.0, -0.05]
+}
+
+CATEGORY_MODIFIERS = {
+    "cocktail": [0.0, 0.0, 0.0, 0.0, 0.1],
+    "ordinary drink": [0.0, 0.0, 0.0, 0.0, 0.0],
+    "shot": [0.25, 0.1, -0.1, 0.25, -0.25],
+    "punch / party drink": [0.2, 0.3, 0.0, 0.0, -0.15],
+    "coffee / tea": [0.1, -0.2, 0.0, 0.05, 0.05],
+    "homemade liqueur": [-0.1, -0.1, 0.1, 0.1, 0.05],
+    "beer": [0.1, 0.1, 0.0, 0.0, -0.2],
+    "soft drink": [0.05, 0.1, 0.0, -0.3, -0.1],
+    "shake": [0.0, 0.05, 0.1, -0.2, -0.1],
+    "cocoa": [-0.2, -0.1, 0.15, -0.1, 0.0]
+}
+
+GLASS_MODIFIERS = {
+    "champagne": [0.05, 0.0, 0.15, -0.05, 0.1],
+    "martini": [0.0, -0.05, 0.05, 0.05, 0.15],
+    "cocktail": [0.0, 0.0, 0.05, 0.0, 0.15],
+    "coupe": [0.0, 0.0, 0.1, 0.0, 0.15],
+    "old-fashioned": [-0.1, -0.1, 0.05, 0.1, 0.1],
+    "whiskey": [-0.1, -0.1, 0.05, 0.1, 0.1],
+    "shot": [0.15, 0.05, -0.05, 0.1, -0.1],
+    "highball": [0.05, 0.1, 0.0, -0.05, 0.0],
+    "collins": [0.05, 0.1, 0.0, -0.05, 0.0],
+    "hurricane": [0.1, 0.15, 0.0, 0.0, -0.05],
+    "punch bowl": [0.1, 0.2, 0.0, 0.0, -0.1],
+    "mason jar": [0.05, 0.1, 0.0, 0.0, -0.1],
+    "wine": [0.0, 0.0, 0.1, 0.0, 0.05],
+    "mug": [-0.05, -0.1, 0.1, 0.0, 0.0]
+}
+
+NON_ALCOHOLIC_MODIFIER = [0.0, 0.0, 0.0, -0.2, -0.05]
+
+
+def _normalize(text: str) -> str:
+    """Minuscules sans accents ("Cachaça" -> "cachaca")"""
+    decomposed = unicodedata.normalize("NFKD", text.lower())
+    return "".join(char for char in decomposed if not unicodedata.combining(char))
+
+
+def _modifier_patterns(table: Dict[str, List[float]]) -> List[Tuple[Pattern[str], List[float]]]:
+    """Motifs de mots entiers des clés d'une table, des plus longues aux plus courtes"""
+    patterns = []
+    for key in sorted(table, key=len, reverse=True):
+        stem = re.escape(key[:-1]) + "(?:y|ies)" if key.endswith("y") else re.escape(key) + "(?:e?s)?"
+        patterns.append((re.compile(rf"\b{stem}\b"), table[key]))
+    return patterns
+
+
+_INGREDIENT_PATTERNS = _modifier_patterns(INGREDIENT_MODIFIERS)
+_GLASS_PATTERNS = _modifier_patterns(GLASS_MODIFIERS)
+
+
+def _first_modifier(text: str, patterns: List[Tuple[Pattern[str], List[float]]]) -> Optional[List[float]]:
+    text = _normalize(text)
+    for pattern, modifier in patterns:
+        if pattern.search(text):
+            return modifier
+    return None
+
+
+def ingredients(drink: Dict[str, Any]) -> List[str]:
+    """Ingrédients d'une fiche CocktailDB, dans l'ordre de la recette"""
+    names = (drink.get(f"strIngredient{position}") for position in range(1, MAX_INGREDIENTS + 1))
+    return [name.strip() for name in names if name and name.strip()]
+
+
+def drink_features(drink: Dict[str, Any]) -> np.ndarray:
+    """Vecteur (energy, danceability, emotion, intensity, sophistication) d'un cocktail"""
+    features = np.full(5, 0.5)
+    for position, ingredient in enumerate(ingredients(drink)):
+        modifier = _first_modifier(ingredient, _INGREDIENT_PATTERNS)
+        if modifier is not None:
+            features += np.array(modifier) * (1.0 if position == 0 else SECONDARY_INGREDIENT_WEIGHT)
+
+    category = (drink.get("strCategory") or "").lower()
+    if category in CATEGORY_MODIFIERS:
+        features += CATEGORY_MODIFIERS[category]
+    glass_modifier = _first_modifier(drink.get("strGlass") or "", _GLASS_PATTERNS)
+    if glass_modifier is not None:
+        features += glass_modifier
+    if (drink.get("strAlcoholic") or "").lower() == "non alcoholic":
+        features += NON_ALCOHOLIC_MODIFIER
+
+    return np.clip(features, 0, 1)
+
+
+def compact(drink: Dict[str, Any]) -> Dict[str, Any]:
+    """Fiche sans ses champs vides (la plupart des strIngredientN / strMeasureN sont null)"""
+    return {key: value for key, value in drink.items() if value not in (None, "")}
+
+
+def fetch_catalog(transport=None, base_url: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Télécharge tout le catalogue CocktailDB (une recherche par première lettre)"""
+    transport = transport or get_transport()
+    base_url = base_url or Config.COCKTAILDB_API_URL
+
+    drinks: Dict[str, Dict[str, Any]] = {}
+    # Ingestion hors ligne : passe après le trafic interactif dans le limiteur de débit
+    with priority(BATCH):
+        for letter in string.ascii_lowercase + string.digits:
+            response = transport.get(f"{base_url}/search.php?f={letter}")
+            if response.status_code != 200:
+                error_msg = f"Failed to fetch cocktails starting with {letter!r}. Status: {response.status_code}"
+                logging.error(error_msg)
+                raise Exception(error_msg)
+            for drink in response.json().get("drinks") or []:
+                if drink.get("idDrink"):
+                    drinks[drink["idDrink"]] = compact(drink)
+    return list(drinks.values())
+
+
+def save_catalog(drinks: Sequence[Dict[str, Any]], path: str) -> None:
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+        json.dump({"version": FORMAT_VERSION, "drinks": list(drinks)}, f, separators=(",", ":"))
+    os.replace(tmp_path, path)
+
+
+class CocktailIndex:
+    """Catalogue de cocktails en mémoire et leurs vecteurs de caractéristiques"""
+
+    def __init__(self, drinks: Sequence[Dict[str, Any]], mood_analyzer: Optional[MoodAnalyzer] = None):
+        self.drinks = list(drinks)
+        self.features = (np.stack([drink_features(drink) for drink in self.drinks])
+                         if self.drinks else np.empty((0, 5)))
+        self._by_id = {drink["idDrink"]: i for i, drink in enumerate(self.drinks) if drink.get("idDrink")}
+        # Scores de mood de chaque cocktail, pour choisir les qualificatifs affichés
+        analyzer = mood_analyzer or MoodAnalyzer()
+        self.mood_names = list(analyzer.mood_names)
+        self.mood_scores = analyzer._normalized_mood_matrix(self.features) if self.drinks else np.empty((0, 6))
+
+    @classmethod
+    def load(cls, path: str) -> Optional["CocktailIndex"]:
+        """Charge l'index enregistré par `python cocktail_index.py` ; None s'il n'existe pas"""
+        if not path or not os.path.exists(path):
+            return None
+        try:
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            logging.warning(f"Unable to read cocktail index {path}: {str(e)}")
+            return None
+        if data.get("version") != FORMAT_VERSION:
+            logging.warning(f"Cocktail index {path} has an unsupported format, rebuild it")
+            return None
+        index = cls(data["drinks"])
+        logging.info(f"Loaded cocktail index with {len(index)} drinks")
+        return index
+
+    def __len__(self) -> int:
+        return len(self.drinks)
+
+    def get(self, drink_id: str) -> Optional[Dict[str, Any]]:
+        """Copie de la fiche d'un cocktail par son ID"""
+        position = self._by_id.get(str(drink_id))
+        return dict(self.drinks[position]) if position is not None else None
+
+    def nearest(self, characteristics: Sequence[float], k: int) -> List[int]:
+        """Positions des k cocktails les plus proches (distance euclidienne), du plus proche au plus lointain"""
+        k = min(k, len(self.drinks))
+        if k <= 0:
+            return []
+        distances = np.linalg.norm(self.features - np.asarray(characteristics, dtype=float), axis=1)
+        candidates = np.argpartition(distances, k - 1)[:k]
+        return candidates[np.argsort(distances[candidates], kind="stable")].tolist()
+
+    def recommend(self, characteristics: Sequence[float], num: int,
+                  seed: Optional[int] = None) -> List[int]:
+        """Tire `num` cocktails parmi les plus proches voisins (tirage reproductible avec `seed`)"""
+        pool = self.nearest(characteristics, num * CANDIDATE_POOL_FACTOR)
+        rng = random.Random(seed) if seed is not None else random
+        chosen = set(rng.sample(pool, min(num, len(pool))))
+        # Ordre de proximité conservé
+        return [position for position in pool if position in chosen]
+
+    def dominant_mood(self, position: int, moods: Iterable[str]) -> str:
+        """Mood le plus marqué d'un cocktail parmi `moods`"""
+        scores = dict(zip(self.mood_names, self.mood_scores[position]))
+        return max(moods, key=lambda mood: scores.get(mood, 0.0))
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Télécharge le catalogue CocktailDB dans un index local")
+    parser.add_argument("-o", "--output", default=Config.COCKTAIL_INDEX_PATH, help="Fichier de l'index")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, stream=sys.stderr)
+
+    drinks = fetch_catalog()
+    save_catalog(drinks, args.output)
+    index = CocktailIndex(drinks)
+    print(f"{len(index)} drinks written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,36 @@
+import gzip
+import json
+from typing import Any
+
+from flask import current_app, request
+
+try:
+    import brotli
+except ImportError:  # brotli est optionnel : gzip reste disponible
+    brotli = None
+
+# En dessous de cette taille, la compression coûte plus qu'elle ne rapporte
+MIN_COMPRESS_SIZE = 512
+
+
+def compress_body(body: bytes, accept_encoding) -> tuple:
+    """Compresse `body` selon l'en-tête Accept-Encoding ; renvoie (corps, encodage ou None)"""
+    if len(body) < MIN_COMPRESS_SIZE:
+        return body, None
+    if brotli is not None and accept_encoding["br"]:
+        return brotli.compress(body, quality=5), "br"
+    if accept_encoding["gzip"]:
+        return gzip.compress(body, compresslevel=6), "gzip"
+    return body, None
+
+
+def compressed_json(payload: Any, status: int = 200):
+    """Réponse JSON compacte, compressée en brotli ou gzip si le client l'accepte"""
+    body = json.dumps(payload, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+    body, encoding = compress_body(body, request.accept_encodings)
+
+    response = current_app.response_class(body, status=status, mimetype="application/json")
+    if encoding:
+        response.headers["Content-Encoding"] = encoding
+    response.vary.add("Accept-Encoding")
+    return response
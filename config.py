@@ -1,7 +1,80 @@
 import os
+import tempfile
 
 class Config:
     SECRET_KEY = os.environ.get('FLASK_SECRET_KEY', 'your-secret-key-here')
     SPOTIFY_CLIENT_ID = os.environ.get('SPOTIFY_CLIENT_ID', '')
     SPOTIFY_CLIENT_SECRET = os.environ.get('SPOTIFY_CLIENT_SECRET', '')
-    COCKTAILDB_API_KEY = os.environ.get('COCKTAILDB_API_KEY', '')
\ No newline at end of file
+    COCKTAILDB_API_KEY = os.environ.get('COCKTAILDB_API_KEY', '')
+    # URLs des APIs externes (modifiables pour pointer vers des serveurs de test ou de benchmark)
+    SPOTIFY_API_URL = os.environ.get('SPOTIFY_API_URL', 'https://api.spotify.com/v1').rstrip('/')
+    SPOTIFY_TOKEN_URL = os.environ.get('SPOTIFY_TOKEN_URL', 'https://accounts.spotify.com/api/token')
+    COCKTAILDB_API_URL = os.environ.get('COCKTAILDB_API_URL',
+                                        'https://www.thecocktaildb.com/api/json/v1/1').rstrip('/')
+    # Fichier de cache du token Spotify partagé entre workers (vide = cache en mémoire uniquement)
+    SPOTIFY_TOKEN_CACHE = os.environ.get('SPOTIFY_TOKEN_CACHE',
+                                         os.path.join(tempfile.gettempdir(), 'cartel_spotify_token.json'))
+
+    # Transport HTTP partagé (timeouts en secondes)
+    HTTP_CONNECT_TIMEOUT = float(os.environ.get('HTTP_CONNECT_TIMEOUT', '3.05'))
+    HTTP_READ_TIMEOUT = float(os.environ.get('HTTP_READ_TIMEOUT', '10'))
+    HTTP_MAX_RETRIES = int(os.environ.get('HTTP_MAX_RETRIES', '3'))
+    HTTP_BACKOFF_FACTOR = float(os.environ.get('HTTP_BACKOFF_FACTOR', '0.5'))
+    HTTP_BACKOFF_MAX = float(os.environ.get('HTTP_BACKOFF_MAX', '8'))
+    HTTP_RETRY_AFTER_MAX = float(os.environ.get('HTTP_RETRY_AFTER_MAX', '30'))
+    HTTP_POOL_SIZE = int(os.environ.get('HTTP_POOL_SIZE', '20'))
+
+    # Débit sortant maximal par API (requêtes/s, 0 = illimité), partagé entre tous les processus
+    SPOTIFY_RATE_LIMIT = float(os.environ.get('SPOTIFY_RATE_LIMIT', '10'))
+    COCKTAILDB_RATE_LIMIT = float(os.environ.get('COCKTAILDB_RATE_LIMIT', '10'))
+    # Rafale autorisée, en secondes de débit
+    RATE_LIMIT_BURST_SECONDS = float(os.environ.get('RATE_LIMIT_BURST_SECONDS', '2'))
+    # Part de la rafale réservée au trafic interactif (l'analyse en masse ne peut pas la consommer)
+    RATE_LIMIT_BATCH_RESERVE = float(os.environ.get('RATE_LIMIT_BATCH_RESERVE', '0.25'))
+    # Dossier des états partagés des limiteurs (vide = limite propre à chaque processus)
+    RATE_LIMIT_STATE_DIR = os.environ.get('RATE_LIMIT_STATE_DIR',
+                                          os.path.join(tempfile.gettempdir(), 'cartel_rate_limits'))
+
+    # Coalescence des appels identiques en cours entre workers (vide = dans chaque processus uniquement)
+    SINGLE_FLIGHT_DIR = os.environ.get('SINGLE_FLIGHT_DIR', os.path.join(tempfile.gettempdir(), 'cartel_single_flight'))
+    # Attente maximale d'un appel mené par un autre worker avant de faire le sien
+    SINGLE_FLIGHT_LOCK_TIMEOUT = float(os.environ.get('SINGLE_FLIGHT_LOCK_TIMEOUT', '10'))
+
+    # Catalogue CocktailDB local généré par `python cocktail_index.py` (absent = recherches en ligne)
+    COCKTAIL_INDEX_PATH = os.environ.get('COCKTAIL_INDEX_PATH',
+                                         os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                                      'data', 'cocktails.json.gz'))
+
+    # Nombre maximal de requêtes Spotify simultanées d'une analyse multi-playlists
+    SPOTIFY_FETCH_WORKERS = int(os.environ.get('SPOTIFY_FETCH_WORKERS', '8'))
+    # Nombre maximal de requêtes Spotify en cours pour une même analyse (le pool est partagé)
+    SPOTIFY_FETCH_WINDOW = int(os.environ.get('SPOTIFY_FETCH_WINDOW', '4'))
+    # Nombre maximal de playlists combinées dans une analyse (plusieurs URLs ou profil utilisateur)
+    MAX_PLAYLISTS_PER_ANALYSIS = int(os.environ.get('MAX_PLAYLISTS_PER_ANALYSIS', '50'))
+    # Pistes lues au plus par playlist dans une analyse combinée
+    COMBINED_MAX_TRACKS_PER_PLAYLIST = int(os.environ.get('COMBINED_MAX_TRACKS_PER_PLAYLIST', '500'))
+
+    # Nombre maximal de recherches CocktailDB simultanées
+    COCKTAIL_FETCH_WORKERS = int(os.environ.get('COCKTAIL_FETCH_WORKERS', '8'))
+
+    # Fichier SQLite des caches persistants, partagé entre workers (vide = caches en mémoire uniquement)
+    CACHE_DB_PATH = os.environ.get('CACHE_DB_PATH', '')
+    COCKTAIL_CACHE_SIZE = int(os.environ.get('COCKTAIL_CACHE_SIZE', '256'))
+    COCKTAIL_CACHE_TTL = float(os.environ.get('COCKTAIL_CACHE_TTL', str(7 * 24 * 3600)))
+    # Durée pendant laquelle un cocktail introuvable (ou une erreur CocktailDB) n'est pas redemandé
+    COCKTAIL_MISS_TTL = float(os.environ.get('COCKTAIL_MISS_TTL', '600'))
+    # Précharger tout le mapping de cocktails au démarrage
+    COCKTAIL_CACHE_PREWARM = os.environ.get('COCKTAIL_CACHE_PREWARM', '1') == '1'
+    ARTIST_CACHE_SIZE = int(os.environ.get('ARTIST_CACHE_SIZE', '10000'))
+    ARTIST_CACHE_PERSISTENT_SIZE = int(os.environ.get('ARTIST_CACHE_PERSISTENT_SIZE', '500000'))
+    ARTIST_CACHE_TTL = float(os.environ.get('ARTIST_CACHE_TTL', str(7 * 24 * 3600)))
+    # Résultats d'analyse par (playlist_id, snapshot_id)
+    ANALYSIS_CACHE_SIZE = int(os.environ.get('ANALYSIS_CACHE_SIZE', '1000'))
+    ANALYSIS_CACHE_TTL = float(os.environ.get('ANALYSIS_CACHE_TTL', str(24 * 3600)))
+
+    # Jobs d'analyse asynchrones
+    JOB_WORKERS = int(os.environ.get('JOB_WORKERS', '4'))
+    JOB_MAX_PENDING = int(os.environ.get('JOB_MAX_PENDING', '100'))
+    JOB_TTL = float(os.environ.get('JOB_TTL', '3600'))
+    # Jobs terminés gardés en mémoire (les plus anciens sont oubliés au-delà)
+    JOB_MAX_FINISHED = int(os.environ.get('JOB_MAX_FINISHED', '200'))
@@ -0,0 +1,8 @@
+"""Configuration gunicorn (chargée automatiquement depuis le dossier de travail)"""
+
+
+def post_worker_init(worker):
+    # Préchauffage après le fork : chaque worker obtient son token et construit ses caches
+    # en arrière-plan, sans retarder sa prise de requêtes
+    from app import services
+    services.start_warm_up()
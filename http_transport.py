@@ -0,0 +1,151 @@
+import email.utils
+import logging
+import os
+import random
+import threading
+import time
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from config import Config
+from metrics import OUTBOUND_DURATION, OUTBOUND_REQUESTS
+from rate_limiter import build_rate_limiter
+
+# Statuts pour lesquels une nouvelle tentative a du sens
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class HTTPTransport:
+    """Couche HTTP partagée par les clients d'API
+
+    Une session (et donc un pool de connexions keep-alive) par hôte, des timeouts
+    connect/read systématiques et des retries avec backoff exponentiel + jitter
+    qui respectent l'en-tête `Retry-After`.
+    """
+
+    def __init__(self, connect_timeout: float = None, read_timeout: float = None,
+                 max_retries: int = None, backoff_factor: float = None,
+                 backoff_max: float = None, retry_after_max: float = None, pool_size: int = None,
+                 rate_limiter=None):
+        self.timeout = (connect_timeout if connect_timeout is not None else Config.HTTP_CONNECT_TIMEOUT,
+                        read_timeout if read_timeout is not None else Config.HTTP_READ_TIMEOUT)
+        self.max_retries = max_retries if max_retries is not None else Config.HTTP_MAX_RETRIES
+        self.backoff_factor = backoff_factor if backoff_factor is not None else Config.HTTP_BACKOFF_FACTOR
+        self.backoff_max = backoff_max if backoff_max is not None else Config.HTTP_BACKOFF_MAX
+        self.retry_after_max = retry_after_max if retry_after_max is not None else Config.HTTP_RETRY_AFTER_MAX
+        self.pool_size = pool_size if pool_size is not None else Config.HTTP_POOL_SIZE
+        self._sessions: Dict[str, requests.Session] = {}
+        self._lock = threading.Lock()
+        # Limiteur de débit consulté avant chaque tentative et informé de chaque réponse (cf. rate_limiter.py)
+        self.rate_limiter = rate_limiter
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        return self.request("POST", url, **kwargs)
+
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        """Envoie la requête en réessayant sur erreur réseau, 429 et 5xx ; renvoie la dernière réponse"""
+        kwargs.setdefault("timeout", self.timeout)
+        session = self._session_for(url)
+        host = urlsplit(url).netloc
+
+        for attempt in range(self.max_retries + 1):
+            last_attempt = attempt == self.max_retries
+            if self.rate_limiter is not None:
+                self.rate_limiter.acquire(url)
+            start = time.perf_counter()
+            try:
+                response = session.request(method, url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                OUTBOUND_REQUESTS.inc(host=host, status="error")
+                OUTBOUND_DURATION.observe(time.perf_counter() - start, host=host)
+                if last_attempt:
+                    raise
+                delay = self._backoff_delay(attempt)
+                logging.warning(f"{method} {url} failed ({str(e)}), retrying in {delay:.2f}s")
+                time.sleep(delay)
+                continue
+            OUTBOUND_REQUESTS.inc(host=host, status=response.status_code)
+            OUTBOUND_DURATION.observe(time.perf_counter() - start, host=host)
+
+            retry_after = None
+            if response.status_code in RETRY_STATUSES:
+                retry_after = self._parse_retry_after(response.headers.get("Retry-After"))
+            if self.rate_limiter is not None:
+                self.rate_limiter.record(url, response.status_code, retry_after)
+
+            if response.status_code not in RETRY_STATUSES or last_attempt:
+                return response
+
+            delay = self._backoff_delay(attempt)
+            if retry_after is not None:
+                if retry_after > self.retry_after_max:
+                    # Attendre aussi longtemps bloquerait le worker : on laisse l'appelant gérer
+                    return response
+                delay = max(delay, retry_after)
+
+            logging.warning(f"{method} {url} returned {response.status_code}, retrying in {delay:.2f}s")
+            response.close()
+            time.sleep(delay)
+
+        return response
+
+    def _backoff_delay(self, attempt: int) -> float:
+        # "Full jitter" : évite que tous les workers réessaient en même temps
+        return random.uniform(0, min(self.backoff_max, self.backoff_factor * (2 ** attempt)))
+
+    @staticmethod
+    def _parse_retry_after(value: Optional[str]) -> Optional[float]:
+        if not value:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            pass
+        try:
+            retry_at = email.utils.parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+        return max(0.0, retry_at.timestamp() - time.time())
+
+    def _session_for(self, url: str) -> requests.Session:
+        parts = urlsplit(url)
+        host = f"{parts.scheme}://{parts.netloc}"
+        session = self._sessions.get(host)
+        if session is not None:
+            return session
+
+        with self._lock:
+            session = self._sessions.get(host)
+            if session is None:
+                session = requests.Session()
+                # Les retries sont gérés ici, pas par urllib3
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size, max_retries=0)
+                session.mount(f"{parts.scheme}://", adapter)
+                self._sessions[host] = session
+            return session
+
+    def close(self) -> None:
+        with self._lock:
+            for session in self._sessions.values():
+                session.close()
+            self._sessions.clear()
+
+
+_transport: Optional[HTTPTransport] = None
+_transport_pid: Optional[int] = None
+_transport_lock = threading.Lock()
+
+
+def get_transport() -> HTTPTransport:
+    """Transport partagé du processus courant (recréé après un fork : les sockets ne se partagent pas)"""
+    global _transport, _transport_pid
+    with _transport_lock:
+        if _transport is None or _transport_pid != os.getpid():
+            _transport = HTTPTransport(rate_limiter=build_rate_limiter())
+            _transport_pid = os.getpid()
+        return _transport
@@ -0,0 +1,129 @@
+import logging
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+
+class JobQueueFull(Exception):
+    """Trop de jobs en attente : le client doit réessayer plus tard"""
+
+
+class Job:
+    """Analyse exécutée en arrière-plan, avec suivi des étapes"""
+
+    def __init__(self):
+        self.id = uuid.uuid4().hex
+        self.status = "queued"
+        self.stage: Optional[str] = None
+        self.stages: List[str] = []
+        self.result: Any = None
+        self.error: Optional[str] = None
+        # Exception d'origine, pour choisir le statut HTTP et le message affiché
+        self.exception: Optional[Exception] = None
+        self.created_at = time.time()
+        self.finished_at: Optional[float] = None
+        # Incrémenté à chaque changement, pour réveiller les flux SSE
+        self.version = 0
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ("done", "failed")
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "stage": self.stage,
+            "stages": list(self.stages),
+            "error": self.error
+        }
+
+
+class JobManager:
+    """Exécute les jobs dans un pool de threads borné et garde leur état en mémoire
+
+    L'état est propre au processus : avec plusieurs workers gunicorn, il faut un worker
+    multi-threads (gthread) ou une affinité de session pour retrouver ses jobs. Les jobs
+    terminés sont oubliés après `ttl` secondes ou au-delà de `max_finished`, et le résultat
+    d'un job n'est gardé que jusqu'à sa première lecture par `take_result`.
+    """
+
+    def __init__(self, max_workers: int = 4, max_pending: int = 100, ttl: float = 3600,
+                 max_finished: int = 200):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="analysis-job")
+        self.max_pending = max_pending
+        self.ttl = ttl
+        self.max_finished = max_finished
+        self._jobs: Dict[str, Job] = {}
+        self._condition = threading.Condition()
+
+    def submit(self, fn: Callable[..., Any], *args, **kwargs) -> Job:
+        """Planifie `fn(*args, progress=..., **kwargs)` ; `progress(stage)` signale chaque étape"""
+        with self._condition:
+            self._purge()
+            pending = sum(1 for job in self._jobs.values() if not job.finished)
+            if pending >= self.max_pending:
+                raise JobQueueFull(f"{pending} analysis jobs already pending")
+            job = Job()
+            self._jobs[job.id] = job
+
+        self._executor.submit(self._run, job, fn, args, kwargs)
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._condition:
+            self._purge()
+            return self._jobs.get(job_id)
+
+    def take_result(self, job: Job) -> Any:
+        """Renvoie le résultat du job et le libère (None s'il a déjà été lu)"""
+        with self._condition:
+            result, job.result = job.result, None
+            return result
+
+    def wait(self, job: Job, version: int, timeout: float) -> int:
+        """Attend un changement d'état du job (ou le timeout) et renvoie sa version courante"""
+        with self._condition:
+            self._condition.wait_for(lambda: job.version != version, timeout=timeout)
+            return job.version
+
+    def _run(self, job: Job, fn: Callable[..., Any], args, kwargs) -> None:
+        self._update(job, status="running")
+        try:
+            result = fn(*args, progress=lambda stage: self._update(job, stage=stage), **kwargs)
+        except Exception as e:
+            logging.error(f"Analysis job {job.id} failed: {str(e)}")
+            self._update(job, status="failed", error=e)
+            return
+        self._update(job, status="done", result=result)
+
+    def _update(self, job: Job, status: Optional[str] = None, stage: Optional[str] = None,
+                result: Any = None, error: Optional[Exception] = None) -> None:
+        with self._condition:
+            if stage is not None:
+                job.stage = stage
+                job.stages.append(stage)
+            if status is not None:
+                job.status = status
+                if job.finished:
+                    job.finished_at = time.time()
+                    self._purge()
+            if result is not None:
+                job.result = result
+            if error is not None:
+                job.error = str(error)
+                job.exception = error
+            job.version += 1
+            self._condition.notify_all()
+
+    def _purge(self) -> None:
+        # Appelé sous self._condition : oublie les jobs terminés depuis plus de `ttl`,
+        # puis les plus anciens au-delà de `max_finished`
+        expired_before = time.time() - self.ttl
+        finished = sorted((job for job in self._jobs.values() if job.finished), key=lambda job: job.finished_at)
+        excess = len(finished) - self.max_finished
+        for position, job in enumerate(finished):
+            if position < excess or job.finished_at < expired_before:
+                del self._jobs[job.id]
@@ -1,4 +1,5 @@
-from app import app
+from app import app, services
 
 if __name__ == '__main__':
+    services.start_warm_up()
     app.run(host='0.0.0.0', port=5000, debug=True)
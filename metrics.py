@@ -0,0 +1,160 @@
+"""Métriques au format texte Prometheus (exposées sur /metrics)
+
+Les valeurs sont propres au processus : chaque worker gunicorn expose ses propres compteurs.
+"""
+import bisect
+import threading
+import time
+import weakref
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Sequence, Tuple
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class Counter:
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(tuple(str(labels[name]) for name in self.labelnames), 0.0)
+
+    def collect(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Par jeu de labels : [compteurs par bucket..., somme, total]
+        self._values: Dict[Tuple[str, ...], List[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels) -> None:
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        with self._lock:
+            state = self._values.setdefault(key, [0.0] * (len(self.buckets) + 2))
+            index = bisect.bisect_left(self.buckets, value)
+            if index < len(self.buckets):
+                state[index] += 1
+            state[-2] += value
+            state[-1] += 1
+
+    def count(self, **labels) -> float:
+        state = self._values.get(tuple(str(labels[name]) for name in self.labelnames))
+        return state[-1] if state else 0.0
+
+    @contextmanager
+    def time(self, **labels) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def collect(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, state in sorted(self._values.items()):
+                cumulative = 0.0
+                for bound, count in zip(self.buckets, state):
+                    cumulative += count
+                    labels = _format_labels(self.labelnames, key, f'le="{bound}"')
+                    lines.append(f"{self.name}_bucket{labels} {_format_value(cumulative)}")
+                labels = _format_labels(self.labelnames, key, 'le="+Inf"')
+                lines.append(f"{self.name}_bucket{labels} {_format_value(state[-1])}")
+                labels = _format_labels(self.labelnames, key)
+                lines.append(f"{self.name}_sum{labels} {_format_value(state[-2])}")
+                lines.append(f"{self.name}_count{labels} {_format_value(state[-1])}")
+        return lines
+
+
+class CacheStatsCollector:
+    """Expose les compteurs hits/misses des caches enregistrés et leur taux de succès"""
+
+    def __init__(self):
+        self._caches: Dict[str, "weakref.WeakSet"] = {}
+        self._lock = threading.Lock()
+
+    def register(self, name: str, cache) -> None:
+        with self._lock:
+            self._caches.setdefault(name, weakref.WeakSet()).add(cache)
+
+    def collect(self) -> List[str]:
+        hits_lines = ["# HELP cartel_cache_hits_total Cache lookups served from cache",
+                      "# TYPE cartel_cache_hits_total counter"]
+        misses_lines = ["# HELP cartel_cache_misses_total Cache lookups that missed",
+                        "# TYPE cartel_cache_misses_total counter"]
+        ratio_lines = ["# HELP cartel_cache_hit_ratio Share of cache lookups served from cache",
+                       "# TYPE cartel_cache_hit_ratio gauge"]
+        with self._lock:
+            caches = {name: list(instances) for name, instances in self._caches.items()}
+
+        for name, instances in sorted(caches.items()):
+            hits = sum(cache.stats()["hits"] for cache in instances)
+            misses = sum(cache.stats()["misses"] for cache in instances)
+            labels = _format_labels(("cache",), (name,))
+            hits_lines.append(f"cartel_cache_hits_total{labels} {hits}")
+            misses_lines.append(f"cartel_cache_misses_total{labels} {misses}")
+            ratio = hits / (hits + misses) if hits + misses else 0.0
+            ratio_lines.append(f"cartel_cache_hit_ratio{labels} {_format_value(round(ratio, 4))}")
+        return hits_lines + misses_lines + ratio_lines
+
+
+STAGE_DURATION = Histogram("cartel_stage_duration_seconds", "Duration of each analysis stage", ["stage"])
+OUTBOUND_REQUESTS = Counter("cartel_outbound_requests_total",
+                            "Outbound HTTP requests (including retries) by upstream host and status",
+                            ["host", "status"])
+OUTBOUND_DURATION = Histogram("cartel_outbound_request_duration_seconds",
+                              "Outbound HTTP request duration by upstream host", ["host"])
+SINGLE_FLIGHT = Counter("cartel_single_flight_total",
+                        "Upstream lookups by coalescing outcome (leader, shared in-process, handoff across workers)",
+                        ["namespace", "outcome"])
+CACHES = CacheStatsCollector()
+
+_COLLECTORS = [STAGE_DURATION, OUTBOUND_REQUESTS, OUTBOUND_DURATION, SINGLE_FLIGHT, CACHES]
+
+
+def stage_timer(stage: str):
+    """Mesure la durée d'une étape (spotify_token, playlist_fetch, artist_lookup, ...)"""
+    return STAGE_DURATION.time(stage=stage)
+
+
+def render() -> str:
+    """Toutes les métriques au format d'exposition texte Prometheus"""
+    lines = []
+    for collector in _COLLECTORS:
+        lines.extend(collector.collect())
+    return "\n".join(lines) + "\n"
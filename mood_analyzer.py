@@ -1,9 +1,65 @@
 import numpy as np
-from typing import List, Tuple, Dict, Any
+from functools import lru_cache
+from typing import List, Tuple, Dict, Any, NamedTuple, Optional, Sequence, Set
 import logging
+import threading
+
+
+class _PatternMatcher:
+    """Automate d'Aho-Corasick : trouve en un seul passage tous les motifs présents dans un texte"""
+
+    def __init__(self, patterns: List[str]):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[Set[int]] = [set()]
+
+        for pattern_id, pattern in enumerate(patterns):
+            state = 0
+            for char in pattern:
+                if char not in self._goto[state]:
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append(set())
+                    self._goto[state][char] = len(self._goto) - 1
+                state = self._goto[state][char]
+            self._out[state].add(pattern_id)
+
+        # Liens d'échec construits en largeur
+        queue = list(self._goto[0].values())
+        while queue:
+            state = queue.pop(0)
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[next_state] = self._goto[fallback].get(char, 0)
+                self._out[next_state] |= self._out[self._fail[next_state]]
+
+    def find(self, text: str) -> Set[int]:
+        """Renvoie les indices des motifs présents dans `text`"""
+        goto, fail, out = self._goto, self._fail, self._out
+        found: Set[int] = set()
+        state = 0
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if out[state]:
+                found |= out[state]
+        return found
+
+class _GenreTables(NamedTuple):
+    """Tables de genres compilées, remplacées d'un bloc à chaque recompilation"""
+    matcher: _PatternMatcher
+    base_priority: List[Tuple[int, str]]
+    mapping_priority: List[Tuple[int, str]]
+    modifier_vectors: List[Tuple[int, np.ndarray]]
+    base_vectors: Dict[str, np.ndarray]
+
 
 class MoodAnalyzer:
-    def __init__(self):
+    def __init__(self, genre_cache_size: int = 4096):
         self.base_characteristics = {
             "pop": [0.8, 0.8, 0.6, 0.5, 0.6],
             "rap": [0.8, 0.7, 0.6, 0.7, 0.6],
@@ -33,21 +89,8 @@ class MoodAnalyzer:
             "chill": [-0.2, -0.1, 0.1, -0.2, 0.0]       # Less energetic and intense
         }
 
-    def _get_base_genre(self, genre: str) -> str:
-        """Trouve le genre de base le plus proche pour un genre donné"""
-        genre_lower = genre.lower()
-
-        # Recherche directe
-        if genre_lower in self.base_characteristics:
-            return genre_lower
-
-        # Recherche par sous-chaîne
-        for base_genre in self.base_characteristics:
-            if base_genre in genre_lower:
-                return base_genre
-
-        # Association par similarité
-        genre_mapping = {
+        # Association par similarité (consultée après les genres de base)
+        self.genre_mapping = {
             "punk": "rock",
             "house": "electronic",
             "techno": "electronic",
@@ -60,72 +103,185 @@ class MoodAnalyzer:
             "wave": "electronic"
         }
 
-        for key, value in genre_mapping.items():
-            if key in genre_lower:
-                return value
+        # Critères de chaque mood sous forme linéaire : score = (poids . caractéristiques + constante) * 100
+        # (energy, danceability, emotion, intensity, sophistication)
+        self.mood_names = ["energetic", "chill", "romantic", "dark", "sophisticated", "intense"]
+        mood_criteria = {
+            # c0 * 0.5 + c1 * 0.3 + c3 * 0.2
+            "energetic": ([0.5, 0.3, 0.0, 0.2, 0.0], 0.0),
+            # (1 - c0) * 0.4 + (1 - c3) * 0.3 + c2 * 0.3
+            "chill": ([-0.4, 0.0, 0.3, -0.3, 0.0], 0.7),
+            # c2 * 0.5 + (1 - c3) * 0.3 + c4 * 0.2
+            "romantic": ([0.0, 0.0, 0.5, -0.3, 0.2], 0.3),
+            # c3 * 0.4 + (1 - c2) * 0.3 + (1 - c1) * 0.3
+            "dark": ([0.0, -0.3, -0.3, 0.4, 0.0], 0.6),
+            # c4 * 0.5 + c2 * 0.3 + (1 - c1) * 0.2
+            "sophisticated": ([0.0, -0.2, 0.3, 0.0, 0.5], 0.2),
+            # c3 * 0.4 + c0 * 0.4 + (1 - c4) * 0.2
+            "intense": ([0.4, 0.0, 0.0, 0.4, -0.2], 0.2)
+        }
+        self.mood_weights = np.array([mood_criteria[mood][0] for mood in self.mood_names]) * 100
+        self.mood_offsets = np.array([mood_criteria[mood][1] for mood in self.mood_names]) * 100
+
+        self.genre_cache_size = genre_cache_size
+        # Incrémentée à chaque update_tables : les consommateurs (graphe de visualisation) comparent les versions
+        self.version = 0
+        self._update_lock = threading.Lock()
+        self._compile()
+
+    def update_tables(self, base_characteristics: Optional[Dict[str, List[float]]] = None,
+                      genre_modifiers: Optional[Dict[str, List[float]]] = None,
+                      genre_mapping: Optional[Dict[str, str]] = None) -> None:
+        """Ajoute ou remplace des entrées des tables de genres, puis recompile et incrémente `version`
+
+        Les tables ne doivent pas être modifiées directement : les analyses en cours gardent
+        les tables compilées avec lesquelles elles ont commencé.
+        """
+        with self._update_lock:
+            if base_characteristics:
+                self.base_characteristics = {**self.base_characteristics, **base_characteristics}
+            if genre_modifiers:
+                self.genre_modifiers = {**self.genre_modifiers, **genre_modifiers}
+            if genre_mapping:
+                self.genre_mapping = {**self.genre_mapping, **genre_mapping}
+            self._compile()
+            self.version += 1
+
+    def _compile(self) -> None:
+        """Compile les tables de genres en un automate unique"""
+        base_genres = list(self.base_characteristics)
+        mapping_keys = list(self.genre_mapping)
+        modifiers = list(self.genre_modifiers)
+
+        # Un motif peut appartenir à plusieurs tables ("indie" est un genre de base et une clé du mapping)
+        patterns = list(dict.fromkeys(base_genres + mapping_keys + modifiers))
+        pattern_index = {pattern: i for i, pattern in enumerate(patterns)}
+
+        tables = _GenreTables(
+            matcher=_PatternMatcher(patterns),
+            # Listes ordonnées par priorité : l'ordre des dictionnaires fait foi
+            base_priority=[(pattern_index[genre], genre) for genre in base_genres],
+            mapping_priority=[(pattern_index[key], self.genre_mapping[key]) for key in mapping_keys],
+            modifier_vectors=[(pattern_index[modifier], np.array(self.genre_modifiers[modifier]))
+                              for modifier in modifiers],
+            base_vectors={genre: np.array(values) for genre, values in self.base_characteristics.items()}
+        )
+
+        # (genre de base, vecteur) mémorisés par chaîne de genre (cache borné), liés à ces tables compilées :
+        # un seul attribut remplacé, une analyse concurrente ne voit jamais un mélange de versions
+        self._tables = tables
+        self._resolve_genre = lru_cache(maxsize=self.genre_cache_size)(
+            lambda genre: self._resolve(genre, tables))
+
+    @staticmethod
+    def _match_base_genre(tables: "_GenreTables", genre_lower: str, matches: Set[int]) -> str:
+        # Recherche directe
+        if genre_lower in tables.base_vectors:
+            return genre_lower
+
+        # Recherche par sous-chaîne
+        for pattern_id, base_genre in tables.base_priority:
+            if pattern_id in matches:
+                return base_genre
+
+        # Association par similarité
+        for pattern_id, base_genre in tables.mapping_priority:
+            if pattern_id in matches:
+                return base_genre
 
         return "pop"  # Genre le plus générique comme dernier recours
 
-    def _apply_modifiers(self, base_characteristics: np.ndarray, genre: str) -> np.ndarray:
+    def _get_base_genre(self, genre: str) -> str:
+        """Trouve le genre de base le plus proche pour un genre donné"""
+        return self._resolve_genre(genre)[0]
+
+    def _apply_modifiers(self, base_characteristics: np.ndarray, genre: str,
+                         matches: Optional[Set[int]] = None, tables: Optional["_GenreTables"] = None) -> np.ndarray:
         """Applique les modificateurs de genre aux caractéristiques de base"""
-        characteristics = base_characteristics.copy()
+        tables = tables or self._tables
+        if matches is None:
+            matches = tables.matcher.find(genre.lower())
 
-        for modifier, changes in self.genre_modifiers.items():
-            if modifier in genre.lower():
-                characteristics += np.array(changes)
+        characteristics = base_characteristics.copy()
+        for pattern_id, changes in tables.modifier_vectors:
+            if pattern_id in matches:
+                characteristics += changes
 
         # Normaliser les valeurs entre 0 et 1
         return np.clip(characteristics, 0, 1)
 
+    def _resolve(self, genre: str, tables: "_GenreTables") -> Tuple[str, np.ndarray]:
+        genre_lower = genre.lower()
+        # Un seul passage de l'automate sert au genre de base et aux modificateurs
+        matches = tables.matcher.find(genre_lower)
+        base_genre = self._match_base_genre(tables, genre_lower, matches)
+        characteristics = self._apply_modifiers(tables.base_vectors[base_genre], genre_lower, matches, tables)
+        # Le vecteur est partagé par le cache : lecture seule
+        characteristics.flags.writeable = False
+        return base_genre, characteristics
+
     def _get_genre_characteristics(self, genre: str) -> np.ndarray:
         """Calcule les caractéristiques musicales pour un genre donné"""
-        base_genre = self._get_base_genre(genre)
-        base_characteristics = np.array(self.base_characteristics[base_genre])
-        return self._apply_modifiers(base_characteristics, genre)
+        return self._resolve_genre(genre)[1]
 
-    def _calculate_playlist_characteristics(self, genres_with_weights: List[Tuple[List[str], float]]) -> np.ndarray:
-        """Calcule les caractéristiques moyennes pondérées de la playlist"""
-        total_characteristics = np.zeros(5)
-        total_weight = 0.0
+    def _characteristics_matrix(self, playlists: Sequence[List[Tuple[List[str], float]]]) -> np.ndarray:
+        """Caractéristiques moyennes pondérées de plusieurs playlists (une ligne par playlist)"""
+        genre_ids: Dict[str, int] = {}
+        entry_genres: List[int] = []
+        entry_playlists: List[int] = []
+        entry_weights: List[float] = []
 
-        for genres, weight in genres_with_weights:
-            for genre in genres:
-                characteristics = self._get_genre_characteristics(genre)
-                total_characteristics += characteristics * weight
-                total_weight += weight
+        # Aplatir toutes les paires (genre, poids) ; chaque genre distinct n'est résolu qu'une fois
+        for playlist_index, genres_with_weights in enumerate(playlists):
+            for genres, weight in genres_with_weights:
+                for genre in genres:
+                    entry_genres.append(genre_ids.setdefault(genre, len(genre_ids)))
+                    entry_playlists.append(playlist_index)
+                    entry_weights.append(weight)
 
-        if total_weight > 0:
-            return total_characteristics / total_weight
-        return np.array([0.5, 0.5, 0.5, 0.5, 0.5])
+        num_playlists = len(playlists)
+        characteristics = np.full((num_playlists, 5), 0.5)
+        if not entry_genres:
+            return characteristics
 
-    def _calculate_mood_scores(self, characteristics: np.ndarray) -> Dict[str, float]:
-        """Calcule les scores pour chaque mood basé sur les caractéristiques musicales"""
-        # Définition des critères pour chaque mood (un peu le bordel ici..)
-        mood_criteria = {
-            "energetic": lambda c: (c[0] * 0.5 + c[1] * 0.3 + c[3] * 0.2) * 100,
-            "chill": lambda c: ((1 - c[0]) * 0.4 + (1 - c[3]) * 0.3 + c[2] * 0.3) * 100,
-            "romantic": lambda c: (c[2] * 0.5 + (1 - c[3]) * 0.3 + c[4] * 0.2) * 100,
-            "dark": lambda c: (c[3] * 0.4 + (1 - c[2]) * 0.3 + (1 - c[1]) * 0.3) * 100,
-            "sophisticated": lambda c: (c[4] * 0.5 + c[2] * 0.3 + (1 - c[1]) * 0.2) * 100,
-            "intense": lambda c: (c[3] * 0.4 + c[0] * 0.4 + (1 - c[4]) * 0.2) * 100
-        }
+        genre_vectors = np.stack([self._get_genre_characteristics(genre) for genre in genre_ids])
+        weights = np.asarray(entry_weights, dtype=float)
+        playlist_index = np.asarray(entry_playlists)
+        contributions = genre_vectors[np.asarray(entry_genres)] * weights[:, None]
 
-        # Calculer les scores bruts
-        raw_scores = {
-            mood: criteria(characteristics)
-            for mood, criteria in mood_criteria.items()
-        }
+        totals = np.stack([np.bincount(playlist_index, weights=contributions[:, k], minlength=num_playlists)
+                           for k in range(5)], axis=1)
+        total_weights = np.bincount(playlist_index, weights=weights, minlength=num_playlists)
 
-        # Normaliser les scores
-        total_score = sum(raw_scores.values())
-        if total_score > 0:
-            normalized_scores = {
-                mood: round((score / total_score) * 100, 1)
-                for mood, score in raw_scores.items()
-            }
-            return normalized_scores
+        has_weight = total_weights > 0
+        characteristics[has_weight] = totals[has_weight] / total_weights[has_weight, None]
+        return characteristics
+
+    def _normalized_mood_matrix(self, characteristics: np.ndarray) -> np.ndarray:
+        """Scores de mood normalisés (somme = 100, non arrondis) pour une matrice de caractéristiques"""
+        raw_scores = characteristics @ self.mood_weights.T + self.mood_offsets
+        total_scores = raw_scores.sum(axis=1, keepdims=True)
+        safe_totals = np.where(total_scores > 0, total_scores, 1.0)
+        return np.where(total_scores > 0, raw_scores / safe_totals * 100, 0.0)
 
-        return {mood: 0.0 for mood in mood_criteria.keys()}
+    def analyze_batch(self, playlists: Sequence[List[Tuple[List[str], float]]]) -> Tuple[np.ndarray, np.ndarray]:
+        """Analyse un lot de playlists en une passe NumPy
+
+        `playlists` contient, pour chaque playlist, sa liste (genres, poids). Renvoie la matrice
+        des caractéristiques (N x 5) et celle des scores de mood (N x 6, colonnes dans l'ordre de
+        `self.mood_names`, arrondis à 0.1).
+        """
+        characteristics = self._characteristics_matrix(playlists)
+        return characteristics, np.round(self._normalized_mood_matrix(characteristics), 1)
+
+    def _calculate_playlist_characteristics(self, genres_with_weights: List[Tuple[List[str], float]]) -> np.ndarray:
+        """Calcule les caractéristiques moyennes pondérées de la playlist"""
+        return self._characteristics_matrix([genres_with_weights])[0]
+
+    def _calculate_mood_scores(self, characteristics: np.ndarray) -> Dict[str, float]:
+        """Calcule les scores pour chaque mood basé sur les caractéristiques musicales"""
+        scores = self._normalized_mood_matrix(np.asarray(characteristics, dtype=float).reshape(1, 5))[0]
+        return {mood: round(float(score), 1) for mood, score in zip(self.mood_names, scores)}
 
     def analyze_artists(self, top_artists: List[Tuple[str, int, List[str]]]) -> Dict[str, float]:
         """Analyse les artistes et leurs genres pour déterminer les moods dominants"""
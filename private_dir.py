@@ -0,0 +1,24 @@
+"""Dossiers d'état partagés entre processus (verrous, fichiers de passage, seaux à jetons)
+
+Ces dossiers sont par défaut sous le répertoire temporaire, au nom prévisible : un autre
+utilisateur pourrait les créer avant nous et y déposer des fichiers lus par l'application.
+"""
+import os
+import stat
+
+
+def ensure_private_dir(path: str) -> str:
+    """Crée `path` (0o700) s'il n'existe pas et vérifie qu'on peut s'y fier
+
+    Lève OSError si le dossier n'est pas un vrai dossier appartenant à l'utilisateur courant,
+    ou si d'autres utilisateurs peuvent y écrire.
+    """
+    os.makedirs(path, mode=0o700, exist_ok=True)
+    info = os.lstat(path)
+    if not stat.S_ISDIR(info.st_mode):
+        raise OSError(f"{path} is not a directory")
+    if hasattr(os, "getuid") and info.st_uid != os.getuid():
+        raise OSError(f"{path} is not owned by the current user")
+    if info.st_mode & (stat.S_IWGRP | stat.S_IWOTH):
+        raise OSError(f"{path} is writable by other users")
+    return path
@@ -0,0 +1,215 @@
+"""Limitation du débit sortant par hôte, partagée entre les processus (workers gunicorn, analyse en masse)
+
+Chaque hôte limité a un seau à jetons dont l'état (jetons, dernière mise à jour, pause
+Retry-After, facteur de débit) tient dans un petit fichier verrouillé par flock. Sans
+fcntl ou sans dossier d'état, le seau reste propre au processus.
+
+Le trafic interactif (/analyze) passe avant le trafic de fond : une requête de fond ne
+consomme un jeton que s'il en reste au-delà d'une réserve laissée au trafic interactif.
+"""
+import logging
+import os
+import struct
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+from config import Config
+from private_dir import ensure_private_dir
+
+try:
+    import fcntl
+except ImportError:  # Windows : seaux propres à chaque processus
+    fcntl = None
+
+INTERACTIVE = "interactive"
+BATCH = "batch"
+
+# Après un 429, le débit est divisé par deux (sans descendre sous 10 % du débit configuré)...
+BACKOFF_FACTOR = 0.5
+MIN_RATE_FACTOR = 0.1
+# ...puis remonte de 2 % du débit configuré à chaque réponse réussie
+RECOVERY_STEP = 0.02
+# Attente maximale entre deux vérifications du seau
+MAX_SLEEP = 0.5
+
+# jetons, dernière mise à jour, fin de pause (Retry-After), facteur de débit
+_STATE = struct.Struct("dddd")
+
+_priority: ContextVar[Optional[str]] = ContextVar("outbound_priority", default=None)
+
+
+@contextmanager
+def priority(level: str) -> Iterator[None]:
+    """Fixe la priorité (INTERACTIVE ou BATCH) des appels sortants faits dans ce contexte"""
+    token = _priority.set(level)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+class TokenBucket:
+    """Seau à jetons d'un hôte, adaptatif (429 / Retry-After)"""
+
+    def __init__(self, rate: float, burst: float, state_path: str = "", max_pause: float = 30.0):
+        self.rate = rate
+        self.burst = max(1.0, burst)
+        self.state_path = state_path if fcntl is not None else ""
+        self.max_pause = max_pause
+        self._lock = threading.Lock()
+        self._fd: Optional[int] = None
+        self._pid: Optional[int] = None
+        self._local = [self.burst, time.time(), 0.0, 1.0]
+        # Dernier facteur observé : évite de verrouiller l'état à chaque succès quand tout va bien
+        self._degraded = False
+
+    def acquire(self, reserve: float = 0.0) -> float:
+        """Attend un jeton en laissant `reserve` jetons disponibles ; renvoie le temps d'attente"""
+        waited = 0.0
+        while True:
+            with self._state() as state:
+                now = time.time()
+                tokens, paused_until, factor = self._refill(state, now), state[2], state[3]
+                if now < paused_until:
+                    wait = paused_until - now
+                elif tokens >= 1 + reserve - 1e-9:
+                    state[0] = tokens - 1
+                    self._degraded = factor < 1
+                    return waited
+                else:
+                    wait = (1 + reserve - tokens) / (self.rate * factor)
+            wait = min(max(wait, 0.001), MAX_SLEEP)
+            time.sleep(wait)
+            waited += wait
+
+    def record(self, status_code: int, retry_after: Optional[float] = None) -> None:
+        """Ajuste le débit selon la réponse : ralentit sur 429 et respecte Retry-After"""
+        if status_code == 429 or (retry_after is not None and status_code >= 500):
+            with self._state() as state:
+                now = time.time()
+                self._refill(state, now)
+                if status_code == 429:
+                    state[3] = max(MIN_RATE_FACTOR, state[3] * BACKOFF_FACTOR)
+                    state[0] = 0.0
+                    self._degraded = True
+                if retry_after is not None:
+                    state[2] = max(state[2], now + min(retry_after, self.max_pause))
+        elif status_code < 400 and self._degraded:
+            with self._state() as state:
+                state[3] = min(1.0, state[3] + RECOVERY_STEP)
+                self._degraded = state[3] < 1
+
+    def _refill(self, state: List[float], now: float) -> float:
+        # Pas de jetons accumulés pendant une pause Retry-After : la reprise se fait au débit réduit
+        elapsed = max(0.0, now - max(state[1], state[2]))
+        tokens = min(self.burst, state[0] + elapsed * self.rate * state[3])
+        state[0], state[1] = tokens, now
+        return tokens
+
+    @contextmanager
+    def _state(self) -> Iterator[List[float]]:
+        with self._lock:
+            fd = self._open()
+            if fd is None:
+                yield self._local
+                return
+
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            try:
+                data = os.pread(fd, _STATE.size, 0)
+                state = list(_STATE.unpack(data)) if len(data) == _STATE.size else [self.burst, time.time(), 0.0, 1.0]
+                yield state
+                os.pwrite(fd, _STATE.pack(*state), 0)
+            finally:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+
+    def _open(self) -> Optional[int]:
+        if not self.state_path:
+            return None
+        # Après un fork, chaque processus ouvre son propre descripteur
+        if self._fd is None or self._pid != os.getpid():
+            try:
+                if os.path.dirname(self.state_path):
+                    ensure_private_dir(os.path.dirname(self.state_path))
+                self._fd = os.open(self.state_path, os.O_RDWR | os.O_CREAT, 0o600)
+                self._pid = os.getpid()
+            except OSError as e:
+                logging.warning(f"Rate limiter state {self.state_path} unavailable, using in-process limit: {str(e)}")
+                self.state_path = ""
+                return None
+        return self._fd
+
+
+def _state_path(state_dir: str, host: str) -> str:
+    return os.path.join(state_dir, host.replace(":", "_") + ".bucket") if state_dir else ""
+
+
+class RateLimiter:
+    """Seaux à jetons par hôte placés devant chaque appel sortant du transport HTTP
+
+    `limits` associe un hôte (netloc) à (requêtes par seconde, rafale). Les hôtes absents
+    ou avec un débit nul ne sont pas limités. `batch_reserve` est la part de la rafale que
+    le trafic de fond ne peut pas consommer.
+
+    Tous les processus partagent un seul seau par hôte (jetons, pause, facteur de débit).
+    `caps` ajoute par-dessus un plafond propre à un lanceur (cf. bulk_analyze.py --rate),
+    partagé par ses seuls processus via `cap_state_dir` : il ne fait que retenir ce lanceur,
+    sans rien ajouter au budget commun.
+    """
+
+    def __init__(self, limits: Dict[str, Tuple[float, float]], state_dir: str = "",
+                 batch_reserve: float = 0.25, max_pause: float = 30.0,
+                 caps: Optional[Dict[str, Tuple[float, float]]] = None, cap_state_dir: str = ""):
+        self.batch_reserve = batch_reserve
+        # Priorité des appels faits hors de tout contexte `priority(...)` (threads de pools compris)
+        self.default_priority = INTERACTIVE
+        self._buckets = {}
+        for host, (rate, burst) in limits.items():
+            if rate > 0:
+                self._buckets[host] = TokenBucket(rate, burst, _state_path(state_dir, host), max_pause=max_pause)
+        self._caps = {}
+        for host, (rate, burst) in (caps or {}).items():
+            if rate > 0:
+                self._caps[host] = TokenBucket(rate, burst, _state_path(cap_state_dir, host), max_pause=max_pause)
+
+    def bucket_for(self, url: str) -> Optional[TokenBucket]:
+        return self._buckets.get(urlsplit(url).netloc)
+
+    def acquire(self, url: str) -> float:
+        """Attend l'autorisation d'envoyer une requête vers `url` ; renvoie le temps d'attente"""
+        host = urlsplit(url).netloc
+        # Le plafond passe d'abord : un jeton du seau commun n'est pas gardé pendant cette attente
+        cap = self._caps.get(host)
+        waited = cap.acquire() if cap is not None else 0.0
+        bucket = self._buckets.get(host)
+        if bucket is None:
+            return waited
+        level = _priority.get() or self.default_priority
+        # La réserve laisse toujours au moins un jeton atteignable au trafic de fond
+        reserve = min(bucket.burst * self.batch_reserve, bucket.burst - 1) if level == BATCH else 0.0
+        return waited + bucket.acquire(reserve)
+
+    def record(self, url: str, status_code: int, retry_after: Optional[float] = None) -> None:
+        # 429 et Retry-After concernent le seau commun, vu par tous les processus
+        bucket = self.bucket_for(url)
+        if bucket is not None:
+            bucket.record(status_code, retry_after)
+
+
+def build_rate_limiter(cap: Optional[float] = None, cap_state_dir: str = "") -> RateLimiter:
+    """Limiteur des APIs Spotify et CocktailDB configuré depuis Config
+
+    `cap` plafonne en plus chaque API à ce débit pour les processus partageant `cap_state_dir`.
+    """
+    hosts = {
+        urlsplit(Config.SPOTIFY_API_URL).netloc: Config.SPOTIFY_RATE_LIMIT,
+        urlsplit(Config.COCKTAILDB_API_URL).netloc: Config.COCKTAILDB_RATE_LIMIT
+    }
+    limits = {host: (rate, rate * Config.RATE_LIMIT_BURST_SECONDS) for host, rate in hosts.items()}
+    caps = {host: (cap, cap * Config.RATE_LIMIT_BURST_SECONDS) for host in hosts} if cap is not None else None
+    return RateLimiter(limits, state_dir=Config.RATE_LIMIT_STATE_DIR, batch_reserve=Config.RATE_LIMIT_BATCH_RESERVE,
+                       max_pause=Config.HTTP_RETRY_AFTER_MAX, caps=caps, cap_state_dir=cap_state_dir)
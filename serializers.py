@@ -0,0 +1,69 @@
+from typing import Any, Dict, List
+
+# Ordre des dimensions du vecteur de caractéristiques de MoodAnalyzer
+CHARACTERISTIC_NAMES = ["energy", "danceability", "emotion", "intensity", "sophistication"]
+# CocktailDB expose jusqu'à 15 paires strIngredientN / strMeasureN
+MAX_INGREDIENTS = 15
+
+
+def _compact(data: Dict[str, Any]) -> Dict[str, Any]:
+    """Supprime les champs nuls ou vides"""
+    return {key: value for key, value in data.items() if value not in (None, "", [], {})}
+
+
+def _clean(value: Any) -> Any:
+    return value.strip() if isinstance(value, str) else value
+
+
+def serialize_ingredients(drink: Dict[str, Any]) -> List[List[str]]:
+    """Ingrédients sous forme de listes compactes [nom] ou [nom, dose]"""
+    ingredients = []
+    for i in range(1, MAX_INGREDIENTS + 1):
+        name = _clean(drink.get(f"strIngredient{i}"))
+        if not name:
+            continue
+        measure = _clean(drink.get(f"strMeasure{i}"))
+        ingredients.append([name, measure] if measure else [name])
+    return ingredients
+
+
+def serialize_cocktail(drink: Dict[str, Any]) -> Dict[str, Any]:
+    """Fiche CocktailDB réduite aux champs utiles, sans les ~50 clés majoritairement nulles"""
+    return _compact({
+        "id": drink.get("idDrink"),
+        "name": drink.get("strDrink"),
+        "category": drink.get("strCategory"),
+        "alcoholic": drink.get("strAlcoholic"),
+        "glass": drink.get("strGlass"),
+        "image": drink.get("strDrinkThumb"),
+        "instructions": _clean(drink.get("strInstructions")),
+        "ingredients": serialize_ingredients(drink),
+        "mood_characteristics": drink.get("mood_characteristics")
+    })
+
+
+def serialize_analysis(result: Dict[str, Any]) -> Dict[str, Any]:
+    """Schéma JSON de /api/analyze à partir d'un résultat d'AnalysisService"""
+    playlist = result["playlist"]
+    data = {
+        "playlist": _compact({
+            "id": result.get("playlist_id"),
+            "snapshot_id": result.get("snapshot_id"),
+            "name": playlist.get("name"),
+            "description": playlist.get("description"),
+            "owner": playlist.get("owner"),
+            "image": playlist.get("image")
+        }),
+        "top_artists": [_compact({"name": name, "count": count, "genres": genres})
+                        for name, count, genres in result["top_artists"]],
+        "characteristics": {name: round(float(value), 4)
+                            for name, value in zip(CHARACTERISTIC_NAMES, result["characteristics"])},
+        "mood_scores": result["mood_scores"],
+        "dominant_moods": result["dominant_moods"],
+        "cocktails": [serialize_cocktail(drink) for drink in result["cocktails"]]
+    }
+    # Analyse combinée : playlists prises en compte
+    if "playlists" in result:
+        data["playlists"] = [_compact({key: playlist.get(key) for key in ("id", "name", "owner", "image")})
+                             for playlist in result["playlists"]]
+    return data
@@ -0,0 +1,110 @@
+"""Clients partagés par les requêtes : construction paresseuse et préchauffage en arrière-plan
+
+Aucun appel réseau n'a lieu à l'import de l'application : chaque client est construit au
+premier accès. Le préchauffage (token Spotify, graphe de visualisation, cache de cocktails)
+tourne dans un thread lancé après le fork de chaque worker (cf. gunicorn.conf.py) ; son
+état est exposé par /readyz.
+"""
+import logging
+import os
+import threading
+from typing import Any, Callable, Dict, Optional
+
+from analysis import AnalysisService
+from cocktail_client import CocktailClient
+from config import Config
+from mood_analyzer import MoodAnalyzer
+from rate_limiter import BATCH, priority
+from spotify_client import SpotifyClient
+from visualization_graph import VisualizationGraph
+
+PENDING = "pending"
+READY = "ready"
+FAILED = "failed"
+DISABLED = "disabled"
+
+
+class Services:
+    """Registre des clients d'un processus, construits à la demande de façon thread-safe"""
+
+    def __init__(self):
+        # Réentrant : le service d'analyse et le graphe dépendent des autres clients
+        self._lock = threading.RLock()
+        self._instances: Dict[str, Any] = {}
+        self._warm_up_pid: Optional[int] = None
+        self.status = {
+            "visualization_graph": PENDING,
+            "cocktail_cache": PENDING if Config.COCKTAIL_CACHE_PREWARM else DISABLED
+        }
+
+    def _get(self, name: str, factory: Callable[[], Any]) -> Any:
+        instance = self._instances.get(name)
+        if instance is None:
+            with self._lock:
+                instance = self._instances.get(name)
+                if instance is None:
+                    instance = self._instances[name] = factory()
+        return instance
+
+    @property
+    def spotify_client(self) -> SpotifyClient:
+        return self._get("spotify_client", SpotifyClient)
+
+    @property
+    def cocktail_client(self) -> CocktailClient:
+        return self._get("cocktail_client", CocktailClient)
+
+    @property
+    def mood_analyzer(self) -> MoodAnalyzer:
+        return self._get("mood_analyzer", MoodAnalyzer)
+
+    @property
+    def visualization_graph(self) -> VisualizationGraph:
+        return self._get("visualization_graph", lambda: VisualizationGraph(self.mood_analyzer, self.cocktail_client))
+
+    @property
+    def analysis_service(self) -> AnalysisService:
+        return self._get("analysis_service",
+                         lambda: AnalysisService(self.spotify_client, self.cocktail_client, self.mood_analyzer))
+
+    def start_warm_up(self) -> None:
+        """Lance (une fois par processus) le préchauffage en arrière-plan"""
+        if self._warm_up_pid == os.getpid():
+            return
+        with self._lock:
+            if self._warm_up_pid == os.getpid():
+                return
+            self._warm_up_pid = os.getpid()
+        threading.Thread(target=self.warm_up, name="warm-up", daemon=True).start()
+
+    def warm_up(self) -> None:
+        # Le token est obtenu et renouvelé par le thread de rafraîchissement du TokenManager
+        self._run("spotify_token", lambda: self.spotify_client.warm_up())
+        self._run("visualization_graph", lambda: self.visualization_graph.get())
+        if Config.COCKTAIL_CACHE_PREWARM:
+            # Trafic de fond : laisse la réserve du limiteur aux requêtes /analyze
+            with priority(BATCH):
+                self._run("cocktail_cache", lambda: self.cocktail_client.prewarm())
+
+    def _run(self, step: str, fn: Callable[[], Any]) -> None:
+        try:
+            fn()
+            if step in self.status:
+                self.status[step] = READY
+        except Exception as e:
+            logging.error(f"Warm-up step {step} failed: {str(e)}")
+            if step in self.status:
+                self.status[step] = FAILED
+
+    def readiness(self) -> Dict[str, Any]:
+        """État du préchauffage ; prêt quand le token Spotify est valide et le graphe construit"""
+        spotify_client = self._instances.get("spotify_client")
+        graph = self._instances.get("visualization_graph")
+        checks = dict(self.status)
+        checks["spotify_token"] = READY if spotify_client is not None and spotify_client.is_ready() else PENDING
+        # Le graphe a pu être construit par une requête avant (ou sans) le préchauffage
+        if graph is not None and graph.is_ready():
+            checks["visualization_graph"] = READY
+        # Le préchargement des cocktails n'est qu'une optimisation : il ne conditionne pas la disponibilité
+        ready = checks["spotify_token"] == READY and checks["visualization_graph"] == READY
+        return {"ready": ready, "checks": checks}
@@ -0,0 +1,229 @@
+"""Coalescence des appels identiques en cours (« single-flight »)
+
+Quand plusieurs requêtes demandent la même ressource au même moment (playlist virale),
+un seul appel part vers l'API et son résultat est partagé :
+- dans un processus, les appels suivants attendent le Future de l'appel en cours ;
+- entre processus, le premier worker prend le verrou flock de la clé (un fichier par clé)
+  et dépose son résultat dans un fichier de passage que lisent les workers qui attendaient.
+
+Ce n'est pas un cache : un appel qui arrive après la fin de l'appel en cours refait la requête.
+"""
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+
+from metrics import SINGLE_FLIGHT
+from private_dir import ensure_private_dir
+
+try:
+    import fcntl
+except ImportError:  # Windows : coalescence limitée au processus
+    fcntl = None
+
+_MISSING = object()
+
+# Intervalle de scrutation du verrou quand un autre worker fait déjà l'appel
+LOCK_POLL_INTERVAL = 0.01
+# Ménage des fichiers de passage et de verrou toutes les N requêtes menées par ce processus
+SWEEP_EVERY = 200
+
+
+class SingleFlight:
+    """Partage le résultat d'un appel en cours entre les appelants concurrents d'une même clé
+
+    Sans `handoff_dir` (ou sans fcntl), la coalescence se limite au processus. Les résultats
+    passés entre processus doivent être sérialisables en JSON.
+    """
+
+    def __init__(self, namespace: str, handoff_dir: str = "", lock_timeout: float = 10.0,
+                 handoff_ttl: float = 30.0):
+        self.namespace = namespace
+        self.handoff_dir = os.path.join(handoff_dir, namespace) if handoff_dir and fcntl is not None else ""
+        self.lock_timeout = lock_timeout
+        self.handoff_ttl = handoff_ttl
+        self._lock = threading.Lock()
+        self._inflight: Dict[str, Future] = {}
+        self._leads = 0
+        self._dir_checked = False
+
+    def do(self, key: str, fn: Callable[[], Any]) -> Any:
+        """Renvoie fn(), ou le résultat de l'appel identique déjà en cours"""
+        with self._lock:
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = self._inflight[key] = Future()
+
+        if not leader:
+            SINGLE_FLIGHT.inc(namespace=self.namespace, outcome="shared")
+            return future.result()
+
+        try:
+            value = self._lead(key, fn)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(value)
+            return value
+        finally:
+            with self._lock:
+                del self._inflight[key]
+
+    def claim(self, keys: Iterable[str]) -> Tuple[Dict[str, Future], Dict[str, Future]]:
+        """Réserve les clés libres pour un appel groupé (coalescence dans le processus uniquement)
+
+        Renvoie (futures réservés, futures déjà en cours) ; l'appelant doit ensuite passer
+        les futures réservés à `resolve`, même en cas d'erreur.
+        """
+        owned, pending = {}, {}
+        with self._lock:
+            for key in keys:
+                future = self._inflight.get(key)
+                if future is None:
+                    owned[key] = self._inflight[key] = Future()
+                else:
+                    pending[key] = future
+        if pending:
+            SINGLE_FLIGHT.inc(len(pending), namespace=self.namespace, outcome="shared")
+        return owned, pending
+
+    def resolve(self, owned: Dict[str, Future], values: Dict[str, Any]) -> None:
+        """Publie les résultats des clés réservées par `claim` (None pour les clés absentes)"""
+        with self._lock:
+            for key in owned:
+                self._inflight.pop(key, None)
+        for key, future in owned.items():
+            future.set_result(values.get(key))
+
+    def _lead(self, key: str, fn: Callable[[], Any]) -> Any:
+        if not self.handoff_dir:
+            SINGLE_FLIGHT.inc(namespace=self.namespace, outcome="leader")
+            return fn()
+
+        digest = hashlib.sha256(key.encode("utf-8")).hexdigest()
+        started = time.time()
+        try:
+            fd, waited = self._acquire(digest)
+        except OSError as e:
+            logging.warning(f"Single-flight directory {self.handoff_dir} unavailable, "
+                            f"coalescing in-process only: {str(e)}")
+            self.handoff_dir = ""
+            return self._lead(key, fn)
+
+        if fd is None:
+            # Le worker qui mène l'appel met trop longtemps : on n'attend plus
+            SINGLE_FLIGHT.inc(namespace=self.namespace, outcome="leader")
+            return fn()
+
+        try:
+            path = os.path.join(self.handoff_dir, f"{digest}.json")
+            if waited:
+                value = self._read_handoff(path, started)
+                if value is not _MISSING:
+                    SINGLE_FLIGHT.inc(namespace=self.namespace, outcome="handoff")
+                    return value
+            SINGLE_FLIGHT.inc(namespace=self.namespace, outcome="leader")
+            value = fn()
+            self._write_handoff(path, value)
+            return value
+        finally:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+            os.close(fd)
+
+    def _acquire(self, digest: str) -> Tuple[Optional[int], bool]:
+        """Prend le verrou de la clé ; renvoie (descripteur ou None si délai dépassé, a attendu)"""
+        if not self._dir_checked:
+            # Un autre utilisateur ne doit pas pouvoir y déposer de résultats
+            ensure_private_dir(os.path.dirname(self.handoff_dir))
+            ensure_private_dir(self.handoff_dir)
+            self._dir_checked = True
+        # Un fichier par clé : deux clés différentes ne s'attendent jamais
+        path = os.path.join(self.handoff_dir, f"{digest}.lock")
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        deadline = time.time() + self.lock_timeout
+        waited = False
+        while True:
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                if time.time() >= deadline:
+                    os.close(fd)
+                    return None, waited
+                waited = True
+                time.sleep(LOCK_POLL_INTERVAL)
+                continue
+
+            # Le ménage a pu supprimer le fichier entre open et flock : on verrouille le nouveau
+            if self._is_current(fd, path):
+                return fd, waited
+            os.close(fd)
+            fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+
+    @staticmethod
+    def _is_current(fd: int, path: str) -> bool:
+        try:
+            current = os.stat(path)
+        except FileNotFoundError:
+            return False
+        locked = os.fstat(fd)
+        return (current.st_dev, current.st_ino) == (locked.st_dev, locked.st_ino)
+
+    def _read_handoff(self, path: str, started: float) -> Any:
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                handoff = json.load(f)
+        except (OSError, ValueError):
+            return _MISSING
+        # Seul un résultat produit pendant notre attente est repris (l'appel a pu échouer)
+        if handoff.get("written_at", 0) < started:
+            return _MISSING
+        return handoff.get("value")
+
+    def _write_handoff(self, path: str, value: Any) -> None:
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump({"written_at": time.time(), "value": value}, f)
+            os.replace(tmp_path, path)
+        except (OSError, TypeError, ValueError) as e:
+            logging.warning(f"Could not write single-flight handoff {path}: {str(e)}")
+            return
+
+        self._leads += 1
+        if self._leads % SWEEP_EVERY == 0:
+            self._sweep()
+
+    def _sweep(self) -> None:
+        expired_before = time.time() - self.handoff_ttl
+        try:
+            for entry in os.scandir(self.handoff_dir):
+                if entry.stat().st_mtime >= expired_before:
+                    continue
+                if entry.name.endswith(".json"):
+                    os.remove(entry.path)
+                elif entry.name.endswith(".lock"):
+                    self._remove_lock(entry.path)
+        except OSError:
+            pass
+
+    @staticmethod
+    def _remove_lock(path: str) -> None:
+        """Supprime un fichier de verrou inutilisé (jamais celui d'un appel en cours)"""
+        fd = os.open(path, os.O_RDWR)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(fd)
+            return
+        try:
+            os.remove(path)
+        finally:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+            os.close(fd)
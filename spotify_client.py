@@ -1,20 +1,104 @@
-import requests
 import base64
+import contextvars
 import logging
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Dict
+from urllib.parse import urlsplit
 from config import Config
+from http_transport import get_transport
+from cache import build_cache
+from token_manager import TokenManager
+from metrics import stage_timer
+from singleflight import SingleFlight
+
+try:
+    import ijson
+except ImportError:  # ijson est optionnel : les pages de pistes sont alors décodées en entier
+    ijson = None
+
+# Nombre maximal d'IDs acceptés par GET /v1/artists
+ARTISTS_BATCH_SIZE = 50
+# Taille de page maximale de GET /v1/playlists/{id}/tracks
+TRACKS_PAGE_SIZE = 100
+# Taille de page maximale de GET /v1/users/{id}/playlists
+USER_PLAYLISTS_PAGE_SIZE = 50
+# Filtre `fields=` : uniquement les clés lues par l'application (métadonnées + première page)
+# `total` permet de demander les pages suivantes en parallèle, l'ID de piste de dédupliquer entre playlists
+PLAYLIST_SNAPSHOT_FIELDS = (
+    "name,description,snapshot_id,owner(display_name),images(url),"
+    "tracks(next,total,items(track(id,artists(id))))"
+)
+# Filtre `fields=` des pages suivantes : seuls les IDs de pistes et d'artistes et le lien `next` sont lus
+TRACKS_PAGE_FIELDS = "next,items(track(id,artists(id)))"
+
+
+def _first_artist_item(item):
+    """Réduit une piste à son ID et à celui de son premier artiste (forme lue par _count_top_artists)"""
+    track = item.get("track")
+    if not track:
+        return {"track": None}
+    artists = track.get("artists") or []
+    return {"track": {"id": track.get("id"), "artists": [{"id": artists[0].get("id")}] if artists else []}}
+
+
+class SpotifyAPIError(Exception):
+    """Réponse d'erreur de l'API Spotify ; `status_code` est le statut HTTP renvoyé"""
+
+    def __init__(self, message, status_code=None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class SpotifyAuthError(SpotifyAPIError):
+    """Échec de l'obtention d'un token : identifiants ou configuration, pas la ressource demandée"""
+
+
+@dataclass
+class PlaylistSnapshot:
+    """Métadonnées d'une playlist et première page de pistes, obtenues en une seule requête"""
+    playlist_id: str
+    snapshot_id: str
+    info: Dict[str, str]
+    first_page: Dict[str, Any]
+
 
 class SpotifyClient:
-    def __init__(self):
+    def __init__(self, transport=None):
+        self.http = transport or get_transport()
         self.client_id = Config.SPOTIFY_CLIENT_ID
         self.client_secret = Config.SPOTIFY_CLIENT_SECRET
-        self.token = None
-        try:
-            self.token = self._get_token()
-        except Exception as e:
-            logging.error(f"Failed to initialize Spotify client: {str(e)}")
-            raise
+        # Nom et genres par ID d'artiste : en mémoire et, si configuré, sur disque partagé entre workers
+        self.artist_cache = build_cache("artists", maxsize=Config.ARTIST_CACHE_SIZE, ttl=Config.ARTIST_CACHE_TTL,
+                                        path=Config.CACHE_DB_PATH,
+                                        persistent_maxsize=Config.ARTIST_CACHE_PERSISTENT_SIZE)
+        # Une playlist demandée par plusieurs utilisateurs en même temps n'est lue qu'une fois
+        self.playlist_flight = SingleFlight("playlists", handoff_dir=Config.SINGLE_FLIGHT_DIR,
+                                            lock_timeout=Config.SINGLE_FLIGHT_LOCK_TIMEOUT)
+        # Artistes : coalescence dans le processus (le cache d'artistes est déjà partagé entre workers)
+        self.artist_flight = SingleFlight("artists")
+        # Pool borné pour les requêtes parallèles des analyses multi-playlists
+        self._executor = ThreadPoolExecutor(max_workers=Config.SPOTIFY_FETCH_WORKERS,
+                                            thread_name_prefix="spotify-fetch")
+        # Token partagé entre workers et renouvelé en arrière-plan avant expiration
+        # Aucun appel réseau ici : le token est demandé au premier appel ou par warm_up()
+        self.token_manager = TokenManager(self._request_token, cache_path=Config.SPOTIFY_TOKEN_CACHE,
+                                          cache_key=self.client_id)
 
-    def _get_token(self):
+    def warm_up(self):
+        """Lance le thread qui obtient le token puis le renouvelle avant son expiration"""
+        self.token_manager.start_background_refresh()
+
+    def is_ready(self):
+        return self.token_manager.has_token()
+
+    @property
+    def token(self):
+        return self.token_manager.get_token()
+
+    def _request_token(self):
+        """Demande un nouveau token client-credentials et renvoie la réponse complète (access_token, expires_in)"""
         auth_string = f"{self.client_id}:{self.client_secret}"
         auth_bytes = auth_string.encode("utf-8")
         auth_base64 = base64.b64encode(auth_bytes).decode("utf-8")
@@ -25,7 +109,8 @@ class SpotifyClient:
         }
 
         data = {"grant_type": "client_credentials"}
-        response = requests.post("https://accounts.spotify.com/api/token", headers=headers, data=data)
+        with stage_timer("spotify_token"):
+            response = self.http.post(Config.SPOTIFY_TOKEN_URL, headers=headers, data=data)
 
         if response.status_code != 200:
             error_msg = f"Failed to get Spotify token. Status: {response.status_code}"
@@ -34,40 +119,182 @@ class SpotifyClient:
             except:
                 pass
             logging.error(error_msg)
-            raise Exception(error_msg)
+            raise SpotifyAuthError(error_msg, response.status_code)
 
         token_data = response.json()
         if "access_token" not in token_data:
             error_msg = f"Invalid token response: {token_data}"
             logging.error(error_msg)
-            raise Exception(error_msg)
+            raise SpotifyAuthError(error_msg)
+
+        return token_data
+
+    def _get_token(self):
+        return self._request_token()["access_token"]
+
+    def _api_get(self, url, **kwargs):
+        """GET authentifié ; en cas de 401 le token est invalidé et la requête rejouée une fois"""
+        token = self.token
+        response = self.http.get(url, headers={"Authorization": f"Bearer {token}"}, **kwargs)
 
-        return token_data["access_token"]
+        if response.status_code == 401:
+            logging.warning("Spotify token rejected, refreshing and retrying once")
+            self.token_manager.invalidate(token)
+            response = self.http.get(url, headers={"Authorization": f"Bearer {self.token}"}, **kwargs)
+
+        return response
+
+    def _imap(self, fn, items):
+        """Comme executor.map (ordre conservé), avec le contexte de l'appelant (priorité des appels sortants)
+
+        Au plus SPOTIFY_FETCH_WINDOW appels d'une même requête sont soumis au pool partagé : un
+        nouvel appel part quand le plus ancien a été lu, et une analyse volumineuse ne remplit ni
+        la file du pool ni la mémoire de pages en attente.
+        """
+        pending = deque()
+        for item in items:
+            if len(pending) >= Config.SPOTIFY_FETCH_WINDOW:
+                yield pending.popleft().result()
+            pending.append(self._executor.submit(contextvars.copy_context().run, fn, item))
+        while pending:
+            yield pending.popleft().result()
+
+    def _map(self, fn, items):
+        return list(self._imap(fn, items))
 
     def get_artist_details(self, artist_id):
         """Récupère les détails d'un artiste, y compris ses genres"""
-        headers = {"Authorization": f"Bearer {self.token}"}
-        response = requests.get(f"https://api.spotify.com/v1/artists/{artist_id}", headers=headers)
+        cached = self.artist_cache.get(artist_id)
+        if cached is not None:
+            return cached
+
+        details = self.artist_flight.do(artist_id, lambda: self._fetch_artist_details(artist_id))
+        return details or {"name": "", "genres": []}
+
+    def _fetch_artist_details(self, artist_id):
+        response = self._api_get(f"{Config.SPOTIFY_API_URL}/artists/{artist_id}")
 
         if response.status_code != 200:
             logging.error(f"Failed to get artist details. Status: {response.status_code}")
-            return {"name": "", "genres": []}
+            return None
 
         artist_data = response.json()
-        return {
+        details = {
             "name": artist_data.get("name", ""),
             "genres": artist_data.get("genres", [])
         }
-    
+        self.artist_cache.set(artist_id, details)
+        return details
+
+    def get_artists_details(self, artist_ids):
+        """Récupère les détails de plusieurs artistes : cache d'abord, puis lots de 50 (endpoint several-artists)"""
+        details = {}
+        missing_ids = []
+        # Les pistes locales n'ont pas d'ID d'artiste
+        for artist_id in dict.fromkeys(artist_id for artist_id in artist_ids if artist_id):
+            cached = self.artist_cache.get(artist_id)
+            if cached is not None:
+                details[artist_id] = cached
+            else:
+                missing_ids.append(artist_id)
+
+        # Les IDs déjà demandés par une autre requête en cours ne sont pas redemandés
+        owned, pending = self.artist_flight.claim(missing_ids)
+        try:
+            self._fetch_artists_batches(list(owned), details)
+        finally:
+            self.artist_flight.resolve(owned, details)
+        for artist_id, future in pending.items():
+            shared = future.result()
+            if shared is not None:
+                details[artist_id] = shared
+
+        return {artist_id: details.get(artist_id, {"name": "", "genres": []})
+                for artist_id in artist_ids}
+
+    def _fetch_artists_batches(self, artist_ids, details):
+        for start in range(0, len(artist_ids), ARTISTS_BATCH_SIZE):
+            batch = artist_ids[start:start + ARTISTS_BATCH_SIZE]
+            response = self._api_get(f"{Config.SPOTIFY_API_URL}/artists", params={"ids": ",".join(batch)})
+
+            if response.status_code != 200:
+                logging.error(f"Failed to get artists details. Status: {response.status_code}")
+                continue
+
+            for artist_data in response.json().get("artists", []):
+                # Spotify renvoie null pour les IDs inconnus
+                if artist_data and artist_data.get("id"):
+                    details[artist_data["id"]] = {
+                        "name": artist_data.get("name", ""),
+                        "genres": artist_data.get("genres", [])
+                    }
+                    self.artist_cache.set(artist_data["id"], details[artist_data["id"]])
+
+    @staticmethod
+    def _parse_playlist_id(playlist_url):
+        return playlist_url.split('/')[-1].split('?')[0]
+
+    @staticmethod
+    def _parse_user_id(user_url):
+        return user_url.rstrip('/').split('/')[-1].split('?')[0]
+
+    @staticmethod
+    def _extract_playlist_info(playlist_data):
+        return {
+            "name": playlist_data.get("name", ""),
+            "description": playlist_data.get("description", ""),
+            "owner": (playlist_data.get("owner") or {}).get("display_name", ""),
+            "image": (playlist_data.get("images") or [{}])[0].get("url", "")
+        }
+
+    def get_playlist_snapshot(self, playlist_url):
+        """Récupère métadonnées et première page de pistes en un seul aller-retour"""
+        if not self.token:
+            raise Exception("Spotify client not properly initialized")
+
+        try:
+            playlist_id = self._parse_playlist_id(playlist_url)
+            playlist_data = self.playlist_flight.do(f"snapshot:{playlist_id}",
+                                                    lambda: self._fetch_playlist_snapshot(playlist_id))
+            return PlaylistSnapshot(
+                playlist_id=playlist_id,
+                snapshot_id=playlist_data.get("snapshot_id", ""),
+                info=self._extract_playlist_info(playlist_data),
+                first_page=playlist_data.get("tracks") or {"items": [], "next": None}
+            )
+
+        except Exception as e:
+            logging.error(f"Error getting playlist snapshot: {str(e)}")
+            raise
+
+    def get_playlist_snapshots(self, playlist_urls):
+        """Snapshots de plusieurs playlists demandés en parallèle (une playlist répétée n'est lue qu'une fois)"""
+        playlist_ids = list(dict.fromkeys(self._parse_playlist_id(playlist_url) for playlist_url in playlist_urls))
+        return self._map(self.get_playlist_snapshot, playlist_ids)
+
+    def _fetch_playlist_snapshot(self, playlist_id):
+        response = self._api_get(f"{Config.SPOTIFY_API_URL}/playlists/{playlist_id}",
+                                 params={"fields": PLAYLIST_SNAPSHOT_FIELDS})
+
+        if response.status_code != 200:
+            error_msg = f"Failed to get playlist. Status: {response.status_code}"
+            try:
+                error_msg += f", Details: {response.json()}"
+            except:
+                pass
+            logging.error(error_msg)
+            raise SpotifyAPIError(error_msg, response.status_code)
+
+        return response.json()
+
     def get_playlist_info(self, playlist_url):
         if not self.token:
             raise Exception("Spotify client not properly initialized")
 
         try:
-            playlist_id = playlist_url.split('/')[-1].split('?')[0]
-            headers = {"Authorization": f"Bearer {self.token}"}
+            playlist_id = self._parse_playlist_id(playlist_url)
 
-            response = requests.get(f"https://api.spotify.com/v1/playlists/{playlist_id}", headers=headers)
+            response = self._api_get(f"{Config.SPOTIFY_API_URL}/playlists/{playlist_id}")
 
             if response.status_code != 200:
                 error_msg = f"Failed to get playlist. Status: {response.status_code}"
@@ -76,62 +303,238 @@ class SpotifyClient:
                 except:
                     pass
                 logging.error(error_msg)
-                raise Exception(error_msg)
+                raise SpotifyAPIError(error_msg, response.status_code)
 
-            playlist_data = response.json()
-            return {
-                "name": playlist_data.get("name", ""),
-                "description": playlist_data.get("description", ""),
-                "owner": playlist_data.get("owner", {}).get("display_name", ""),
-                "image": playlist_data.get("images", [{}])[0].get("url", "")
-            }
+            return self._extract_playlist_info(response.json())
 
         except Exception as e:
             logging.error(f"Error getting playlist info: {str(e)}")
             raise
 
-    def get_playlist_top_artists(self, playlist_url):
-        if not self.token:
-            raise Exception("Spotify client not properly initialized")
+    def get_user_profile(self, user_url):
+        """Nom et image d'un utilisateur Spotify"""
+        user_id = self._parse_user_id(user_url)
+        response = self._api_get(f"{Config.SPOTIFY_API_URL}/users/{user_id}")
 
-        try:
-            playlist_id = playlist_url.split('/')[-1].split('?')[0]
-            headers = {"Authorization": f"Bearer {self.token}"}
+        if response.status_code != 200:
+            error_msg = f"Failed to get user profile. Status: {response.status_code}"
+            logging.error(error_msg)
+            raise SpotifyAPIError(error_msg, response.status_code)
 
-            response = requests.get(f"https://api.spotify.com/v1/playlists/{playlist_id}/tracks", headers=headers)
+        user_data = response.json()
+        return {
+            "id": user_id,
+            "name": user_data.get("display_name") or user_id,
+            "image": (user_data.get("images") or [{}])[0].get("url", "")
+        }
+
+    def get_user_playlist_ids(self, user_url, limit=None):
+        """IDs des playlists publiques d'un utilisateur, dans l'ordre de son profil (au plus `limit`)"""
+        user_id = self._parse_user_id(user_url)
+        url = f"{Config.SPOTIFY_API_URL}/users/{user_id}/playlists"
+        params = {"limit": USER_PLAYLISTS_PAGE_SIZE}
+        playlist_ids = []
+
+        while url:
+            response = self._api_get(url, params=params)
 
             if response.status_code != 200:
-                error_msg = f"Failed to get playlist. Status: {response.status_code}"
-                try:
-                    error_msg += f", Details: {response.json()}"
-                except:
-                    pass
+                error_msg = f"Failed to get user playlists. Status: {response.status_code}"
                 logging.error(error_msg)
-                raise Exception(error_msg)
+                raise SpotifyAPIError(error_msg, response.status_code)
+
+            page = response.json()
+            for playlist in page.get("items") or []:
+                if playlist and playlist.get("id"):
+                    playlist_ids.append(playlist["id"])
+                    if limit is not None and len(playlist_ids) >= limit:
+                        return playlist_ids
+            # L'URL `next` contient déjà offset et limit
+            url, params = page.get("next"), None
+
+        return playlist_ids
+
+    def _request_tracks_page(self, url, params):
+        response = self._api_get(url, params=params, stream=True)
+
+        if response.status_code != 200:
+            error_msg = f"Failed to get playlist. Status: {response.status_code}"
+            try:
+                error_msg += f", Details: {response.json()}"
+            except:
+                pass
+            logging.error(error_msg)
+            raise SpotifyAPIError(error_msg, response.status_code)
+
+        return self._parse_tracks_page(response)
+
+    def _get_tracks_page(self, playlist_id, offset):
+        return self._request_tracks_page(f"{Config.SPOTIFY_API_URL}/playlists/{playlist_id}/tracks",
+                                         {"offset": offset, "limit": TRACKS_PAGE_SIZE, "fields": TRACKS_PAGE_FIELDS})
+
+    def iter_playlist_tracks(self, playlist_id, max_tracks=None, first_page=None):
+        """Itère sur les pistes d'une playlist page par page en suivant les liens `next`
+
+        Seule la page courante est gardée en mémoire ; `max_tracks` permet de limiter
+        le nombre de pistes lues sur les très grosses playlists. Si `first_page` est
+        fournie (cf. PlaylistSnapshot), elle n'est pas redemandée.
+        """
+        url = f"{Config.SPOTIFY_API_URL}/playlists/{playlist_id}/tracks"
+        params = {"limit": TRACKS_PAGE_SIZE, "fields": TRACKS_PAGE_FIELDS}
+        page = first_page
+        yielded = 0
 
-            tracks = response.json()["items"]
+        while page is not None or url:
+            if page is None:
+                page = self._request_tracks_page(url, params)
 
-            artists_data = {}
+            for item in page.get("items", []):
+                yield item
+                yielded += 1
+                if max_tracks is not None and yielded >= max_tracks:
+                    return
+
+            # L'URL `next` contient déjà offset et limit, mais pas toujours le filtre `fields`
+            url = page.get("next")
+            params = None if url and "fields=" in urlsplit(url).query else {"fields": TRACKS_PAGE_FIELDS}
+            page = None
+
+    @staticmethod
+    def _parse_tracks_page(response):
+        """Décode une page de pistes en ne gardant que l'ID du premier artiste de chaque piste
+
+        Avec ijson, la réponse est lue au fil du socket : l'arbre JSON complet n'est jamais construit.
+        """
+        try:
+            if ijson is None:
+                page = response.json()
+                return {"items": [_first_artist_item(item) for item in page.get("items") or []],
+                        "next": page.get("next")}
+
+            items, next_url = [], None
+            item, artists_seen = None, 0
+            # La réponse est décompressée (gzip) à la lecture
+            response.raw.decode_content = True
+            for prefix, event, value in ijson.parse(response.raw):
+                if prefix == "next":
+                    next_url = value
+                elif prefix == "items.item":
+                    if event == "start_map":
+                        item, artists_seen = {"track": None}, 0
+                    elif event == "end_map":
+                        items.append(item)
+                elif prefix == "items.item.track" and event == "start_map":
+                    item["track"] = {"id": None, "artists": []}
+                elif prefix == "items.item.track.id":
+                    item["track"]["id"] = value
+                elif prefix == "items.item.track.artists.item" and event == "start_map":
+                    artists_seen += 1
+                    if artists_seen == 1:
+                        item["track"]["artists"].append({"id": None})
+                elif prefix == "items.item.track.artists.item.id" and artists_seen == 1:
+                    item["track"]["artists"][0]["id"] = value
+            return {"items": items, "next": next_url}
+        finally:
+            response.close()
+
+    def _count_top_artists(self, tracks, limit=5):
+        """Compte les artistes principaux des pistes et renvoie les `limit` premiers (name, count, genres)"""
+        # Compter d'abord les occurrences au fil des pages, les détails sont récupérés ensuite par lots
+        artist_counts = {}
+        with stage_timer("playlist_pages"):
             for track in tracks:
                 if track.get("track") and track["track"].get("artists"):
-                    artist = track["track"]["artists"][0]
-                    artist_id = artist["id"]
-                    if artist_id not in artists_data:
-                        artist_details = self.get_artist_details(artist_id)
-                        artists_data[artist_id] = {
-                            "name": artist_details["name"],
-                            "count": 1,
-                            "genres": artist_details["genres"]
-                        }
-                    else:
-                        artists_data[artist_id]["count"] += 1
-
-            # Convert to list of tuples (name, count, genres)
-            artists_list = [(data["name"], data["count"], data["genres"]) 
-                          for data in artists_data.values()]
-
-            # Sort by count and take top 5
-            return sorted(artists_list, key=lambda x: x[1], reverse=True)[:5]
+                    artist_id = track["track"]["artists"][0]["id"]
+                    artist_counts[artist_id] = artist_counts.get(artist_id, 0) + 1
+
+        # Sort by count and take top 5 (tri stable : ordre d'apparition en cas d'égalité)
+        top_ids = sorted(artist_counts, key=lambda artist_id: artist_counts[artist_id], reverse=True)[:limit]
+        with stage_timer("artist_lookup"):
+            artists_details = self.get_artists_details(top_ids)
+
+        # Convert to list of tuples (name, count, genres)
+        return [(artists_details[artist_id]["name"], artist_counts[artist_id], artists_details[artist_id]["genres"])
+                for artist_id in top_ids]
+
+    def get_snapshot_top_artists(self, snapshot, max_tracks=None):
+        """Top artistes d'une playlist à partir d'un PlaylistSnapshot (la première page n'est pas redemandée)"""
+        def count():
+            tracks = self.iter_playlist_tracks(snapshot.playlist_id, max_tracks=max_tracks,
+                                               first_page=snapshot.first_page)
+            return self._count_top_artists(tracks)
+
+        try:
+            if not snapshot.snapshot_id:
+                return count()
+            # Les pages d'une même version de playlist ne sont parcourues qu'une fois pour les requêtes simultanées
+            top_artists = self.playlist_flight.do(f"top:{snapshot.playlist_id}:{snapshot.snapshot_id}:{max_tracks}",
+                                                  count)
+            # Les résultats passés entre workers reviennent du JSON sous forme de listes
+            return [tuple(artist) for artist in top_artists]
+
+        except Exception as e:
+            logging.error(f"Error getting playlist artists: {str(e)}")
+            raise
+
+    def get_playlists_top_artists(self, snapshots, max_tracks=None, limit=5):
+        """Top artistes combinés de plusieurs playlists (au plus `max_tracks` pistes lues par playlist)
+
+        Les pages de toutes les playlists sont demandées en parallèle, à partir du `total` de la
+        première page. Une piste présente dans plusieurs playlists n'est comptée qu'une fois et
+        chaque artiste n'est demandé qu'une fois, quel que soit le nombre de playlists.
+        """
+        tasks = []
+        for snapshot in snapshots:
+            total = snapshot.first_page.get("total")
+            if total is None:
+                # Pas de total : on suit les liens `next` de cette playlist
+                tasks.append((snapshot, None))
+                continue
+            tasks.append((snapshot, 0))
+            end = total if max_tracks is None else min(total, max_tracks)
+            start = len(snapshot.first_page.get("items") or [])
+            tasks.extend((snapshot, offset) for offset in range(start, end, TRACKS_PAGE_SIZE))
+
+        def fetch(task):
+            snapshot, offset = task
+            if offset is None:
+                return list(self.iter_playlist_tracks(snapshot.playlist_id, max_tracks=max_tracks,
+                                                      first_page=snapshot.first_page))
+            if offset == 0:
+                return snapshot.first_page.get("items") or []
+            return self._get_tracks_page(snapshot.playlist_id, offset)["items"]
+
+        def unique_tracks():
+            # Pages demandées par fenêtre glissante, lues dans l'ordre des playlists
+            seen, read = set(), {}
+            for (snapshot, _), items in zip(tasks, self._imap(fetch, tasks)):
+                for item in items:
+                    if max_tracks is not None:
+                        if read.get(snapshot.playlist_id, 0) >= max_tracks:
+                            break
+                        read[snapshot.playlist_id] = read.get(snapshot.playlist_id, 0) + 1
+                    # Les pistes locales n'ont pas d'ID : elles ne sont pas dédupliquées
+                    track_id = (item.get("track") or {}).get("id")
+                    if track_id:
+                        if track_id in seen:
+                            continue
+                        seen.add(track_id)
+                    yield item
+
+        try:
+            return self._count_top_artists(unique_tracks(), limit=limit)
+
+        except Exception as e:
+            logging.error(f"Error getting playlists artists: {str(e)}")
+            raise
+
+    def get_playlist_top_artists(self, playlist_url, max_tracks=None):
+        if not self.token:
+            raise Exception("Spotify client not properly initialized")
+
+        try:
+            playlist_id = self._parse_playlist_id(playlist_url)
+            return self._count_top_artists(self.iter_playlist_tracks(playlist_id, max_tracks=max_tracks))
 
         except Exception as e:
             logging.error(f"Error getting playlist artists: {str(e)}")
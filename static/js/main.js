@@ -1,3 +1,34 @@
+// Libellés des étapes d'une analyse asynchrone
+const JOB_STAGE_LABELS = {
+    playlist: 'Fetching playlist...',
+    artists: 'Looking up artists...',
+    moods: 'Analyzing moods...',
+    cocktails: 'Mixing cocktails...'
+};
+
+// Suit un job via Server-Sent Events et redirige vers les résultats une fois terminé
+function followJob(eventsUrl, resultUrl, onStage, onError) {
+    const source = new EventSource(eventsUrl);
+    source.addEventListener('progress', function(event) {
+        const job = JSON.parse(event.data);
+        if (job.stage) {
+            onStage(JOB_STAGE_LABELS[job.stage] || 'Analyzing...');
+        }
+        if (job.status === 'done') {
+            source.close();
+            window.location = resultUrl;
+        } else if (job.status === 'failed') {
+            source.close();
+            onError(job.error);
+        }
+    });
+    source.onerror = function() {
+        // Connexion perdue : la page de résultat affiche l'état courant du job
+        source.close();
+        window.location = resultUrl;
+    };
+}
+
 document.addEventListener('DOMContentLoaded', function() {
     // Add smooth scrolling
     document.querySelectorAll('a[href^="#"]').forEach(anchor => {
@@ -14,11 +45,46 @@ document.addEventListener('DOMContentLoaded', function() {
     if (form) {
         form.addEventListener('submit', function(e) {
             const button = this.querySelector('button[type="submit"]');
+            const setLabel = function(label) {
+                button.innerHTML = '<span class="spinner-border spinner-border-sm" role="status" aria-hidden="true"></span> ' + label;
+            };
             button.disabled = true;
-            button.innerHTML = '<span class="spinner-border spinner-border-sm" role="status" aria-hidden="true"></span> Analyzing...';
+            setLabel('Analyzing...');
+
+            // Mode job : la requête rend la main immédiatement, la progression arrive en SSE
+            const jobUrl = this.dataset.jobUrl;
+            if (!jobUrl || !window.EventSource || !window.fetch) {
+                return;
+            }
+            e.preventDefault();
+            const errorBox = document.getElementById('job-error');
+            fetch(jobUrl, {method: 'POST', body: new FormData(form)})
+                .then(response => {
+                    if (!response.ok) {
+                        throw new Error('job submission failed');
+                    }
+                    return response.json();
+                })
+                .then(job => followJob(job.events_url, job.result_url, setLabel, function(error) {
+                    button.disabled = false;
+                    button.innerHTML = 'Analyze Playlist';
+                    errorBox.textContent = error;
+                    errorBox.classList.remove('d-none');
+                }))
+                .catch(() => form.submit());
         });
     }
 
+    // Page d'attente d'un job (lien direct vers /jobs/<id>)
+    const jobStage = document.getElementById('job-stage');
+    if (jobStage) {
+        const setStage = function(label) {
+            jobStage.innerHTML = '<span class="spinner-border spinner-border-sm" role="status" aria-hidden="true"></span> ' + label;
+        };
+        followJob(jobStage.dataset.eventsUrl, jobStage.dataset.resultUrl, setStage,
+                  () => window.location = jobStage.dataset.resultUrl);
+    }
+
     // Add animation to cocktail cards
     const cards = document.querySelectorAll('.cocktail-card');
     cards.forEach((card, index) => {
@@ -0,0 +1,134 @@
+import pytest
+from unittest.mock import MagicMock
+from analysis import AnalysisService, analysis_seed, is_profile_url, parse_playlist_urls
+from cache import TTLCache, TieredCache
+from mood_analyzer import MoodAnalyzer
+from spotify_client import PlaylistSnapshot
+
+def make_snapshot(snapshot_id="snap1", playlist_id="p1", name="Party"):
+    return PlaylistSnapshot(
+        playlist_id=playlist_id,
+        snapshot_id=snapshot_id,
+        info={"name": name, "description": "", "owner": "Owner", "image": ""},
+        first_page={"items": [], "next": None}
+    )
+
+@pytest.fixture
+def service():
+    spotify_client = MagicMock()
+    spotify_client.get_playlist_snapshot.return_value = make_snapshot()
+    spotify_client.get_snapshot_top_artists.return_value = [("Artist1", 2, ["pop dance"]), ("Artist2", 1, [])]
+
+    cocktail_client = MagicMock()
+    cocktail_client.get_cocktails_by_moods.return_value = [
+        {"idDrink": "11007", "strDrink": "Margarita", "mood_characteristics": ["citrus", "bright"]}
+    ]
+    cocktail_client.get_cocktails_by_ids.side_effect = lambda selections: [
+        {"idDrink": selection["id"], "strDrink": "Margarita",
+         "mood_characteristics": selection["mood_characteristics"]}
+        for selection in selections
+    ]
+
+    return AnalysisService(spotify_client, cocktail_client, MoodAnalyzer(),
+                           result_cache=TieredCache(TTLCache(maxsize=10, ttl=60)))
+
+def test_analysis_seed_is_stable():
+    assert analysis_seed("p1", "snap1") == analysis_seed("p1", "snap1")
+    assert analysis_seed("p1", "snap1") != analysis_seed("p1", "snap2")
+    assert analysis_seed("p1", "snap1") != analysis_seed("p1", "snap1", max_tracks=100)
+
+def test_analyze_returns_full_result(service):
+    result = service.analyze("https://open.spotify.com/playlist/p1")
+    assert result["playlist"]["name"] == "Party"
+    assert result["top_artists"][0] == ("Artist1", 2, ["pop dance"])
+    assert len(result["characteristics"]) == 5
+    assert abs(sum(result["mood_scores"].values()) - 100) < 0.5
+    assert result["cocktails"][0]["strDrink"] == "Margarita"
+    kwargs = service.cocktail_client.get_cocktails_by_moods.call_args.kwargs
+    assert kwargs["seed"] == analysis_seed("p1", "snap1")
+
+def test_repeat_submission_is_served_from_cache(service):
+    first = service.analyze("https://open.spotify.com/playlist/p1")
+    second = service.analyze("https://open.spotify.com/playlist/p1")
+
+    # Seule la requête de métadonnées est rejouée
+    assert service.spotify_client.get_playlist_snapshot.call_count == 2
+    assert service.spotify_client.get_snapshot_top_artists.call_count == 1
+    assert service.cocktail_client.get_cocktails_by_moods.call_count == 1
+    assert second["mood_scores"] == first["mood_scores"]
+    assert second["top_artists"] == first["top_artists"]
+    assert second["cocktails"][0]["mood_characteristics"] == ["citrus", "bright"]
+
+def test_new_snapshot_invalidates_cache(service):
+    service.analyze("https://open.spotify.com/playlist/p1")
+    service.spotify_client.get_playlist_snapshot.return_value = make_snapshot("snap2")
+    service.analyze("https://open.spotify.com/playlist/p1")
+    assert service.spotify_client.get_snapshot_top_artists.call_count == 2
+
+def test_parse_playlist_urls():
+    text = "https://open.spotify.com/playlist/p1\nhttps://open.spotify.com/playlist/p2, https://open.spotify.com/playlist/p1"
+    assert parse_playlist_urls(text) == ["https://open.spotify.com/playlist/p1", "https://open.spotify.com/playlist/p2"]
+    assert parse_playlist_urls("  ") == []
+    assert is_profile_url("https://open.spotify.com/user/someone?si=x")
+    assert not is_profile_url("https://open.spotify.com/playlist/p1")
+
+def test_analyze_playlists_combines_into_one_profile(service):
+    spotify_client = service.spotify_client
+    spotify_client.get_playlist_snapshots.return_value = [make_snapshot("s1", "p1", "Party"),
+                                                          make_snapshot("s2", "p2", "Chill")]
+    spotify_client.get_playlists_top_artists.return_value = [("Artist1", 5, ["pop dance"])]
+
+    result = service.analyze_playlists(["p2", "p1"])
+    assert result["playlist"]["name"] == "2 playlists"
+    assert result["playlist"]["description"] == "Party, Chill"
+    assert [playlist["id"] for playlist in result["playlists"]] == ["p1", "p2"]
+    assert result["top_artists"] == [("Artist1", 5, ["pop dance"])]
+    # Un seul passage sur l'ensemble des playlists, pas une analyse par playlist
+    spotify_client.get_playlists_top_artists.assert_called_once()
+    spotify_client.get_snapshot_top_artists.assert_not_called()
+    # Nombre de pistes lues par playlist borné dans une analyse combinée
+    assert spotify_client.get_playlists_top_artists.call_args.kwargs["max_tracks"] == 500
+
+    # Même ensemble de versions : servi depuis le cache
+    service.analyze_playlists(["p1", "p2"])
+    assert spotify_client.get_playlists_top_artists.call_count == 1
+    spotify_client.get_playlist_snapshots.return_value = [make_snapshot("s1", "p1"), make_snapshot("s3", "p2")]
+    service.analyze_playlists(["p1", "p2"])
+    assert spotify_client.get_playlists_top_artists.call_count == 2
+
+def test_analyze_profile_uses_public_playlists(service):
+    spotify_client = service.spotify_client
+    spotify_client.get_user_profile.return_value = {"id": "u1", "name": "DJ", "image": "https://avatar"}
+    spotify_client.get_user_playlist_ids.return_value = ["p1", "p2"]
+    spotify_client.get_playlist_snapshots.return_value = [make_snapshot("s1", "p1"), make_snapshot("s2", "p2")]
+    spotify_client.get_playlists_top_artists.return_value = [("Artist1", 5, ["pop dance"])]
+
+    result = service.analyze_profile("https://open.spotify.com/user/u1")
+    assert result["playlist_id"] == "user:u1"
+    assert result["playlist"] == {"name": "DJ", "description": "2 public playlists", "owner": "DJ",
+                                  "image": "https://avatar"}
+    spotify_client.get_playlist_snapshots.assert_called_once_with(["p1", "p2"])
+
+    spotify_client.get_user_playlist_ids.return_value = []
+    with pytest.raises(Exception, match="No public playlist"):
+        service.analyze_profile("https://open.spotify.com/user/u1")
+
+def test_capped_analysis_does_not_share_cache_with_full_analysis(service):
+    capped = AnalysisService(service.spotify_client, service.cocktail_client, service.mood_analyzer,
+                             result_cache=service.result_cache, max_tracks=100)
+    capped.analyze("https://open.spotify.com/playlist/p1")
+    service.analyze("https://open.spotify.com/playlist/p1")
+    assert service.spotify_client.get_snapshot_top_artists.call_count == 2
+    capped.analyze("https://open.spotify.com/playlist/p1")
+    assert service.spotify_client.get_snapshot_top_artists.call_count == 2
+
+def test_profile_urls_are_expanded_in_combined_analysis(service):
+    spotify_client = service.spotify_client
+    spotify_client.get_user_playlist_ids.return_value = ["p1", "p2"]
+    spotify_client.get_playlist_snapshots.return_value = [make_snapshot("s1", "p1"), make_snapshot("s3", "p3")]
+    spotify_client.get_playlists_top_artists.return_value = [("Artist1", 5, ["pop dance"])]
+
+    service.analyze_playlists(["https://open.spotify.com/user/u1", "https://open.spotify.com/playlist/p3"])
+    spotify_client.get_user_playlist_ids.assert_called_once_with("https://open.spotify.com/user/u1", limit=50)
+    spotify_client.get_playlist_snapshots.assert_called_once_with(
+        ["p1", "p2", "https://open.spotify.com/playlist/p3"])
@@ -0,0 +1,29 @@
+import pytest
+from unittest.mock import patch
+import app as app_module
+from spotify_client import SpotifyAPIError, SpotifyAuthError
+
+@pytest.fixture
+def client():
+    with patch.object(app_module.services, 'start_warm_up'):
+        yield app_module.app.test_client()
+
+@pytest.mark.parametrize("error, status", [
+    (SpotifyAPIError("Failed to get playlist. Status: 404", 404), 404),
+    (SpotifyAPIError("Failed to get playlist. Status: 400, Details: Invalid base62 id", 400), 400),
+    (SpotifyAPIError("Failed to get playlist. Status: 429", 429), 503),
+    (SpotifyAPIError("Failed to get playlist. Status: 503", 503), 502),
+    (ConnectionError("Connection reset"), 502),
+    (KeyError("playlist"), 500)
+])
+def test_api_analyze_returns_404_only_for_missing_playlists(client, error, status):
+    with patch.object(app_module, 'run_analysis', side_effect=error):
+        response = client.post("/api/analyze", json={"playlist_url": "https://open.spotify.com/playlist/p1"})
+    assert response.status_code == status
+
+def test_user_error_message_distinguishes_upstream_errors():
+    assert "not found" in app_module.user_error_message(SpotifyAPIError("Failed to get playlist. Status: 404", 404))
+    assert "invalid" in app_module.user_error_message(SpotifyAPIError("Invalid base62 id", 400))
+    assert "unavailable" in app_module.user_error_message(SpotifyAPIError("Failed to get playlist. Status: 503", 503))
+    assert "authenticate" in app_module.user_error_message(SpotifyAuthError("Failed to get Spotify token. Status: 400", 400))
+    assert "An error occurred" in app_module.user_error_message(KeyError("playlist"))
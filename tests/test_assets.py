@@ -0,0 +1,79 @@
+import gzip
+import json
+import os
+import pytest
+from flask import Flask
+import assets
+from assets import AssetManifest, build, send_dist_asset
+
+CSS = b"body { color: #222; }\n" * 100
+
+@pytest.fixture
+def static_dir(tmp_path):
+    (tmp_path / "css").mkdir()
+    (tmp_path / "css" / "style.css").write_bytes(CSS)
+    (tmp_path / "js").mkdir()
+    (tmp_path / "js" / "tiny.js").write_bytes(b"x();")
+    return tmp_path
+
+def test_build_writes_hashed_and_compressed_assets(static_dir):
+    dist_dir = str(static_dir / "dist")
+    manifest = build(str(static_dir), dist_dir, icon_source=None)
+
+    css_path = manifest["css/style.css"]
+    assert css_path.startswith("dist/css/style.") and css_path.endswith(".css")
+    assert (static_dir / css_path).read_bytes() == CSS
+    assert gzip.decompress((static_dir / (css_path + ".gz")).read_bytes()) == CSS
+    # Les petits fichiers ne sont pas compressés
+    assert not os.path.exists(static_dir / (manifest["js/tiny.js"] + ".gz"))
+    with open(os.path.join(dist_dir, "manifest.json")) as f:
+        assert json.load(f) == manifest
+
+def test_build_hash_changes_with_content(static_dir):
+    first = build(str(static_dir), str(static_dir / "dist"), icon_source=None)
+    (static_dir / "css" / "style.css").write_bytes(CSS + b"a { }\n")
+    second = build(str(static_dir), str(static_dir / "dist"), icon_source=None)
+    assert first["css/style.css"] != second["css/style.css"]
+    assert first["js/tiny.js"] == second["js/tiny.js"]
+    # Le build repart d'un dossier propre
+    assert not os.path.exists(static_dir / first["css/style.css"])
+
+def test_build_resizes_icon(static_dir, tmp_path):
+    Image = pytest.importorskip("PIL.Image")
+    icon = str(tmp_path / "icon.png")
+    Image.new("RGBA", (1024, 1024), (255, 0, 0, 255)).save(icon)
+    manifest = build(str(static_dir), str(static_dir / "dist"), icon_source=icon)
+    for size in assets.ICON_SIZES:
+        with Image.open(static_dir / manifest[f"icons/icon-{size}.png"]) as resized:
+            assert resized.size == (size, size)
+
+def test_manifest_falls_back_and_reloads(static_dir):
+    app = Flask(__name__)
+    manifest = AssetManifest(str(static_dir / "dist" / "manifest.json"))
+    with app.test_request_context():
+        assert manifest.url("css/style.css") == "/static/css/style.css"
+        assert not manifest.has("css/style.css")
+        entries = build(str(static_dir), str(static_dir / "dist"), icon_source=None)
+        assert manifest.url("css/style.css") == f"/static/{entries['css/style.css']}"
+
+def test_send_dist_asset_prefers_precompressed_variant(static_dir):
+    dist_dir = str(static_dir / "dist")
+    manifest = build(str(static_dir), dist_dir, icon_source=None)
+    filename = manifest["css/style.css"][len("dist/"):]
+
+    app = Flask(__name__)
+    app.add_url_rule("/static/dist/<path:filename>", "dist_asset",
+                     lambda filename: send_dist_asset(filename, dist_dir))
+    client = app.test_client()
+
+    response = client.get(f"/static/dist/{filename}", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert response.mimetype == "text/css"
+    assert gzip.decompress(response.data) == CSS
+    assert "immutable" in response.headers["Cache-Control"]
+    assert response.cache_control.max_age == assets.IMMUTABLE_MAX_AGE
+    assert "Accept-Encoding" in response.headers["Vary"]
+
+    response = client.get(f"/static/dist/{filename}", headers={"Accept-Encoding": "identity"})
+    assert "Content-Encoding" not in response.headers
+    assert response.data == CSS
@@ -0,0 +1,87 @@
+from unittest.mock import patch
+import pytest
+from benchmarks.fake_upstreams import FakeCocktailDB, FakeSpotify
+from benchmarks import mood_analyzer_bench
+from benchmarks.load_test import percentile, summarize
+from benchmarks.mood_analyzer_bench import compare, make_corpus, make_playlists, make_vocabulary
+from cocktail_client import CocktailClient
+from http_transport import HTTPTransport
+from spotify_client import SpotifyClient
+
+@pytest.fixture
+def upstreams():
+    with FakeSpotify(tracks=250, artists=100) as spotify, FakeCocktailDB() as cocktaildb:
+        yield spotify, cocktaildb
+
+def test_percentile_interpolates():
+    values = [0.1, 0.2, 0.3, 0.4, 0.5]
+    assert percentile(values, 50) == 0.3
+    assert percentile(values, 100) == 0.5
+    assert percentile(values, 95) == pytest.approx(0.48)
+    assert percentile([], 99) == 0.0
+
+def test_summarize_counts_failures_in_throughput():
+    report = summarize([0.1, 0.2, 0.3], failures=1, elapsed=2.0)
+    assert report["requests"] == 4
+    assert report["req_per_s"] == 2.0
+    assert report["p50_ms"] == 200.0
+
+def test_clients_run_against_fake_upstreams(upstreams):
+    spotify, cocktaildb = upstreams
+    with patch.multiple('config.Config', SPOTIFY_API_URL=spotify.api_url, SPOTIFY_TOKEN_URL=spotify.token_url,
+                        COCKTAILDB_API_URL=cocktaildb.api_url, SPOTIFY_TOKEN_CACHE="", CACHE_DB_PATH=""):
+        transport = HTTPTransport(max_retries=0)
+        spotify_client = SpotifyClient(transport=transport)
+        snapshot = spotify_client.get_playlist_snapshot("https://open.spotify.com/playlist/bench1")
+        top_artists = spotify_client.get_snapshot_top_artists(snapshot)
+
+        cocktail_client = CocktailClient(transport=transport)
+        cocktails = cocktail_client.get_cocktails_by_moods({"energetic": 80.0}, seed=1)
+        by_id = cocktail_client.get_cocktails_by_ids([{"id": cocktails[0]["idDrink"], "mood_characteristics": []}])
+
+    assert snapshot.snapshot_id == "snapshot-bench1"
+    assert len(top_artists) == 5
+    # Token, playlist, 2 pages de pistes supplémentaires et un seul lot d'artistes
+    assert spotify.requests == 5
+    assert all(name.startswith("Artist ") for name, _, _ in top_artists)
+    assert cocktails
+    assert by_id[0]["strDrink"] == cocktails[0]["strDrink"]
+
+def test_fake_upstream_error_rate(upstreams):
+    spotify, _ = upstreams
+    spotify.error_rate = 1.0
+    transport = HTTPTransport(max_retries=0)
+    response = transport.post(spotify.token_url, data={"grant_type": "client_credentials"})
+    assert response.status_code == 503
+    assert spotify.errors == 1
+
+def test_mood_corpus_is_deterministic_and_skewed():
+    vocabulary = make_vocabulary(size=500)
+    corpus = make_corpus(2000, vocabulary=vocabulary)
+    assert corpus == make_corpus(2000, vocabulary=vocabulary)
+    # Loi de Zipf : le genre le plus fréquent représente une part importante du corpus
+    assert corpus.count(vocabulary[0]) > 2000 * 0.1
+    assert len(set(corpus)) > 50
+
+def test_mood_playlists_cover_corpus_with_normalized_weights():
+    corpus = make_corpus(100, vocabulary=make_vocabulary(size=100))
+    playlists = make_playlists(corpus)
+    assert sum(len(genres) for playlist in playlists for genres, _ in playlist) == 100
+    for playlist in playlists:
+        assert sum(weight for _, weight in playlist) == pytest.approx(1.0)
+
+def test_mood_bench_compare_normalizes_by_calibration():
+    baseline = {"calibration_ns": 1000.0, "results": {"a/10": 100.0, "b/10": 100.0, "c/10": 100.0}}
+    # Machine deux fois plus lente : les temps doublent sans être des régressions
+    current = {"calibration_ns": 2000.0, "results": {"a/10": 200.0, "b/10": 300.0, "new/10": 1.0}}
+    rows = {key: (ratio, regressed) for key, _, _, ratio, regressed in compare(current, baseline, threshold=0.25)}
+    assert rows["a/10"] == (1.0, False)
+    assert rows["b/10"] == (1.5, True)
+    assert "new/10" not in rows
+
+def test_mood_bench_cli_saves_and_checks_baseline(tmp_path):
+    baseline = str(tmp_path / "baseline.json")
+    args = ["--sizes", "10", "--cases", "get_base_genre", "--min-time", "0.01", "--baseline", baseline]
+    assert mood_analyzer_bench.main(args + ["--save-baseline"]) == 0
+    assert mood_analyzer_bench.main(args + ["--threshold", "10"]) == 0
+    assert mood_analyzer_bench.main(["--sizes", "10", "--baseline", str(tmp_path / "missing.json")]) == 2
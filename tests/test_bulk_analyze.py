@@ -0,0 +1,40 @@
+import json
+from bulk_analyze import read_playlist_ids, read_checkpoint, to_record, _terminate_last_line
+
+def test_read_playlist_ids_parses_and_deduplicates():
+    lines = [
+        "https://open.spotify.com/playlist/p1?si=abc\n",
+        "# commentaire\n",
+        "\n",
+        "p2\n",
+        "p1\n"
+    ]
+    assert read_playlist_ids(lines) == ["p1", "p2"]
+
+def test_read_checkpoint_skips_errors_and_truncated_lines(tmp_path):
+    output = tmp_path / "results.jsonl"
+    output.write_text(
+        json.dumps({"playlist_id": "p1", "mood_scores": {}}) + "\n"
+        + json.dumps({"playlist_id": "p2", "error": "boom"}) + "\n"
+        + '{"playlist_id": "p3", "mood'
+    )
+    assert read_checkpoint(str(output)) == {"p1"}
+
+    _terminate_last_line(str(output))
+    assert output.read_text().endswith("\n")
+
+def test_to_record_is_json_serializable():
+    result = {
+        "playlist_id": "p1",
+        "snapshot_id": "snap1",
+        "playlist": {"name": "Party"},
+        "top_artists": [("Artist1", 2, ["pop"])],
+        "characteristics": [0.5] * 5,
+        "mood_scores": {"energetic": 100.0},
+        "dominant_moods": ["energetic"],
+        "cocktails": [{"idDrink": "11007", "strDrink": "Margarita", "strIngredient1": "Tequila",
+                       "mood_characteristics": ["bright"]}]
+    }
+    record = json.loads(json.dumps(to_record(result)))
+    assert record["cocktails"] == [{"id": "11007", "name": "Margarita", "mood_characteristics": ["bright"]}]
+    assert record["top_artists"] == [["Artist1", 2, ["pop"]]]
@@ -0,0 +1,59 @@
+import time
+from unittest.mock import patch
+from cache import TTLCache, SQLiteCache, TieredCache, build_cache
+
+def test_ttl_cache_lru_eviction():
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")  # "a" devient le plus récent
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+
+def test_ttl_cache_expiry_and_stats():
+    cache = TTLCache(maxsize=10, ttl=60)
+    cache.set("a", 1)
+    assert cache.get("a") == 1
+    with patch('cache.time.time', return_value=time.time() + 61):
+        assert cache.get("a") is None
+    assert cache.stats() == {"hits": 1, "misses": 1, "size": 0}
+
+def test_sqlite_cache_is_shared_and_persistent(tmp_path):
+    path = str(tmp_path / "cache.db")
+    SQLiteCache(path, "cocktails").set("margarita", {"strDrink": "Margarita"})
+    # Une autre instance (autre worker, redémarrage) retrouve la valeur
+    assert SQLiteCache(path, "cocktails").get("margarita") == {"strDrink": "Margarita"}
+    # Les namespaces sont isolés
+    assert SQLiteCache(path, "artists").get("margarita") is None
+
+def test_sqlite_cache_expiry(tmp_path):
+    cache = SQLiteCache(str(tmp_path / "cache.db"), "cocktails", ttl=60)
+    cache.set("margarita", {"strDrink": "Margarita"})
+    with patch('cache.time.time', return_value=time.time() + 61):
+        assert cache.get("margarita") is None
+
+def test_tiered_cache_promotes_persistent_hits(tmp_path):
+    path = str(tmp_path / "cache.db")
+    build_cache("cocktails", maxsize=10, ttl=60, path=path).set("mojito", {"strDrink": "Mojito"})
+
+    cache = build_cache("cocktails", maxsize=10, ttl=60, path=path)
+    assert isinstance(cache, TieredCache)
+    assert cache.get("mojito") == {"strDrink": "Mojito"}
+    assert cache.memory.get("mojito") == {"strDrink": "Mojito"}
+    assert cache.get("unknown") is None
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+def test_tiered_cache_promotion_keeps_remaining_ttl(tmp_path):
+    path = str(tmp_path / "cache.db")
+    now = time.time()
+    with patch('cache.time.time', return_value=now):
+        build_cache("cocktails", maxsize=10, ttl=60, path=path).set("mojito", {"strDrink": "Mojito"})
+    cache = build_cache("cocktails", maxsize=10, ttl=60, path=path)
+    with patch('cache.time.time', return_value=now + 50):
+        assert cache.get("mojito") == {"strDrink": "Mojito"}
+    # Promue 50 s après son écriture, l'entrée expire toujours à t + 60 en mémoire
+    with patch('cache.time.time', return_value=now + 61):
+        assert cache.memory.get("mojito") is None
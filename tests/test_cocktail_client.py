@@ -1,10 +1,12 @@
 # test_cocktail_client.py
 import pytest
 import random
+import threading
+import time
 from unittest.mock import patch, MagicMock
 from cocktail_client import CocktailClient
 
-# Classe helper pour simuler les réponses de requests.get
+# Classe helper pour simuler les réponses du transport HTTP
 class DummyResponse:
     def __init__(self, status_code, json_data):
         self.status_code = status_code
@@ -41,7 +43,15 @@ def fake_requests_get_no_drinks_counter():
 def cocktail_client():
     with patch('cocktail_client.Config') as mock_config:
         mock_config.COCKTAILDB_API_KEY = "dummy_key"
-        yield CocktailClient()
+        mock_config.COCKTAIL_FETCH_WORKERS = 4
+        mock_config.CACHE_DB_PATH = ""
+        mock_config.SINGLE_FLIGHT_DIR = ""
+        mock_config.COCKTAIL_INDEX_PATH = ""
+        mock_config.COCKTAIL_CACHE_SIZE = 64
+        mock_config.COCKTAIL_CACHE_TTL = 3600
+        mock_config.COCKTAIL_MISS_TTL = 60
+        mock_config.COCKTAILDB_API_URL = "https://www.thecocktaildb.com/api/json/v1/1"
+        yield CocktailClient(transport=MagicMock())
 
 # Patch automatique de random.sample pour garantir un comportement déterministe
 @pytest.fixture(autouse=True)
@@ -56,7 +66,7 @@ def test_get_cocktails_by_moods_significant(cocktail_client):
         "romantic": 2.0,
         "dark": 0.0
     }
-    with patch('cocktail_client.requests.get', side_effect=fake_requests_get):
+    with patch.object(cocktail_client.http, 'get', side_effect=fake_requests_get):
         cocktails = cocktail_client.get_cocktails_by_moods(mood_scores, num_cocktails=3)
         assert len(cocktails) >= 1
         for cocktail in cocktails:
@@ -71,7 +81,7 @@ def test_get_cocktails_by_moods_no_significant(cocktail_client):
         "romantic": 1.0,
         "dark": 0.0
     }
-    with patch('cocktail_client.requests.get', side_effect=fake_requests_get):
+    with patch.object(cocktail_client.http, 'get', side_effect=fake_requests_get):
         cocktails = cocktail_client.get_cocktails_by_moods(mood_scores, num_cocktails=3)
         assert len(cocktails) >= 1
         for cocktail in cocktails:
@@ -90,10 +100,107 @@ def test_get_cocktails_by_moods_fallback(cocktail_client):
         "dark": 0.0
     }
     side_effect = fake_requests_get_no_drinks_counter()
-    with patch('cocktail_client.requests.get', side_effect=side_effect):
+    with patch.object(cocktail_client.http, 'get', side_effect=side_effect):
         cocktails = cocktail_client.get_cocktails_by_moods(mood_scores, num_cocktails=3)
         # Le fallback doit renvoyer le cocktail "Margarita" avec des caractéristiques fixes
         assert len(cocktails) == 1
         cocktail = cocktails[0]
         assert "Margarita" in cocktail.get("strDrink", "")
         assert cocktail.get("mood_characteristics") == ["refreshing", "bright"]
+
+def test_get_cocktails_by_moods_keeps_selection_order(cocktail_client):
+    """
+    Les recherches sont concurrentes mais le résultat suit l'ordre du tirage,
+    et chaque réponse n'est décodée qu'une seule fois.
+    """
+    mood_scores = {
+        "energetic": 40.0,
+        "chill": 30.0,
+        "romantic": 30.0,
+        "dark": 0.0
+    }
+    responses = []
+    def side_effect(url, *args, **kwargs):
+        response = MagicMock()
+        response.status_code = 200
+        response.json.return_value = {"drinks": [{"strDrink": url.split("s=")[-1]}]}
+        responses.append(response)
+        return response
+
+    with patch.object(cocktail_client.http, 'get', side_effect=side_effect):
+        cocktails = cocktail_client.get_cocktails_by_moods(mood_scores, num_cocktails=10)
+
+    expected = (cocktail_client.mood_cocktail_mapping["energetic"][:4]
+                + cocktail_client.mood_cocktail_mapping["chill"][:3]
+                + cocktail_client.mood_cocktail_mapping["romantic"][:3])
+    assert [cocktail["strDrink"] for cocktail in cocktails] == expected
+    assert all(response.json.call_count == 1 for response in responses)
+
+def test_cocktails_are_served_from_cache(cocktail_client):
+    mood_scores = {"energetic": 100.0}
+    with patch.object(cocktail_client.http, 'get', side_effect=fake_requests_get) as mock_get:
+        first = cocktail_client.get_cocktails_by_moods(mood_scores, num_cocktails=3)
+        calls = mock_get.call_count
+        second = cocktail_client.get_cocktails_by_moods(mood_scores, num_cocktails=3)
+        # Aucun appel réseau supplémentaire au deuxième passage
+        assert mock_get.call_count == calls
+    assert [c["strDrink"] for c in first] == [c["strDrink"] for c in second]
+    # Les fiches en cache ne sont pas modifiées par l'appelant
+    assert "mood_characteristics" not in cocktail_client.cache.get("margarita")
+
+def test_missing_cocktails_are_not_searched_again(cocktail_client):
+    with patch.object(cocktail_client.http, 'get', return_value=DummyResponse(200, {"drinks": None})) as mock_get:
+        assert cocktail_client._fetch_cocktail("Unknown") is None
+        assert cocktail_client._fetch_cocktail("unknown") is None
+        assert cocktail_client._fetch_cocktail_by_id("999") is None
+        assert cocktail_client._fetch_cocktail_by_id("999") is None
+        assert mock_get.call_count == 2
+
+    # L'absence n'est mémorisée que peu de temps
+    with patch('cache.time.time', return_value=time.time() + 61), \
+         patch.object(cocktail_client.http, 'get', side_effect=fake_requests_get) as mock_get:
+        assert cocktail_client._fetch_cocktail("Unknown")["strDrink"] == "Unknown"
+        assert mock_get.call_count == 1
+
+def test_prewarm_fetches_whole_mapping(cocktail_client):
+    with patch.object(cocktail_client.http, 'get', side_effect=fake_requests_get) as mock_get:
+        warmed = cocktail_client.prewarm()
+        names = {name for names in cocktail_client.mood_cocktail_mapping.values() for name in names}
+        assert warmed == len(names)
+        assert mock_get.call_count == len(names)
+
+        mock_get.reset_mock()
+        cocktail_client.get_cocktails_by_moods({"dark": 50.0, "chill": 50.0}, num_cocktails=6)
+        mock_get.assert_not_called()
+
+def test_seeded_selection_is_reproducible(cocktail_client):
+    mood_scores = {"energetic": 40.0, "chill": 30.0, "romantic": 30.0, "dark": 0.0}
+    with patch.object(cocktail_client.http, 'get', side_effect=fake_requests_get):
+        first = cocktail_client.get_cocktails_by_moods(mood_scores, num_cocktails=10, seed=42)
+        second = cocktail_client.get_cocktails_by_moods(mood_scores, num_cocktails=10, seed=42)
+    assert [(c["strDrink"], c["mood_characteristics"]) for c in first] == \
+           [(c["strDrink"], c["mood_characteristics"]) for c in second]
+
+def test_get_cocktails_by_ids_uses_search_cache(cocktail_client):
+    with patch.object(cocktail_client.http, 'get', side_effect=fake_requests_get) as mock_get:
+        cocktail_client.get_cocktails_by_moods({"energetic": 100.0}, num_cocktails=1)
+        mock_get.reset_mock()
+        cocktails = cocktail_client.get_cocktails_by_ids([{"id": "12345", "mood_characteristics": ["bright"]}])
+        mock_get.assert_not_called()
+    assert cocktails[0]["idDrink"] == "12345"
+    assert cocktails[0]["mood_characteristics"] == ["bright"]
+
+def test_concurrent_searches_are_coalesced(cocktail_client):
+    release = threading.Event()
+
+    def slow_get(url, *args, **kwargs):
+        release.wait(5)
+        return fake_requests_get(url)
+
+    with patch.object(cocktail_client.http, 'get', side_effect=slow_get) as mock_get:
+        threading.Timer(0.1, release.set).start()
+        drinks = cocktail_client._map(cocktail_client._fetch_cocktail, ["Mojito"] * 4)
+        assert mock_get.call_count == 1
+    assert [drink["strDrink"] for drink in drinks] == ["Mojito"] * 4
+    # Chaque appelant reçoit sa propre copie
+    assert len({id(drink) for drink in drinks}) == 4
@@ -0,0 +1,100 @@
+import gzip
+import json
+import pytest
+from unittest.mock import MagicMock
+from cocktail_client import CocktailClient
+from cocktail_index import (INGREDIENT_MODIFIERS, CocktailIndex, _INGREDIENT_PATTERNS, _first_modifier, compact,
+                            drink_features, fetch_catalog, save_catalog)
+
+DRINKS = [
+    {"idDrink": "1", "strDrink": "Margarita", "strCategory": "Ordinary Drink", "strGlass": "Cocktail glass",
+     "strIngredient1": "Tequila", "strIngredient2": "Triple sec", "strIngredient3": "Lime juice"},
+    {"idDrink": "2", "strDrink": "Old Fashioned", "strCategory": "Cocktail", "strGlass": "Old-fashioned glass",
+     "strIngredient1": "Bourbon", "strIngredient2": "Angostura bitters", "strIngredient3": "Sugar"},
+    {"idDrink": "3", "strDrink": "Kir Royale", "strCategory": "Ordinary Drink", "strGlass": "Champagne flute",
+     "strIngredient1": "Creme de Cassis", "strIngredient2": "Champagne"},
+    {"idDrink": "4", "strDrink": "Rum Punch", "strCategory": "Punch / Party Drink", "strGlass": "Punch bowl",
+     "strIngredient1": "Rum", "strIngredient2": "Pineapple juice", "strIngredient3": "Grenadine"}
+]
+
+def test_features_follow_ingredients_category_and_glass():
+    margarita, old_fashioned, kir_royale, punch = (drink_features(drink) for drink in DRINKS)
+    assert all(0 <= value <= 1 for value in punch)
+    # energy, danceability, emotion, intensity, sophistication
+    assert punch[1] > old_fashioned[1]
+    assert old_fashioned[4] > punch[4]
+    assert kir_royale[2] > margarita[2]
+    assert margarita[0] > old_fashioned[0]
+
+@pytest.mark.parametrize("ingredient, key", [
+    ("Ginger beer", "ginger beer"),
+    ("Ginger ale", "ginger ale"),
+    ("Cachaça", "cachaca"),
+    ("Dark rum", "dark rum"),
+    ("Gin", "gin"),
+    ("Strawberries", "strawberry"),
+    ("Ginger", None)
+])
+def test_ingredient_matches_longest_whole_word(ingredient, key):
+    expected = INGREDIENT_MODIFIERS[key] if key else None
+    assert _first_modifier(ingredient, _INGREDIENT_PATTERNS) is expected
+
+def test_nearest_neighbours_and_seeded_recommendation():
+    index = CocktailIndex(DRINKS)
+    party = [0.9, 0.9, 0.6, 0.5, 0.2]
+    assert index.drinks[index.nearest(party, 1)[0]]["strDrink"] == "Rum Punch"
+    classical = [0.4, 0.2, 0.9, 0.6, 1.0]
+    assert index.drinks[index.nearest(classical, 1)[0]]["strDrink"] in {"Old Fashioned", "Kir Royale"}
+
+    assert index.recommend(party, 1, seed=7) == index.recommend(party, 1, seed=7)
+    assert len(index.recommend(party, 10)) == len(DRINKS)
+    assert CocktailIndex([]).recommend(party, 3) == []
+
+def test_fetch_catalog_walks_every_letter():
+    def get(url):
+        letter = url.split("f=")[-1]
+        drinks = [dict(drink, strVideo=None) for drink in DRINKS if drink["strDrink"].lower().startswith(letter)]
+        # Les recherches peuvent se recouper : les fiches sont dédupliquées par ID
+        if letter == "k":
+            drinks.append(dict(DRINKS[0]))
+        return MagicMock(status_code=200, json=MagicMock(return_value={"drinks": drinks or None}))
+
+    transport = MagicMock()
+    transport.get.side_effect = get
+    drinks = fetch_catalog(transport=transport, base_url="https://cocktaildb.test")
+    assert transport.get.call_count == 36
+    assert sorted(drink["idDrink"] for drink in drinks) == ["1", "2", "3", "4"]
+    assert all("strVideo" not in drink for drink in drinks)
+
+def test_fetch_catalog_fails_on_error():
+    transport = MagicMock()
+    transport.get.return_value = MagicMock(status_code=503)
+    with pytest.raises(Exception, match="Status: 503"):
+        fetch_catalog(transport=transport, base_url="https://cocktaildb.test")
+
+def test_save_and_load(tmp_path):
+    path = str(tmp_path / "data" / "cocktails.json.gz")
+    assert CocktailIndex.load(path) is None
+    save_catalog([compact(drink) for drink in DRINKS], path)
+    index = CocktailIndex.load(path)
+    assert len(index) == 4
+    assert index.get("2")["strDrink"] == "Old Fashioned"
+    assert index.get("999") is None
+
+    with gzip.open(path, "wt", encoding="utf-8") as f:
+        json.dump({"version": 0, "drinks": []}, f)
+    assert CocktailIndex.load(path) is None
+
+def test_client_recommends_from_index_without_network():
+    client = CocktailClient(transport=MagicMock(), index=CocktailIndex(DRINKS))
+    cocktails = client.get_cocktails_by_moods({"energetic": 80.0, "chill": 20.0}, num_cocktails=2, seed=3,
+                                              characteristics=[0.9, 0.9, 0.6, 0.5, 0.2])
+    assert len(cocktails) == 2
+    assert all(cocktail["mood_characteristics"] for cocktail in cocktails)
+
+    reloaded = client.get_cocktails_by_ids([{"id": cocktail["idDrink"], "mood_characteristics": ["bright"]}
+                                            for cocktail in cocktails])
+    assert [cocktail["idDrink"] for cocktail in reloaded] == [cocktail["idDrink"] for cocktail in cocktails]
+    client.http.get.assert_not_called()
+    # Le catalogue n'est pas modifié par l'appelant
+    assert "mood_characteristics" not in client.index.get(cocktails[0]["idDrink"])
@@ -0,0 +1,67 @@
+import pytest
+import requests
+from unittest.mock import patch, MagicMock
+from http_transport import HTTPTransport, get_transport
+
+def make_response(status_code, headers=None):
+    response = MagicMock()
+    response.status_code = status_code
+    response.headers = headers or {}
+    return response
+
+@pytest.fixture
+def transport():
+    return HTTPTransport(connect_timeout=1, read_timeout=2, max_retries=3,
+                         backoff_factor=0.5, backoff_max=8, retry_after_max=30, pool_size=4)
+
+def test_sessions_are_pooled_per_host(transport):
+    session_a = transport._session_for("https://api.spotify.com/v1/artists")
+    session_b = transport._session_for("https://api.spotify.com/v1/playlists/p1")
+    session_c = transport._session_for("https://www.thecocktaildb.com/api/json/v1/1/search.php")
+    assert session_a is session_b
+    assert session_a is not session_c
+
+def test_request_sets_default_timeout(transport):
+    with patch('requests.Session.request', return_value=make_response(200)) as mock_request:
+        transport.get("https://api.spotify.com/v1/artists")
+        assert mock_request.call_args.kwargs["timeout"] == (1, 2)
+
+def test_retries_on_server_error_then_succeeds(transport):
+    responses = [make_response(503), make_response(502), make_response(200)]
+    with patch('requests.Session.request', side_effect=responses) as mock_request, \
+         patch('http_transport.time.sleep') as mock_sleep:
+        response = transport.get("https://api.spotify.com/v1/artists")
+        assert response.status_code == 200
+        assert mock_request.call_count == 3
+        assert mock_sleep.call_count == 2
+
+def test_honors_retry_after(transport):
+    responses = [make_response(429, {"Retry-After": "5"}), make_response(200)]
+    with patch('requests.Session.request', side_effect=responses), \
+         patch('http_transport.time.sleep') as mock_sleep:
+        transport.get("https://api.spotify.com/v1/artists")
+        assert mock_sleep.call_args.args[0] >= 5
+
+def test_retry_after_too_long_returns_response(transport):
+    responses = [make_response(429, {"Retry-After": "3600"}), make_response(200)]
+    with patch('requests.Session.request', side_effect=responses) as mock_request, \
+         patch('http_transport.time.sleep') as mock_sleep:
+        response = transport.get("https://api.spotify.com/v1/artists")
+        assert response.status_code == 429
+        assert mock_request.call_count == 1
+        mock_sleep.assert_not_called()
+
+def test_does_not_retry_client_errors(transport):
+    with patch('requests.Session.request', return_value=make_response(404)) as mock_request:
+        assert transport.get("https://api.spotify.com/v1/artists").status_code == 404
+        assert mock_request.call_count == 1
+
+def test_connection_errors_are_raised_after_max_retries(transport):
+    with patch('requests.Session.request', side_effect=requests.ConnectionError("boom")) as mock_request, \
+         patch('http_transport.time.sleep'):
+        with pytest.raises(requests.ConnectionError):
+            transport.get("https://api.spotify.com/v1/artists")
+        assert mock_request.call_count == 4
+
+def test_get_transport_is_shared():
+    assert get_transport() is get_transport()
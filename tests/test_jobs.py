@@ -0,0 +1,77 @@
+import threading
+import time
+import pytest
+from unittest.mock import patch
+from jobs import JobManager, JobQueueFull
+
+def wait_until_finished(manager, job):
+    version = -1
+    while not job.finished:
+        version = manager.wait(job, version, timeout=5)
+
+def test_job_reports_stages_and_result():
+    manager = JobManager(max_workers=2)
+
+    def work(value, progress):
+        progress("playlist")
+        progress("moods")
+        return value * 2
+
+    job = manager.submit(work, 21)
+    wait_until_finished(manager, job)
+    assert job.status == "done"
+    assert job.result == 42
+    assert job.stages == ["playlist", "moods"]
+    assert manager.get(job.id) is job
+
+def test_failed_job_keeps_error():
+    manager = JobManager(max_workers=1)
+
+    def work(progress):
+        raise Exception("Failed to get playlist. Status: 404")
+
+    job = manager.submit(work)
+    wait_until_finished(manager, job)
+    assert job.status == "failed"
+    assert "404" in job.error
+
+def test_pending_jobs_are_bounded():
+    manager = JobManager(max_workers=1, max_pending=2)
+    release = threading.Event()
+
+    def work(progress):
+        release.wait(5)
+
+    manager.submit(work)
+    manager.submit(work)
+    with pytest.raises(JobQueueFull):
+        manager.submit(work)
+    release.set()
+
+def test_unknown_job():
+    assert JobManager().get("missing") is None
+
+def test_finished_jobs_are_bounded():
+    manager = JobManager(max_workers=1, max_finished=2)
+    jobs = [manager.submit(lambda progress: "done") for _ in range(3)]
+    for job in jobs:
+        wait_until_finished(manager, job)
+    # Le job terminé le plus ancien est oublié
+    assert manager.get(jobs[0].id) is None
+    assert [manager.get(job.id) for job in jobs[1:]] == jobs[1:]
+
+def test_expired_jobs_are_purged_on_get():
+    manager = JobManager(max_workers=1, ttl=60)
+    job = manager.submit(lambda progress: "done")
+    wait_until_finished(manager, job)
+    assert manager.get(job.id) is job
+    with patch('jobs.time.time', return_value=time.time() + 61):
+        assert manager.get(job.id) is None
+
+def test_result_is_released_once_taken():
+    manager = JobManager(max_workers=1)
+    job = manager.submit(lambda progress: {"moods": ["party"]})
+    wait_until_finished(manager, job)
+    assert manager.take_result(job) == {"moods": ["party"]}
+    assert manager.take_result(job) is None
+    assert manager.get(job.id) is job
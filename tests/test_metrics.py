@@ -0,0 +1,88 @@
+from unittest.mock import MagicMock
+import requests
+import metrics
+from cache import build_cache
+from http_transport import HTTPTransport
+from metrics import Counter, Histogram, CacheStatsCollector
+
+def test_counter_exposition_with_labels():
+    counter = Counter("test_requests_total", "Test requests", ["host", "status"])
+    counter.inc(host="api.spotify.com", status=200)
+    counter.inc(2, host="api.spotify.com", status=200)
+    counter.inc(host='we"ird', status="error")
+    lines = counter.collect()
+    assert lines[:2] == ["# HELP test_requests_total Test requests", "# TYPE test_requests_total counter"]
+    assert 'test_requests_total{host="api.spotify.com",status="200"} 3' in lines
+    assert 'test_requests_total{host="we\\"ird",status="error"} 1' in lines
+
+def test_histogram_buckets_are_cumulative():
+    histogram = Histogram("test_seconds", "Test durations", ["stage"], buckets=(0.1, 1.0))
+    histogram.observe(0.05, stage="moods")
+    histogram.observe(0.5, stage="moods")
+    histogram.observe(5, stage="moods")
+    lines = histogram.collect()
+    assert 'test_seconds_bucket{stage="moods",le="0.1"} 1' in lines
+    assert 'test_seconds_bucket{stage="moods",le="1.0"} 2' in lines
+    assert 'test_seconds_bucket{stage="moods",le="+Inf"} 3' in lines
+    assert 'test_seconds_sum{stage="moods"} 5.55' in lines
+    assert 'test_seconds_count{stage="moods"} 3' in lines
+
+def test_histogram_time_records_on_exception():
+    histogram = Histogram("test_seconds", "Test durations", ["stage"])
+    try:
+        with histogram.time(stage="playlist_fetch"):
+            raise ValueError("boom")
+    except ValueError:
+        pass
+    assert histogram.count(stage="playlist_fetch") == 1
+
+def test_cache_collector_reports_hit_ratio():
+    collector = CacheStatsCollector()
+    cache = build_cache("test_metrics", maxsize=10, ttl=60)
+    collector.register("artists", cache)
+    cache.set("a", 1)
+    cache.get("a")
+    cache.get("a")
+    cache.get("b")
+    cache.get("c")
+    lines = collector.collect()
+    assert 'cartel_cache_hits_total{cache="artists"} 2' in lines
+    assert 'cartel_cache_misses_total{cache="artists"} 2' in lines
+    assert 'cartel_cache_hit_ratio{cache="artists"} 0.5' in lines
+
+def test_transport_counts_outbound_requests_per_host():
+    transport = HTTPTransport(max_retries=1, backoff_factor=0)
+    session = MagicMock()
+    session.request.side_effect = [MagicMock(status_code=503, headers={}), MagicMock(status_code=200, headers={})]
+    transport._session_for = MagicMock(return_value=session)
+
+    before_503 = metrics.OUTBOUND_REQUESTS.value(host="metrics.test", status=503)
+    before_200 = metrics.OUTBOUND_REQUESTS.value(host="metrics.test", status=200)
+    transport.get("https://metrics.test/v1/things")
+
+    assert metrics.OUTBOUND_REQUESTS.value(host="metrics.test", status=503) == before_503 + 1
+    assert metrics.OUTBOUND_REQUESTS.value(host="metrics.test", status=200) == before_200 + 1
+    assert metrics.OUTBOUND_DURATION.count(host="metrics.test") >= 2
+
+def test_transport_counts_connection_errors():
+    transport = HTTPTransport(max_retries=0)
+    session = MagicMock()
+    session.request.side_effect = requests.ConnectionError("down")
+    transport._session_for = MagicMock(return_value=session)
+
+    before = metrics.OUTBOUND_REQUESTS.value(host="down.test", status="error")
+    try:
+        transport.get("https://down.test/")
+    except requests.ConnectionError:
+        pass
+    assert metrics.OUTBOUND_REQUESTS.value(host="down.test", status="error") == before + 1
+
+def test_render_includes_all_metric_families():
+    with metrics.stage_timer("mood_computation"):
+        pass
+    text = metrics.render()
+    assert text.endswith("\n")
+    assert "# TYPE cartel_stage_duration_seconds histogram" in text
+    assert 'cartel_stage_duration_seconds_count{stage="mood_computation"}' in text
+    assert "# TYPE cartel_outbound_requests_total counter" in text
+    assert "# TYPE cartel_cache_hit_ratio gauge" in text
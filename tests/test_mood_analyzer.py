@@ -130,3 +130,59 @@ def test_get_dominant_moods_fallback():
     # Comme tous les moods ont le même score, la méthode trie et retourne les deux premiers.
     # Avec l'ordre d'insertion, on attend ["energetic", "chill"]
     assert dominant == ["energetic", "chill"]
+
+def test_get_base_genre_precedence():
+    analyzer = MoodAnalyzer()
+    # Les genres de base passent avant le mapping, dans l'ordre de la table
+    assert analyzer._get_base_genre("indie pop") == "pop"
+    assert analyzer._get_base_genre("Dark Techno") == "electronic"
+    assert analyzer._get_base_genre("hip hop") == "rap"
+    assert analyzer._get_base_genre("metalcore") == "metal"
+    assert analyzer._get_base_genre("alt z") == "rock"
+
+def test_genre_characteristics_are_memoized():
+    analyzer = MoodAnalyzer()
+    first = analyzer._get_genre_characteristics("dark trap")
+    second = analyzer._get_genre_characteristics("dark trap")
+    assert first is second
+    # Le vecteur partagé ne peut pas être modifié par l'appelant
+    assert not first.flags.writeable
+    # Le genre de base sort de la même entrée du cache
+    assert analyzer._get_base_genre("dark trap") == "rap"
+    assert analyzer._resolve_genre.cache_info().misses == 1
+
+def test_analyze_batch_matches_scalar_methods():
+    analyzer = MoodAnalyzer()
+    playlists = [
+        [(["pop"], 2.0), (["rock"], 1.0)],
+        [(["pop dance", "dark techno"], 0.7), (["jazz"], 0.3)],
+        []
+    ]
+    characteristics, mood_scores = analyzer.analyze_batch(playlists)
+    assert characteristics.shape == (3, 5)
+    assert mood_scores.shape == (3, 6)
+
+    for i, genres_with_weights in enumerate(playlists):
+        expected = analyzer._calculate_playlist_characteristics(genres_with_weights)
+        npt.assert_array_almost_equal(characteristics[i], expected)
+        scalar_scores = analyzer._calculate_mood_scores(expected)
+        npt.assert_array_almost_equal(mood_scores[i], [scalar_scores[mood] for mood in analyzer.mood_names])
+
+    # Playlist vide : caractéristiques neutres
+    npt.assert_array_almost_equal(characteristics[2], [0.5] * 5)
+
+def test_mood_weight_matrix_matches_formulas():
+    analyzer = MoodAnalyzer()
+    c = np.array([0.8, 0.7, 0.63, 0.6, 0.63])
+    raw = c @ analyzer.mood_weights.T + analyzer.mood_offsets
+    npt.assert_almost_equal(raw[0], (c[0] * 0.5 + c[1] * 0.3 + c[3] * 0.2) * 100)
+    npt.assert_almost_equal(raw[3], (c[3] * 0.4 + (1 - c[2]) * 0.3 + (1 - c[1]) * 0.3) * 100)
+
+def test_update_tables_recompiles_and_bumps_version():
+    analyzer = MoodAnalyzer()
+    before = analyzer._get_genre_characteristics("zouk")
+    analyzer.update_tables(base_characteristics={"zouk": [0.7, 0.9, 0.7, 0.4, 0.5]})
+    assert analyzer.version == 1
+    assert analyzer._get_base_genre("zouk love") == "zouk"
+    assert list(analyzer._get_genre_characteristics("zouk")) == [0.7, 0.9, 0.7, 0.4, 0.5]
+    assert list(before) != [0.7, 0.9, 0.7, 0.4, 0.5]
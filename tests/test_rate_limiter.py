@@ -0,0 +1,140 @@
+import pytest
+from unittest.mock import patch, MagicMock
+import rate_limiter
+from rate_limiter import BATCH, INTERACTIVE, RateLimiter, TokenBucket, priority
+from http_transport import HTTPTransport
+
+class FakeClock:
+    """Horloge simulée : time.sleep avance le temps au lieu d'attendre"""
+    def __init__(self):
+        self.now = 1000.0
+        self.sleeps = []
+
+    def time(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+@pytest.fixture
+def clock():
+    fake = FakeClock()
+    with patch('rate_limiter.time.time', side_effect=fake.time), \
+         patch('rate_limiter.time.sleep', side_effect=fake.sleep):
+        yield fake
+
+def test_bucket_allows_burst_then_paces(clock):
+    bucket = TokenBucket(rate=10, burst=3)
+    assert [bucket.acquire() for _ in range(3)] == [0, 0, 0]
+    # Seau vide : un jeton toutes les 100 ms
+    assert bucket.acquire() == pytest.approx(0.1)
+    assert bucket.acquire() == pytest.approx(0.1)
+
+def test_batch_traffic_leaves_reserve_to_interactive(clock):
+    limiter = RateLimiter({"api.test": (1, 4)}, batch_reserve=0.5)
+    url = "https://api.test/v1/artists"
+    with priority(BATCH):
+        assert limiter.acquire(url) == 0
+        assert limiter.acquire(url) == 0
+    # Il reste 2 jetons : le trafic interactif les obtient immédiatement...
+    assert limiter.acquire(url) == 0
+    # ...alors que le trafic de fond doit attendre de dépasser la réserve
+    limiter.default_priority = BATCH
+    assert limiter.acquire(url) > 0
+
+def test_batch_can_always_reach_a_token(clock):
+    limiter = RateLimiter({"api.test": (1, 1)}, batch_reserve=0.5)
+    with priority(BATCH):
+        assert limiter.acquire("https://api.test/") == 0
+        assert limiter.acquire("https://api.test/") == pytest.approx(1.0)
+
+def test_unlisted_hosts_are_not_limited(clock):
+    limiter = RateLimiter({"api.test": (1, 1), "disabled.test": (0, 1)})
+    for _ in range(5):
+        assert limiter.acquire("https://other.test/") == 0
+        assert limiter.acquire("https://disabled.test/") == 0
+    assert clock.sleeps == []
+
+def test_429_slows_down_and_retry_after_pauses(clock):
+    bucket = TokenBucket(rate=10, burst=10, max_pause=30)
+    bucket.record(429, retry_after=5)
+    # Pause Retry-After, puis débit réduit de moitié (5/s)
+    assert bucket.acquire() == pytest.approx(5.2)
+    assert bucket.acquire() == pytest.approx(0.2)
+
+    for _ in range(25):
+        bucket.record(200)
+    assert bucket.acquire() == pytest.approx(0.1)
+
+def test_retry_after_pause_is_capped(clock):
+    bucket = TokenBucket(rate=10, burst=10, max_pause=2)
+    bucket.record(503, retry_after=3600)
+    assert bucket.acquire() == pytest.approx(2.0)
+
+def test_state_is_shared_between_instances(tmp_path, clock):
+    path = str(tmp_path / "api.test.bucket")
+    # Deux instances sur le même fichier : comme deux workers gunicorn
+    first = TokenBucket(rate=1, burst=2, state_path=path)
+    second = TokenBucket(rate=1, burst=2, state_path=path)
+    assert first.acquire() == 0
+    assert second.acquire() == 0
+    assert first.acquire() == pytest.approx(1.0)
+    # Le 429 vu par l'autre instance s'applique aussi : pause de 10 s puis débit réduit de moitié
+    second.record(429, retry_after=10)
+    assert first.acquire() == pytest.approx(12.0)
+
+def test_cap_limits_a_run_without_adding_to_the_shared_bucket(tmp_path, clock):
+    shared, run = str(tmp_path / "shared"), str(tmp_path / "run")
+    url = "https://api.test/v1"
+    web = RateLimiter({"api.test": (1, 2)}, state_dir=shared)
+    bulk = RateLimiter({"api.test": (1, 2)}, state_dir=shared, caps={"api.test": (0.5, 1)}, cap_state_dir=run)
+    assert bulk.acquire(url) == 0
+    # Plafond de l'analyse : un jeton toutes les 2 s, pris aussi dans le seau commun
+    assert bulk.acquire(url) == pytest.approx(2.0)
+    assert web.acquire(url) == 0
+    assert web.acquire(url) == pytest.approx(1.0)
+    # Un 429 vu par l'analyse en masse suspend et ralentit aussi les workers web
+    bulk.record(url, 429, retry_after=5)
+    assert web.acquire(url) == pytest.approx(7.0)
+
+def test_unwritable_state_falls_back_to_process_bucket(tmp_path, clock):
+    blocker = tmp_path / "file"
+    blocker.write_text("")
+    bucket = TokenBucket(rate=1, burst=1, state_path=str(blocker / "api.bucket"))
+    assert bucket.acquire() == 0
+    assert bucket.state_path == ""
+    assert bucket.acquire() == pytest.approx(1.0)
+
+def test_state_dir_writable_by_others_is_refused(tmp_path, clock):
+    shared = tmp_path / "shared"
+    shared.mkdir()
+    shared.chmod(0o777)
+    bucket = TokenBucket(rate=1, burst=1, state_path=str(shared / "api.bucket"))
+    assert bucket.acquire() == 0
+    assert bucket.state_path == ""
+    assert not (shared / "api.bucket").exists()
+
+def test_transport_consults_limiter_on_each_attempt():
+    limiter = MagicMock()
+    transport = HTTPTransport(max_retries=1, backoff_factor=0, rate_limiter=limiter)
+    session = MagicMock()
+    session.request.side_effect = [MagicMock(status_code=429, headers={"Retry-After": "0"}),
+                                   MagicMock(status_code=200, headers={})]
+    transport._session_for = MagicMock(return_value=session)
+
+    with patch('http_transport.time.sleep'):
+        transport.get("https://api.test/v1/artists")
+
+    assert limiter.acquire.call_count == 2
+    assert limiter.record.call_args_list[0].args == ("https://api.test/v1/artists", 429, 0.0)
+    assert limiter.record.call_args_list[1].args == ("https://api.test/v1/artists", 200, None)
+
+def test_priority_propagates_to_cocktail_fetch_threads():
+    from cocktail_client import CocktailClient
+    client = CocktailClient(transport=MagicMock())
+    seen = lambda _: rate_limiter._priority.get()
+    with priority(BATCH):
+        assert client._map(seen, [1, 2]) == [BATCH, BATCH]
+    assert client._map(seen, [1]) == [None]
+    assert INTERACTIVE != BATCH
@@ -0,0 +1,72 @@
+import gzip
+import json
+from flask import Flask
+from compression import compressed_json
+from serializers import serialize_cocktail, serialize_analysis
+
+DRINK = {
+    "idDrink": "11007",
+    "strDrink": "Margarita",
+    "strCategory": "Ordinary Drink",
+    "strAlcoholic": "Alcoholic",
+    "strGlass": "Cocktail glass",
+    "strDrinkThumb": "https://img/margarita.jpg",
+    "strInstructions": "Shake. ",
+    "strIngredient1": "Tequila", "strMeasure1": "1 1/2 oz ",
+    "strIngredient2": "Salt", "strMeasure2": None,
+    "strIngredient3": None, "strMeasure3": None,
+    "strVideo": None,
+    "strTags": None,
+    "mood_characteristics": ["citrus", "bright"]
+}
+
+def test_serialize_cocktail_is_compact():
+    cocktail = serialize_cocktail(DRINK)
+    assert cocktail["ingredients"] == [["Tequila", "1 1/2 oz"], ["Salt"]]
+    assert cocktail["instructions"] == "Shake."
+    assert None not in cocktail.values()
+    assert not any(key.startswith("str") for key in cocktail)
+
+def test_serialize_analysis():
+    result = {
+        "playlist_id": "p1",
+        "snapshot_id": "snap1",
+        "playlist": {"name": "Party", "description": "", "owner": "Owner", "image": ""},
+        "top_artists": [("Artist1", 2, ["pop"]), ("Artist2", 1, [])],
+        "characteristics": [0.8, 0.7, 0.6, 0.5, 0.4],
+        "mood_scores": {"energetic": 100.0},
+        "dominant_moods": ["energetic"],
+        "cocktails": [DRINK]
+    }
+    data = serialize_analysis(result)
+    assert data["playlist"] == {"id": "p1", "snapshot_id": "snap1", "name": "Party", "owner": "Owner"}
+    assert data["top_artists"][1] == {"name": "Artist2", "count": 1}
+    assert data["characteristics"]["energy"] == 0.8
+    assert data["cocktails"][0]["name"] == "Margarita"
+    assert "playlists" not in data
+
+    # Analyse combinée : liste des playlists prises en compte
+    result["playlists"] = [{"id": "p1", "name": "Party", "description": "", "owner": "Owner", "image": ""}]
+    assert serialize_analysis(result)["playlists"] == [{"id": "p1", "name": "Party", "owner": "Owner"}]
+
+def test_compressed_json_negotiates_encoding():
+    app = Flask(__name__)
+    payload = {"cocktails": [serialize_cocktail(DRINK)] * 20}
+
+    with app.test_request_context(headers={"Accept-Encoding": "gzip"}):
+        response = compressed_json(payload)
+        assert response.headers["Content-Encoding"] == "gzip"
+        assert json.loads(gzip.decompress(response.get_data())) == payload
+        assert "Accept-Encoding" in response.headers["Vary"]
+
+    with app.test_request_context():
+        response = compressed_json(payload)
+        assert "Content-Encoding" not in response.headers
+        assert json.loads(response.get_data()) == payload
+
+def test_compressed_json_skips_small_payloads():
+    app = Flask(__name__)
+    with app.test_request_context(headers={"Accept-Encoding": "gzip, br"}):
+        response = compressed_json({"error": "boom"}, 400)
+        assert response.status_code == 400
+        assert "Content-Encoding" not in response.headers
@@ -0,0 +1,89 @@
+import importlib
+import sys
+import time
+import pytest
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch, MagicMock
+from services import Services, READY, PENDING, FAILED
+
+@pytest.fixture
+def fake_clients():
+    spotify_client = MagicMock()
+    spotify_client.is_ready.return_value = True
+    with patch('services.SpotifyClient', return_value=spotify_client) as spotify, \
+         patch('services.CocktailClient') as cocktail, \
+         patch('services.MoodAnalyzer') as analyzer, \
+         patch('services.VisualizationGraph') as graph, \
+         patch('services.Config.COCKTAIL_CACHE_PREWARM', True):
+        yield {"spotify": spotify, "cocktail": cocktail, "analyzer": analyzer, "graph": graph}
+
+def test_clients_are_built_once_on_first_access(fake_clients):
+    def slow_analyzer():
+        time.sleep(0.05)
+        return MagicMock()
+    fake_clients["analyzer"].side_effect = slow_analyzer
+
+    registry = Services()
+    fake_clients["spotify"].assert_not_called()
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        analyzers = list(executor.map(lambda _: registry.mood_analyzer, range(8)))
+    assert fake_clients["analyzer"].call_count == 1
+    assert all(analyzer is analyzers[0] for analyzer in analyzers)
+
+    service = registry.analysis_service
+    assert service.mood_analyzer is analyzers[0]
+    assert registry.analysis_service is service
+
+def test_warm_up_reports_readiness(fake_clients):
+    registry = Services()
+    assert registry.readiness() == {"ready": False, "checks": {
+        "spotify_token": PENDING, "visualization_graph": PENDING, "cocktail_cache": PENDING}}
+
+    registry.warm_up()
+    fake_clients["spotify"].return_value.warm_up.assert_called_once()
+    fake_clients["graph"].return_value.get.assert_called_once()
+    fake_clients["cocktail"].return_value.prewarm.assert_called_once()
+    assert registry.readiness() == {"ready": True, "checks": {
+        "spotify_token": READY, "visualization_graph": READY, "cocktail_cache": READY}}
+
+def test_graph_built_by_a_request_counts_as_ready(fake_clients):
+    fake_clients["graph"].return_value.is_ready.return_value = True
+    registry = Services()
+    registry.spotify_client.token_manager.get_token()
+    registry.visualization_graph.get()
+    readiness = registry.readiness()
+    assert readiness["ready"]
+    assert readiness["checks"]["visualization_graph"] == READY
+
+def test_failed_prewarm_does_not_block_readiness(fake_clients):
+    fake_clients["cocktail"].return_value.prewarm.side_effect = Exception("CocktailDB down")
+    registry = Services()
+    registry.warm_up()
+    readiness = registry.readiness()
+    assert readiness["ready"]
+    assert readiness["checks"]["cocktail_cache"] == FAILED
+
+def test_warm_up_starts_once_per_process(fake_clients):
+    registry = Services()
+    with patch('services.threading.Thread') as thread:
+        registry.start_warm_up()
+        registry.start_warm_up()
+        assert thread.call_count == 1
+        # Après un fork, le nouveau processus relance son propre préchauffage
+        with patch('services.os.getpid', return_value=-1):
+            registry.start_warm_up()
+        assert thread.call_count == 2
+
+def test_app_import_is_network_free():
+    sys.modules.pop("app", None)
+    with patch('requests.Session.request', side_effect=AssertionError("network call during import")):
+        app_module = importlib.import_module("app")
+    client = app_module.app.test_client()
+
+    with patch.object(app_module.services, 'start_warm_up') as start_warm_up:
+        assert client.get("/healthz").get_json() == {"status": "ok"}
+        response = client.get("/readyz")
+        assert response.status_code == 503
+        assert response.get_json()["ready"] is False
+    # Sans hook gunicorn, la première requête lance le préchauffage
+    start_warm_up.assert_called()
@@ -0,0 +1,146 @@
+import os
+import threading
+import time
+import pytest
+from concurrent.futures import ThreadPoolExecutor
+from singleflight import SingleFlight
+
+def run_concurrently(fn, count):
+    with ThreadPoolExecutor(max_workers=count) as executor:
+        futures = [executor.submit(fn) for _ in range(count)]
+        return [future.result() for future in futures]
+
+def slow_call(release, calls, value):
+    def fn():
+        calls.append(1)
+        release.wait(5)
+        return value
+    return fn
+
+def test_concurrent_calls_share_one_result():
+    flight = SingleFlight("test")
+    release, calls = threading.Event(), []
+    fn = slow_call(release, calls, {"name": "Party"})
+    threading.Timer(0.1, release.set).start()
+
+    results = run_concurrently(lambda: flight.do("p1", fn), 8)
+    assert calls == [1]
+    assert results == [{"name": "Party"}] * 8
+    # Une fois l'appel terminé, la clé est libérée : pas de cache
+    flight.do("p1", fn)
+    assert calls == [1, 1]
+
+def test_errors_are_shared_then_released():
+    flight = SingleFlight("test")
+    release = threading.Event()
+    calls = []
+
+    def failing():
+        calls.append(1)
+        release.wait(5)
+        raise Exception("upstream down")
+
+    threading.Timer(0.1, release.set).start()
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        futures = [executor.submit(flight.do, "p1", failing) for _ in range(4)]
+        for future in futures:
+            with pytest.raises(Exception, match="upstream down"):
+                future.result()
+    assert calls == [1]
+    assert flight.do("p1", lambda: "ok") == "ok"
+
+def test_claim_returns_keys_already_in_flight():
+    flight = SingleFlight("test")
+    owned, pending = flight.claim(["a1", "a2"])
+    assert set(owned) == {"a1", "a2"} and pending == {}
+
+    second_owned, second_pending = flight.claim(["a2", "a3"])
+    assert set(second_owned) == {"a3"} and set(second_pending) == {"a2"}
+
+    flight.resolve(owned, {"a2": {"name": "Artist2"}})
+    assert second_pending["a2"].result(timeout=1) == {"name": "Artist2"}
+    assert owned["a1"].result(timeout=1) is None
+    # Clés résolues : de nouveau libres
+    assert set(flight.claim(["a1"])[0]) == {"a1"}
+
+def test_handoff_between_processes(tmp_path):
+    # Deux instances sur le même dossier : comme deux workers gunicorn
+    first = SingleFlight("test", handoff_dir=str(tmp_path))
+    second = SingleFlight("test", handoff_dir=str(tmp_path))
+    release, first_calls, second_calls = threading.Event(), [], []
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        leader = executor.submit(first.do, "p1", slow_call(release, first_calls, ["Party", 3]))
+        while not first_calls:
+            time.sleep(0.01)
+        follower = executor.submit(second.do, "p1", slow_call(release, second_calls, ["Other", 0]))
+        time.sleep(0.1)
+        release.set()
+        assert leader.result() == ["Party", 3]
+        assert follower.result() == ["Party", 3]
+    assert second_calls == []
+    # Dossier et fichiers de passage réservés à l'utilisateur courant
+    assert os.stat(tmp_path / "test").st_mode & 0o777 == 0o700
+    assert all(entry.stat().st_mode & 0o777 == 0o600 for entry in os.scandir(tmp_path / "test"))
+
+def test_stale_handoff_is_not_reused(tmp_path):
+    first = SingleFlight("test", handoff_dir=str(tmp_path))
+    second = SingleFlight("test", handoff_dir=str(tmp_path))
+    assert first.do("p1", lambda: "old") == "old"
+    # Appel qui n'a pas attendu le premier : il refait la requête
+    assert second.do("p1", lambda: "new") == "new"
+
+def test_unrelated_keys_do_not_wait_for_each_other(tmp_path):
+    flight = SingleFlight("test", handoff_dir=str(tmp_path))
+    release, calls = threading.Event(), []
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        leader = executor.submit(flight.do, "p1", slow_call(release, calls, "slow"))
+        while not calls:
+            time.sleep(0.01)
+        started = time.time()
+        # Plus de clés que les 256 anciens fichiers de verrou partagés : collision garantie auparavant
+        assert [flight.do(f"other{i}", lambda: "fast") for i in range(300)] == ["fast"] * 300
+        assert time.time() - started < 1.0
+        release.set()
+        assert leader.result() == "slow"
+
+def test_sweep_removes_idle_lock_files(tmp_path):
+    flight = SingleFlight("test", handoff_dir=str(tmp_path), handoff_ttl=0)
+    assert flight.do("p1", lambda: "value") == "value"
+    namespace_dir = tmp_path / "test"
+    assert any(name.endswith(".lock") for name in os.listdir(namespace_dir))
+    time.sleep(0.01)
+    flight._sweep()
+    assert os.listdir(namespace_dir) == []
+    # Le verrou est recréé à la demande
+    assert flight.do("p1", lambda: "again") == "again"
+
+def test_lock_timeout_calls_upstream_directly(tmp_path):
+    first = SingleFlight("test", handoff_dir=str(tmp_path))
+    second = SingleFlight("test", handoff_dir=str(tmp_path), lock_timeout=0.05)
+    release, calls = threading.Event(), []
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        leader = executor.submit(first.do, "p1", slow_call(release, calls, "slow"))
+        while not calls:
+            time.sleep(0.01)
+        assert second.do("p1", lambda: "direct") == "direct"
+        release.set()
+        assert leader.result() == "slow"
+
+def test_unusable_handoff_dir_falls_back_to_process(tmp_path):
+    blocker = tmp_path / "file"
+    blocker.write_text("")
+    flight = SingleFlight("test", handoff_dir=str(blocker))
+    assert flight.do("p1", lambda: "value") == "value"
+    assert flight.handoff_dir == ""
+
+def test_handoff_dir_writable_by_others_is_refused(tmp_path):
+    shared = tmp_path / "shared"
+    shared.mkdir()
+    shared.chmod(0o777)
+    flight = SingleFlight("test", handoff_dir=str(shared))
+    assert flight.do("p1", lambda: "value") == "value"
+    assert flight.handoff_dir == ""
+    assert not (shared / "test").exists()
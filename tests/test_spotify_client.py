@@ -1,35 +1,53 @@
+import threading
+import time
+import io
+import json
 import pytest
-from spotify_client import SpotifyClient
+import requests
+import urllib3
+from concurrent.futures import ThreadPoolExecutor
+from spotify_client import SpotifyAPIError, SpotifyClient
 from unittest.mock import patch, MagicMock
 
+# Les tests ne doivent ni lire ni écrire les caches partagés (token, artistes)
+@pytest.fixture(autouse=True)
+def no_shared_caches():
+    with patch('spotify_client.Config.SPOTIFY_TOKEN_CACHE', ''), \
+         patch('spotify_client.Config.CACHE_DB_PATH', ''), \
+         patch('spotify_client.Config.SINGLE_FLIGHT_DIR', ''):
+        yield
+
+def json_response(data, status_code=200):
+    # Vraie réponse requests dont le corps est lu depuis un flux, comme avec stream=True
+    response = requests.Response()
+    response.status_code = status_code
+    response.raw = urllib3.HTTPResponse(body=io.BytesIO(json.dumps(data).encode("utf-8")),
+                                        status=status_code, preload_content=False)
+    return response
+
+def make_transport(token="test-token"):
+    # Transport factice : simule l'obtention d'un token valide
+    transport = MagicMock()
+    token_response = MagicMock()
+    token_response.status_code = 200
+    token_response.json.return_value = {"access_token": token}
+    transport.post.return_value = token_response
+    return transport
+
 @pytest.fixture
 def spotify_client():
-    # Patch de requests.post pour simuler l'obtention d'un token valide
-    with patch('spotify_client.requests.post') as mock_post:
-        mock_response = MagicMock()
-        mock_response.status_code = 200
-        mock_response.json.return_value = {"access_token": "test-token"}
-        mock_post.return_value = mock_response
-        # L'instanciation se fait dans le contexte du patch
-        yield SpotifyClient()
+    yield SpotifyClient(transport=make_transport())
 
 def test_get_token():
-    with patch('spotify_client.requests.post') as mock_post:
-        mock_response = MagicMock()
-        mock_response.status_code = 200
-        mock_response.json.return_value = {"access_token": "test-token"}
-        mock_post.return_value = mock_response
-
-        client = SpotifyClient()
-        token = client._get_token()
-        assert token == "test-token"
+    client = SpotifyClient(transport=make_transport())
+    token = client._get_token()
+    assert token == "test-token"
+    assert client.http.post.call_args.args[0] == "https://accounts.spotify.com/api/token"
 
 def test_get_playlist_top_artists(spotify_client):
-    with patch('spotify_client.requests.get') as mock_get:
+    with patch.object(spotify_client.http, 'get') as mock_get:
         # [On simule ici la réponse de la requête de playlist]
-        playlist_response = MagicMock()
-        playlist_response.status_code = 200
-        playlist_response.json.return_value = {
+        playlist_data = {
             "items": [
                 {"track": {"artists": [{"id": "artist1", "name": "Artist1"}]}},
                 {"track": {"artists": [{"id": "artist1", "name": "Artist1"}]}},
@@ -41,14 +59,16 @@ def test_get_playlist_top_artists(spotify_client):
         artist_response = MagicMock()
         artist_response.status_code = 200
         artist_response.json.return_value = {
-            "name": "Artist1",
-            "genres": ["pop", "dance"]
+            "artists": [
+                {"id": "artist1", "name": "Artist1", "genres": ["pop", "dance"]},
+                {"id": "artist2", "name": "Artist2", "genres": ["rock"]}
+            ]
         }
 
         # Configuration du side effect pour retourner la bonne réponse selon l'URL
         def get_side_effect(url, **kwargs):
             if "playlists" in url:
-                return playlist_response
+                return json_response(playlist_data)
             return artist_response
 
         mock_get.side_effect = get_side_effect
@@ -60,3 +80,285 @@ def test_get_playlist_top_artists(spotify_client):
         assert top_artists[0][0] == "Artist1"
         assert top_artists[0][1] == 2  # count
         assert isinstance(top_artists[0][2], list)  # genres
+
+def test_get_artists_details_batches(spotify_client):
+    with patch.object(spotify_client.http, 'get') as mock_get:
+        def get_side_effect(url, params=None, **kwargs):
+            response = MagicMock()
+            response.status_code = 200
+            response.json.return_value = {
+                "artists": [{"id": artist_id, "name": artist_id.upper(), "genres": ["rock"]}
+                            for artist_id in params["ids"].split(",")]
+            }
+            return response
+
+        mock_get.side_effect = get_side_effect
+
+        artist_ids = [f"artist{i}" for i in range(120)]
+        details = spotify_client.get_artists_details(artist_ids)
+
+        # 120 artistes => 3 appels (50 + 50 + 20) au lieu de 120
+        assert mock_get.call_count == 3
+        assert list(details.keys()) == artist_ids
+        assert details["artist42"] == {"name": "ARTIST42", "genres": ["rock"]}
+
+def test_iter_playlist_tracks_follows_next_pages(spotify_client):
+    with patch.object(spotify_client.http, 'get') as mock_get:
+        pages = {
+            "https://api.spotify.com/v1/playlists/p1/tracks": {
+                "items": [{"track": {"artists": [{"id": "a1"}]}}] * 100,
+                "next": "https://api.spotify.com/v1/playlists/p1/tracks?offset=100&limit=100"
+            },
+            "https://api.spotify.com/v1/playlists/p1/tracks?offset=100&limit=100": {
+                "items": [{"track": {"artists": [{"id": "a2"}]}}] * 30,
+                "next": None
+            }
+        }
+
+        def get_side_effect(url, **kwargs):
+            return json_response(pages[url])
+
+        mock_get.side_effect = get_side_effect
+
+        tracks = list(spotify_client.iter_playlist_tracks("p1"))
+        assert len(tracks) == 130
+        assert mock_get.call_count == 2
+        # Chaque page est filtrée par `fields=` et lue en flux
+        assert all(call.kwargs["params"]["fields"] == "next,items(track(id,artists(id)))"
+                   and call.kwargs["stream"] for call in mock_get.call_args_list)
+
+        # Avec une limite, la deuxième page n'est jamais demandée
+        mock_get.reset_mock()
+        tracks = list(spotify_client.iter_playlist_tracks("p1", max_tracks=50))
+        assert len(tracks) == 50
+        assert mock_get.call_count == 1
+
+def test_get_playlist_snapshot_single_request(spotify_client):
+    with patch.object(spotify_client.http, 'get') as mock_get:
+        playlist_response = MagicMock()
+        playlist_response.status_code = 200
+        playlist_response.json.return_value = {
+            "name": "Party",
+            "description": "Best of",
+            "snapshot_id": "snap1",
+            "owner": {"display_name": "Owner"},
+            "images": [{"url": "https://image"}],
+            "tracks": {
+                "items": [
+                    {"track": {"artists": [{"id": "artist1"}]}},
+                    {"track": {"artists": [{"id": "artist1"}]}},
+                    {"track": {"artists": [{"id": "artist2"}]}}
+                ],
+                "next": None
+            }
+        }
+
+        artists_response = MagicMock()
+        artists_response.status_code = 200
+        artists_response.json.return_value = {
+            "artists": [
+                {"id": "artist1", "name": "Artist1", "genres": ["pop"]},
+                {"id": "artist2", "name": "Artist2", "genres": ["rock"]}
+            ]
+        }
+
+        def get_side_effect(url, **kwargs):
+            if "playlists" in url:
+                return playlist_response
+            return artists_response
+
+        mock_get.side_effect = get_side_effect
+
+        snapshot = spotify_client.get_playlist_snapshot("https://open.spotify.com/playlist/p1?si=abc")
+        assert snapshot.playlist_id == "p1"
+        assert snapshot.snapshot_id == "snap1"
+        assert snapshot.info == {"name": "Party", "description": "Best of",
+                                 "owner": "Owner", "image": "https://image"}
+        assert "fields" in mock_get.call_args.kwargs["params"]
+
+        top_artists = spotify_client.get_snapshot_top_artists(snapshot)
+        assert top_artists == [("Artist1", 2, ["pop"]), ("Artist2", 1, ["rock"])]
+        # Une requête playlist + une requête artistes, la première page n'est pas redemandée
+        assert mock_get.call_count == 2
+
+def test_api_get_retries_once_on_401(spotify_client):
+    # Le token initial n'est obtenu qu'au premier appel : on le charge avant de simuler le 401
+    spotify_client.token_manager.get_token()
+    with patch.object(spotify_client.http, 'post') as mock_post, \
+         patch.object(spotify_client.http, 'get') as mock_get:
+        token_response = MagicMock()
+        token_response.status_code = 200
+        token_response.json.return_value = {"access_token": "fresh-token", "expires_in": 3600}
+        mock_post.return_value = token_response
+
+        unauthorized = MagicMock(status_code=401)
+        ok = MagicMock(status_code=200)
+        mock_get.side_effect = [unauthorized, ok]
+
+        response = spotify_client._api_get("https://api.spotify.com/v1/artists")
+        assert response is ok
+        assert mock_post.call_count == 1
+        assert mock_get.call_args_list[0].kwargs["headers"]["Authorization"] == "Bearer test-token"
+        assert mock_get.call_args_list[1].kwargs["headers"]["Authorization"] == "Bearer fresh-token"
+
+def test_get_artists_details_uses_cache(spotify_client):
+    with patch.object(spotify_client.http, 'get') as mock_get:
+        def get_side_effect(url, params=None, **kwargs):
+            response = MagicMock()
+            response.status_code = 200
+            response.json.return_value = {
+                "artists": [{"id": artist_id, "name": artist_id, "genres": ["jazz"]}
+                            for artist_id in params["ids"].split(",")]
+            }
+            return response
+
+        mock_get.side_effect = get_side_effect
+
+        spotify_client.get_artists_details(["a1", "a2"])
+        details = spotify_client.get_artists_details(["a1", "a2", "a3"])
+
+        # Seul l'artiste manquant est demandé à Spotify
+        assert mock_get.call_count == 2
+        assert mock_get.call_args.kwargs["params"] == {"ids": "a3"}
+        assert details["a2"] == {"name": "a2", "genres": ["jazz"]}
+        assert spotify_client.artist_cache.stats()["hits"] == 2
+        assert spotify_client.artist_cache.stats()["misses"] == 3
+
+def test_concurrent_snapshot_requests_are_coalesced(spotify_client):
+    release = threading.Event()
+
+    def get_side_effect(url, **kwargs):
+        release.wait(5)
+        return MagicMock(status_code=200, json=MagicMock(return_value={
+            "name": "Viral", "snapshot_id": "snap1", "tracks": {"items": [], "next": None}}))
+
+    with patch.object(spotify_client.http, 'get', side_effect=get_side_effect) as mock_get:
+        threading.Timer(0.1, release.set).start()
+        with ThreadPoolExecutor(max_workers=6) as executor:
+            snapshots = list(executor.map(spotify_client.get_playlist_snapshot, ["p1"] * 6))
+        assert mock_get.call_count == 1
+    assert {snapshot.snapshot_id for snapshot in snapshots} == {"snap1"}
+
+def test_concurrent_artist_lookups_fetch_each_id_once(spotify_client):
+    release = threading.Event()
+    requested = []
+
+    def get_side_effect(url, params=None, **kwargs):
+        requested.extend(params["ids"].split(","))
+        release.wait(5)
+        return MagicMock(status_code=200, json=MagicMock(return_value={
+            "artists": [{"id": artist_id, "name": artist_id, "genres": ["jazz"]}
+                        for artist_id in params["ids"].split(",")]}))
+
+    with patch.object(spotify_client.http, 'get', side_effect=get_side_effect):
+        threading.Timer(0.2, release.set).start()
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            first = executor.submit(spotify_client.get_artists_details, ["a1", "a2"])
+            while not requested:
+                time.sleep(0.01)
+            second = executor.submit(spotify_client.get_artists_details, ["a2", "a3"])
+            assert second.result()["a2"] == {"name": "a2", "genres": ["jazz"]}
+            assert first.result()["a1"] == {"name": "a1", "genres": ["jazz"]}
+    # a2 était déjà demandé par la première requête
+    assert sorted(requested) == ["a1", "a2", "a3"]
+
+@pytest.mark.parametrize("streaming", [True, False])
+def test_tracks_page_keeps_only_track_and_first_artist_ids(streaming):
+    page = {
+        "href": "https://api.spotify.com/v1/playlists/p1/tracks",
+        "items": [
+            {"added_at": "2024-01-01", "track": {"id": "t1", "name": "Song", "album": {"images": [{"url": "x"}] * 3},
+                                                  "artists": [{"id": "a1", "name": "A"}, {"id": "a2"}]}},
+            {"track": None},
+            {"track": {"artists": [{"id": None, "name": "Local"}]}},
+            {"track": {"artists": []}}
+        ],
+        "next": "https://api.spotify.com/v1/playlists/p1/tracks?offset=4&limit=4"
+    }
+    # Sans ijson, la page est décodée en entier puis réduite
+    ijson = pytest.importorskip("ijson") if streaming else None
+    with patch('spotify_client.ijson', ijson):
+        parsed = SpotifyClient._parse_tracks_page(json_response(page))
+    assert parsed == {
+        "items": [
+            {"track": {"id": "t1", "artists": [{"id": "a1"}]}},
+            {"track": None},
+            {"track": {"id": None, "artists": [{"id": None}]}},
+            {"track": {"id": None, "artists": []}}
+        ],
+        "next": "https://api.spotify.com/v1/playlists/p1/tracks?offset=4&limit=4"
+    }
+
+
+def test_get_playlists_top_artists_merges_and_dedupes(spotify_client):
+    from spotify_client import PlaylistSnapshot
+
+    def track(track_id, artist_id):
+        return {"track": {"id": track_id, "artists": [{"id": artist_id}]}}
+
+    # p1 : 150 pistes, la deuxième page est demandée par offset ; p2 reprend deux pistes de p1
+    p1 = PlaylistSnapshot("p1", "s1", {}, {"items": [track(f"t{i}", "a1") for i in range(100)],
+                                           "next": "https://api.spotify.com/v1/playlists/p1/tracks?offset=100",
+                                           "total": 150})
+    p2 = PlaylistSnapshot("p2", "s2", {}, {"items": [track("t0", "a1"), track("t1", "a1"), track("u1", "a2"),
+                                                     {"track": None}],
+                                           "next": None, "total": 4})
+    pages = {("p1", 100): {"items": [track(f"t{i}", "a3") for i in range(100, 150)], "next": None}}
+
+    with patch.object(spotify_client.http, 'get') as mock_get:
+        def get_side_effect(url, **kwargs):
+            if url.endswith("/tracks"):
+                return json_response(pages[(url.split("/")[-2], kwargs["params"]["offset"])])
+            assert kwargs["params"]["ids"] == "a1,a3,a2"
+            return json_response({"artists": [{"id": artist_id, "name": artist_id.upper(), "genres": ["pop"]}
+                                              for artist_id in ("a1", "a3", "a2")]})
+
+        mock_get.side_effect = get_side_effect
+        top_artists = spotify_client.get_playlists_top_artists([p1, p2])
+
+    # Les pistes t0 et t1 ne sont comptées qu'une fois ; une seule requête d'artistes
+    assert top_artists == [("A1", 100, ["pop"]), ("A3", 50, ["pop"]), ("A2", 1, ["pop"])]
+    assert mock_get.call_count == 2
+    page_call = mock_get.call_args_list[0]
+    assert page_call.kwargs["params"]["fields"] == "next,items(track(id,artists(id)))"
+
+    # Avec une limite par playlist, aucune page supplémentaire n'est demandée
+    with patch.object(spotify_client.http, 'get') as mock_get:
+        mock_get.return_value = json_response({"artists": []})
+        spotify_client.get_playlists_top_artists([p1, p2], max_tracks=100)
+        assert all(not call.args[0].endswith("/tracks") for call in mock_get.call_args_list)
+
+def test_get_user_playlist_ids_follows_pages(spotify_client):
+    pages = {
+        "https://api.spotify.com/v1/users/u1/playlists": {
+            "items": [{"id": "p1"}, None, {"id": "p2"}],
+            "next": "https://api.spotify.com/v1/users/u1/playlists?offset=50&limit=50"
+        },
+        "https://api.spotify.com/v1/users/u1/playlists?offset=50&limit=50": {"items": [{"id": "p3"}], "next": None}
+    }
+    with patch.object(spotify_client.http, 'get') as mock_get:
+        mock_get.side_effect = lambda url, **kwargs: json_response(pages[url])
+        assert spotify_client.get_user_playlist_ids("https://open.spotify.com/user/u1?si=x") == ["p1", "p2", "p3"]
+        assert spotify_client.get_user_playlist_ids("u1", limit=2) == ["p1", "p2"]
+
+        mock_get.side_effect = None
+        mock_get.return_value = json_response({}, status_code=404)
+        with pytest.raises(SpotifyAPIError, match="Failed to get user playlists") as error:
+            spotify_client.get_user_playlist_ids("unknown")
+        assert error.value.status_code == 404
+
+def test_parallel_fetches_are_bounded_per_request(spotify_client):
+    running, peak, lock = [0], [0], threading.Lock()
+
+    def fetch(item):
+        with lock:
+            running[0] += 1
+            peak[0] = max(peak[0], running[0])
+        time.sleep(0.01)
+        with lock:
+            running[0] -= 1
+        return item * 2
+
+    with patch('spotify_client.Config.SPOTIFY_FETCH_WINDOW', 2):
+        assert spotify_client._map(fetch, range(10)) == [item * 2 for item in range(10)]
+    assert peak[0] <= 2
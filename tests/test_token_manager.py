@@ -0,0 +1,93 @@
+import time
+from unittest.mock import MagicMock, patch
+from token_manager import TokenManager, EXPIRY_SAFETY_SECONDS
+
+def test_get_token_is_cached_until_expiry():
+    fetch = MagicMock(return_value={"access_token": "token-1", "expires_in": 3600})
+    manager = TokenManager(fetch)
+
+    assert manager.get_token() == "token-1"
+    assert manager.get_token() == "token-1"
+    assert fetch.call_count == 1
+
+def test_get_token_refreshes_before_expiry():
+    fetch = MagicMock(side_effect=[
+        {"access_token": "token-1", "expires_in": 3600},
+        {"access_token": "token-2", "expires_in": 3600}
+    ])
+    manager = TokenManager(fetch)
+    assert manager.get_token() == "token-1"
+
+    # Le token expire bientôt : il ne doit plus être servi
+    with patch('token_manager.time.time', return_value=time.time() + 3600 - EXPIRY_SAFETY_SECONDS + 1):
+        assert manager.get_token() == "token-2"
+
+def test_invalidate_forces_new_fetch():
+    fetch = MagicMock(side_effect=[
+        {"access_token": "token-1", "expires_in": 3600},
+        {"access_token": "token-2", "expires_in": 3600}
+    ])
+    manager = TokenManager(fetch)
+    assert manager.get_token() == "token-1"
+    manager.invalidate("token-1")
+    assert manager.get_token() == "token-2"
+
+def test_file_cache_is_shared_between_managers(tmp_path):
+    cache_path = str(tmp_path / "token.json")
+    fetch_a = MagicMock(return_value={"access_token": "shared-token", "expires_in": 3600})
+    fetch_b = MagicMock(return_value={"access_token": "other-token", "expires_in": 3600})
+
+    # Deux managers = deux workers gunicorn
+    assert TokenManager(fetch_a, cache_path=cache_path, cache_key="client").get_token() == "shared-token"
+    assert TokenManager(fetch_b, cache_path=cache_path, cache_key="client").get_token() == "shared-token"
+    fetch_b.assert_not_called()
+
+    # Des identifiants différents n'utilisent pas le même token
+    assert TokenManager(fetch_b, cache_path=cache_path, cache_key="other").get_token() == "other-token"
+
+class StopLoop(BaseException):
+    """Interrompt la boucle de rafraîchissement (non interceptée par `except Exception`)"""
+
+def run_refresh_loop(manager, iterations):
+    clock = [1000.0]
+    sleeps = []
+
+    def sleep(seconds):
+        if len(sleeps) == iterations:
+            raise StopLoop()
+        sleeps.append(seconds)
+        clock[0] += seconds
+
+    with patch('token_manager.time.time', side_effect=lambda: clock[0]), \
+         patch('token_manager.time.sleep', side_effect=sleep):
+        try:
+            manager._refresh_loop()
+        except StopLoop:
+            pass
+    return sleeps
+
+def test_refresh_loop_renews_ahead_of_expiry():
+    fetch = MagicMock(return_value={"access_token": "token", "expires_in": 3600})
+    sleeps = run_refresh_loop(TokenManager(fetch), 3)
+    # Premier token obtenu tout de suite, puis renouvelé 5 minutes avant chaque expiration
+    assert sleeps == [3300.0] * 3
+    assert fetch.call_count == 4
+
+def test_refresh_loop_does_not_spin_on_short_lived_tokens():
+    fetch = MagicMock(return_value={"access_token": "token", "expires_in": 120})
+    sleeps = run_refresh_loop(TokenManager(fetch), 3)
+    # Marge bornée à la moitié de la durée de vie : un fetch par minute, pas en continu
+    assert sleeps == [60.0] * 3
+    assert fetch.call_count == 4
+
+    fetch = MagicMock(return_value={"access_token": "token", "expires_in": 0})
+    sleeps = run_refresh_loop(TokenManager(fetch), 3)
+    assert sleeps == [5] * 3
+    assert fetch.call_count == 4
+
+def test_refresh_loop_retries_after_failure():
+    fetch = MagicMock(side_effect=[Exception("Spotify down"), {"access_token": "token", "expires_in": 3600}])
+    manager = TokenManager(fetch)
+    sleeps = run_refresh_loop(manager, 2)
+    assert sleeps == [30, 3300.0]
+    assert manager._access_token == "token"
@@ -0,0 +1,43 @@
+import json
+from unittest.mock import MagicMock
+from cocktail_client import CocktailClient
+from mood_analyzer import MoodAnalyzer
+from visualization_graph import VisualizationGraph
+
+def make_graph():
+    return VisualizationGraph(MoodAnalyzer(), CocktailClient(transport=MagicMock()))
+
+def test_graph_contains_genres_and_cocktails():
+    graph = make_graph()
+    payload, etag = graph.get()
+    data = json.loads(payload)
+    genre_nodes = [node for node in data["nodes"] if node["type"] == "genre"]
+    cocktail_nodes = [node for node in data["nodes"] if node["type"] == "cocktail"]
+    assert len(genre_nodes) == len(graph.mood_analyzer.base_characteristics)
+    assert len(cocktail_nodes) == 3 * len(graph.cocktail_client.mood_cocktail_mapping)
+    assert all(0 < link["value"] <= 1 for link in data["links"])
+    assert etag
+
+def test_graph_is_built_once():
+    graph = make_graph()
+    graph.build = MagicMock(wraps=graph.build)
+    assert not graph.is_ready()
+    first = graph.get()
+    assert graph.is_ready()
+    second = graph.get()
+    assert first == second
+    assert graph.build.call_count == 1
+
+def test_graph_is_rebuilt_when_tables_change():
+    graph = make_graph()
+    _, etag = graph.get()
+    graph.cocktail_client.set_mood_cocktails("dark", ["Black Russian"])
+    payload, new_etag = graph.get()
+    assert new_etag != etag
+    assert b"Espresso Martini" not in payload
+
+    graph.mood_analyzer.update_tables(base_characteristics={"pop": [0.1, 0.1, 0.1, 0.1, 0.1]})
+    _, newest_etag = graph.get()
+    assert newest_etag != new_etag
+    # Le résolveur de genres a été recompilé avec la nouvelle table
+    assert list(graph.mood_analyzer._get_genre_characteristics("pop")) == [0.1] * 5
@@ -0,0 +1,175 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows : pas de verrou inter-processus, cache en mémoire uniquement
+    fcntl = None
+
+# Le rafraîchissement en arrière-plan se fait bien avant l'expiration (au plus à mi-vie du token)...
+REFRESH_AHEAD_SECONDS = 300
+REFRESH_AHEAD_FRACTION = 0.5
+# ...et jamais plus souvent que toutes les 5 secondes, même pour des tokens très courts
+MIN_REFRESH_INTERVAL_SECONDS = 5
+# ...et un token n'est plus servi s'il expire dans moins de 30 secondes
+EXPIRY_SAFETY_SECONDS = 30
+# Délai avant une nouvelle tentative si le rafraîchissement en arrière-plan échoue
+RETRY_DELAY_SECONDS = 30
+
+
+class TokenManager:
+    """Gère un token OAuth client-credentials : expiration, rafraîchissement anticipé
+    et partage entre les workers gunicorn via un fichier de cache verrouillé.
+
+    `fetch_token` doit renvoyer la réponse du endpoint de token
+    (dict contenant au moins `access_token` et idéalement `expires_in`).
+    """
+
+    def __init__(self, fetch_token: Callable[[], Dict[str, Any]], cache_path: str = "",
+                 cache_key: str = ""):
+        self._fetch_token = fetch_token
+        self.cache_path = cache_path if fcntl is not None else ""
+        # Empêche de réutiliser le token d'autres identifiants partageant le même fichier
+        self._cache_key = hashlib.sha256(cache_key.encode("utf-8")).hexdigest()[:16]
+        self._lock = threading.Lock()
+        self._access_token: Optional[str] = None
+        self._expires_at = 0.0
+        # Durée de vie du token courant, qui borne la marge de rafraîchissement anticipé
+        self._lifetime = 0.0
+        self._refresher: Optional[threading.Thread] = None
+
+    def get_token(self) -> str:
+        """Renvoie un token valide ; ne contacte Spotify que si aucun token utilisable n'est en cache"""
+        token = self._access_token
+        if token and time.time() < self._expires_at - EXPIRY_SAFETY_SECONDS:
+            return token
+
+        with self._lock:
+            if self._access_token and time.time() < self._expires_at - EXPIRY_SAFETY_SECONDS:
+                return self._access_token
+            self._refresh(min_validity=EXPIRY_SAFETY_SECONDS)
+            return self._access_token
+
+    def has_token(self) -> bool:
+        """Indique si un token utilisable est déjà en mémoire (sans contacter Spotify)"""
+        return bool(self._access_token) and time.time() < self._expires_at - EXPIRY_SAFETY_SECONDS
+
+    def invalidate(self, token: str) -> None:
+        """Oublie un token refusé par l'API (401) pour forcer un nouveau fetch"""
+        with self._lock:
+            if self._access_token == token:
+                self._access_token = None
+                self._expires_at = 0.0
+            if self.cache_path:
+                try:
+                    with self._file_lock():
+                        cached = self._read_cache()
+                        if cached and cached["access_token"] == token:
+                            os.remove(self.cache_path)
+                except OSError:
+                    pass
+
+    def start_background_refresh(self) -> None:
+        """Démarre (une seule fois) le thread qui renouvelle le token avant son expiration"""
+        with self._lock:
+            if self._refresher is not None and self._refresher.is_alive():
+                return
+            self._refresher = threading.Thread(target=self._refresh_loop, name="spotify-token-refresh",
+                                               daemon=True)
+            self._refresher.start()
+
+    def _refresh_ahead(self) -> float:
+        # Un token valable moins de REFRESH_AHEAD_SECONDS serait sinon renouvelé en boucle
+        return min(REFRESH_AHEAD_SECONDS, self._lifetime * REFRESH_AHEAD_FRACTION)
+
+    def _refresh_loop(self) -> None:
+        while True:
+            if self._access_token:
+                delay = self._expires_at - self._refresh_ahead() - time.time()
+                time.sleep(max(delay, MIN_REFRESH_INTERVAL_SECONDS))
+            try:
+                with self._lock:
+                    self._refresh(min_validity=self._refresh_ahead())
+            except Exception as e:
+                logging.error(f"Background Spotify token refresh failed: {str(e)}")
+                time.sleep(RETRY_DELAY_SECONDS)
+
+    def _refresh(self, min_validity: float) -> None:
+        """Charge un token depuis le cache partagé ou en demande un nouveau (appelé sous self._lock)"""
+        if not self.cache_path:
+            self._store(self._fetch_token())
+            return
+
+        try:
+            lock = self._file_lock().__enter__()
+        except OSError as e:
+            logging.warning(f"Spotify token cache unavailable, fetching directly: {str(e)}")
+            self._store(self._fetch_token())
+            return
+
+        try:
+            # Un autre worker a peut-être déjà renouvelé le token
+            cached = self._read_cache()
+            if cached and time.time() < cached["expires_at"] - min_validity:
+                self._access_token = cached["access_token"]
+                self._expires_at = cached["expires_at"]
+                self._lifetime = float(cached.get("lifetime", cached["expires_at"] - time.time()))
+                return
+
+            self._store(self._fetch_token())
+            self._write_cache()
+        finally:
+            lock.__exit__(None, None, None)
+
+    def _store(self, token_data: Dict[str, Any]) -> None:
+        self._access_token = token_data["access_token"]
+        self._lifetime = float(token_data.get("expires_in", 3600))
+        self._expires_at = time.time() + self._lifetime
+
+    def _file_lock(self):
+        return _FileLock(f"{self.cache_path}.lock")
+
+    def _read_cache(self) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self.cache_path, "r", encoding="utf-8") as f:
+                cached = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        if cached.get("key") != self._cache_key or not cached.get("access_token"):
+            return None
+        return cached
+
+    def _write_cache(self) -> None:
+        tmp_path = f"{self.cache_path}.{os.getpid()}.tmp"
+        try:
+            fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump({"key": self._cache_key, "access_token": self._access_token,
+                           "expires_at": self._expires_at, "lifetime": self._lifetime}, f)
+            os.replace(tmp_path, self.cache_path)
+        except OSError as e:
+            logging.warning(f"Could not write Spotify token cache: {str(e)}")
+
+
+class _FileLock:
+    """Verrou exclusif inter-processus basé sur flock"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._fd = None
+
+    def __enter__(self):
+        self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        fcntl.flock(self._fd, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc):
+        fcntl.flock(self._fd, fcntl.LOCK_UN)
+        os.close(self._fd)
+        self._fd = None
@@ -0,0 +1,83 @@
+import hashlib
+import json
+import threading
+from typing import Any, Dict, Tuple
+
+# Seuil de connexion entre un genre et les cocktails d'un mood
+LINK_THRESHOLD = 20
+# Nombre de cocktails affichés par mood
+COCKTAILS_PER_MOOD = 3
+
+
+class VisualizationGraph:
+    """Graphe genres-cocktails de /api/visualization-data, calculé une fois et servi pré-sérialisé
+
+    Le graphe n'est reconstruit que si la version des tables de l'analyseur ou celle du mapping
+    des cocktails change.
+    """
+
+    def __init__(self, mood_analyzer, cocktail_client):
+        self.mood_analyzer = mood_analyzer
+        self.cocktail_client = cocktail_client
+        self._lock = threading.Lock()
+        self._versions = None
+        self._payload = b""
+        self._etag = ""
+
+    def get(self) -> Tuple[bytes, str]:
+        """Renvoie le JSON sérialisé du graphe et son ETag"""
+        versions = (self.mood_analyzer.version, self.cocktail_client.mapping_version)
+        if versions == self._versions:
+            return self._payload, self._etag
+
+        with self._lock:
+            if versions != self._versions:
+                self._payload = json.dumps(self.build(), separators=(",", ":")).encode("utf-8")
+                self._etag = hashlib.sha1(self._payload).hexdigest()
+                self._versions = versions
+            return self._payload, self._etag
+
+    def is_ready(self) -> bool:
+        """Vrai une fois le graphe construit"""
+        return bool(self._payload)
+
+    def build(self) -> Dict[str, Any]:
+        """Calcule les connexions entre genres et cocktails"""
+        nodes = []
+        links = []
+
+        # Ajouter les genres principaux
+        main_genres = list(self.mood_analyzer.base_characteristics.keys())
+        for genre in main_genres:
+            nodes.append({
+                "id": f"genre_{genre}",
+                "name": genre.title(),
+                "type": "genre"
+            })
+
+        # Scores de mood calculés une seule fois par genre
+        genre_mood_scores = {
+            genre: self.mood_analyzer._calculate_mood_scores(self.mood_analyzer._get_genre_characteristics(genre))
+            for genre in main_genres
+        }
+
+        # Ajouter les cocktails principaux de chaque mood
+        for mood, cocktails in self.cocktail_client.mood_cocktail_mapping.items():
+            for cocktail in cocktails[:COCKTAILS_PER_MOOD]:
+                nodes.append({
+                    "id": f"cocktail_{cocktail}",
+                    "name": cocktail,
+                    "type": "cocktail"
+                })
+
+                # Créer des liens basés sur les caractéristiques
+                for genre in main_genres:
+                    mood_scores = genre_mood_scores[genre]
+                    if mood in mood_scores and mood_scores[mood] > LINK_THRESHOLD:
+                        links.append({
+                            "source": f"genre_{genre}",
+                            "target": f"cocktail_{cocktail}",
+                            "value": mood_scores[mood] / 100  # Normaliser entre 0 et 1
+                        })
+
+        return {"nodes": nodes, "links": links}